@@ -11,6 +11,7 @@ from aiogram.types import (
     BotCommandScopeAllGroupChats,
 )
 
+from infrastructure.database.pool_metrics import pool_metrics_reporter
 from infrastructure.database.setup import create_engine, create_session_pool
 from tgbot.config import Config, load_config
 from tgbot.handlers import routers_list
@@ -18,11 +19,22 @@ from tgbot.middlewares.AdminRoleMiddleware import AdminRoleMiddleware
 from tgbot.middlewares.ConfigMiddleware import ConfigMiddleware
 from tgbot.middlewares.DatabaseMiddleware import DatabaseMiddleware
 from tgbot.middlewares.MessagePairingMiddleware import MessagePairingMiddleware
+from tgbot.middlewares.RequestRateLimitMiddleware import RequestRateLimitMiddleware
+from tgbot.middlewares.UpdatePriorityMiddleware import UpdatePriorityMiddleware
 from tgbot.middlewares.UserAccessMiddleware import UserAccessMiddleware
+from tgbot.services.cleanup import remove_old_topics, rotate_messages_pairs
 from tgbot.services.logger import setup_logging
+from tgbot.services.pairs_writer import pairs_writer
+from tgbot.services.leader import LeaderLease
+from tgbot.services.redis_client import close_redis, get_redis
+from tgbot.services.topic_pool import topic_pool
 from tgbot.services.scheduler import (
-    remove_old_topics,
+    deletion_queue,
+    rebuild_active_questions_index,
     scheduler,
+    send_attention_reminders,
+    start_scheduling,
+    stop_scheduling,
 )
 
 bot_config = load_config(".env")
@@ -69,6 +81,10 @@ def register_middlewares(
     Use this if you want different middleware chains for different event types.
     """
 
+    # Все исходящие запросы проходят через лимиты Telegram, ответы на апдейты - в первую очередь
+    bot.session.middleware(RequestRateLimitMiddleware(limits=config.rate_limit))
+    dp.update.outer_middleware(UpdatePriorityMiddleware())
+
     # Always needed
     config_middleware = ConfigMiddleware(config)
     database_middleware = DatabaseMiddleware(
@@ -181,7 +197,7 @@ async def main():
 
     from tgbot.services.scheduler import register_scheduler_dependencies
 
-    register_scheduler_dependencies(bot, questioner_db)
+    register_scheduler_dependencies(bot, questioner_db, main_db)
 
     if bot_config.questioner.remove_old_questions:
         scheduler.add_job(
@@ -190,19 +206,69 @@ async def main():
             hours=12,
             args=[bot, questioner_db],
         )
+    # Секции таблицы пар сообщений создаются наперед и удаляются независимо от очистки вопросов
+    scheduler.add_job(
+        rotate_messages_pairs,
+        "interval",
+        hours=6,
+        args=[questioner_db],
+        id="rotate_messages_pairs",
+        jobstore="default",
+        replace_existing=True,
+    )
+    # Единый обход вопросов без дежурного вместо отдельной задачи на каждый вопрос
+    scheduler.add_job(
+        send_attention_reminders,
+        "interval",
+        minutes=1,
+        id="attention_reminders",
+        jobstore="default",
+        replace_existing=True,
+    )
+    # Индекс активных вопросов сверяется с БД, чтобы не накапливать расхождения
+    scheduler.add_job(
+        rebuild_active_questions_index,
+        "interval",
+        minutes=10,
+        id="rebuild_active_questions_index",
+        jobstore="default",
+        replace_existing=True,
+    )
     # await remove_old_topics(bot, questioner_db)
-    scheduler.start()
 
-    existing_jobs = scheduler.get_jobs()
-    # scheduler.print_jobs()
-    logger.info(
-        f"[Redis] Найдено {len(existing_jobs)} существующих задач в планировщике"
+    # Планировщик запускается на паузе: задачи выполняет только реплика-лидер,
+    # остальные реплики лишь обрабатывают апдейты и ставят задачи
+    scheduler.start(paused=True)
+    scheduler_leader = LeaderLease(
+        name="scheduler",
+        redis=get_redis(),
+        on_acquired=start_scheduling,
+        on_lost=stop_scheduling,
+    )
+    await scheduler_leader.start()
+    deletion_queue.start(bot)
+    pairs_writer.start(questioner_db)
+    pool_metrics_reporter.start()
+    topic_pool.start(
+        bot,
+        [
+            bot_config.forum.ntp_main_forum_id,
+            bot_config.forum.ntp_trainee_forum_id,
+            bot_config.forum.nck_main_forum_id,
+            bot_config.forum.nck_trainee_forum_id,
+        ],
     )
 
     # await on_startup(bot)
     try:
         await dp.start_polling(bot)
     finally:
+        await scheduler_leader.stop()
+        await deletion_queue.stop()
+        await pairs_writer.stop()
+        await pool_metrics_reporter.stop()
+        await topic_pool.stop()
+        await close_redis()
         await main_db_engine.dispose()
         await questioner_db_engine.dispose()
 
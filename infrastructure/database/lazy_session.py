@@ -0,0 +1,150 @@
+import asyncio
+import logging
+from typing import Any, Optional
+
+from sqlalchemy.exc import DBAPIError, DisconnectionError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from tgbot.services.logger import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, (OperationalError, DisconnectionError)):
+        return True
+    return isinstance(error, DBAPIError) and (
+        error.connection_invalidated
+        or "Connection is busy" in str(error)
+        or "HY000" in str(error)
+    )
+
+
+class LazySession:
+    """
+    Ленивая обертка над AsyncSession для репозиториев.
+
+    Сессия создается и берет соединение из пула только при первом обращении к БД.
+    После чтения без несохраненных изменений транзакция сразу завершается и соединение возвращается в пул,
+    поэтому медленные вызовы Bot API между шагами обработчика не держат соединение.
+    Загруженные объекты остаются доступны благодаря expire_on_commit=False.
+    Повторные попытки выполняются только на этапе получения соединения - сами запросы не повторяются
+    """
+
+    def __init__(
+        self,
+        session_pool: async_sessionmaker[AsyncSession],
+        retries: int = 3,
+        retry_delay: float = 0.5,
+    ):
+        self._session_pool = session_pool
+        self._session: Optional[AsyncSession] = None
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+    @property
+    def session(self) -> AsyncSession:
+        """Сессия SQLAlchemy. Создание сессии не берет соединение из пула."""
+        if self._session is None:
+            self._session = self._session_pool()
+        return self._session
+
+    @property
+    def has_changes(self) -> bool:
+        session = self._session
+        return session is not None and bool(
+            session.new or session.dirty or session.deleted
+        )
+
+    async def _acquire(self) -> AsyncSession:
+        """Получение соединения с повторными попытками."""
+        session = self.session
+        if session.in_transaction():
+            return session
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                await session.connection()
+                return session
+            except Exception as e:
+                if attempt >= self.retries or not _is_retryable(e):
+                    raise
+                logger.warning(
+                    f"[БД] Ошибка получения соединения, попытка {attempt}/{self.retries}: {e}"
+                )
+                await session.rollback()
+                await asyncio.sleep(self.retry_delay * attempt)
+        return session
+
+    async def _release(self) -> None:
+        """Завершение транзакции, если в ней нет несохраненных изменений."""
+        session = self._session
+        if session is not None and session.in_transaction() and not self.has_changes:
+            await session.commit()
+
+    async def execute(self, statement, *args, **kwargs):
+        session = await self._acquire()
+        result = await session.execute(statement, *args, **kwargs)
+        # Изменяющие запросы (UPDATE/DELETE) остаются в транзакции до явного commit
+        if getattr(statement, "is_select", False):
+            await self._release()
+        return result
+
+    async def scalar(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalar()
+
+    async def scalars(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        session = await self._acquire()
+        result = await session.get(entity, ident, **kwargs)
+        await self._release()
+        return result
+
+    async def refresh(self, instance, *args, **kwargs) -> None:
+        session = await self._acquire()
+        await session.refresh(instance, *args, **kwargs)
+        await self._release()
+
+    def add(self, instance) -> None:
+        self.session.add(instance)
+
+    def add_all(self, instances) -> None:
+        self.session.add_all(instances)
+
+    async def delete(self, instance) -> None:
+        await self._acquire()
+        await self.session.delete(instance)
+
+    async def flush(self, *args, **kwargs) -> None:
+        await self._acquire()
+        await self.session.flush(*args, **kwargs)
+
+    async def commit(self) -> None:
+        if self._session is None:
+            return
+        if self.has_changes:
+            await self._acquire()
+        await self._session.commit()
+
+    async def rollback(self) -> None:
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self) -> None:
+        """Закрытие сессии с возвратом соединения в пул."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Остальные методы AsyncSession доступны напрямую
+        return getattr(self.session, name)
+
+    async def __aenter__(self) -> "LazySession":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
@@ -1,24 +1,42 @@
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import BigInteger, DateTime, String, func
+import pytz
+from sqlalchemy import BigInteger, DateTime, Index, String, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from infrastructure.database.models.base import Base
 
 
+def now_for_pair() -> datetime:
+    """Время создания пары: локальное время без часового пояса, как и остальные даты в БД."""
+    return datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")).replace(tzinfo=None)
+
+
 class MessagesPair(Base):
-    """Модель для отслеживания связей между сообщениями в вопросах"""
+    """
+    Модель для отслеживания связей между сообщениями в вопросах.
 
-    __tablename__ = "messages_pairs"
+    Пара определяется сообщением в чате со специалистом (миграция 006): поиск по нему идет по первичному ключу,
+    поиск по сообщению в топике - по индексу. Таблица секционирована по дням по created_at (миграция 005),
+    поэтому created_at тоже входит в первичный ключ. Старые пары удаляются целыми секциями,
+    а поиск пар ограничивается последними секциями
+    """
 
-    id: Mapped[int] = mapped_column(
-        BigInteger, primary_key=True, autoincrement=True, nullable=False
+    __tablename__ = "messages_pairs"
+    __table_args__ = (
+        Index(
+            "ix_messages_pairs_topic_chat_message", "topic_chat_id", "topic_message_id"
+        ),
     )
 
     # Инфо о чате с юзером
-    user_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
-    user_message_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    user_chat_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False, nullable=False
+    )
+    user_message_id: Mapped[int] = mapped_column(
+        BigInteger, primary_key=True, autoincrement=False, nullable=False
+    )
 
     # Инфо о топике вопроса
     topic_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
@@ -31,13 +49,15 @@ class MessagesPair(Base):
     # Направление сообщения: 'user_to_topic' или 'topic_to_user'
     direction: Mapped[str] = mapped_column(String(20), nullable=False)
 
-    # Дата сообщения (записи в БД)
+    # Дата сообщения (записи в БД). Ключ секционирования, заполняется на стороне бота,
+    # чтобы вставка не требовала отдельного запроса за значением первичного ключа
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
-        default=func.now(),
+        primary_key=True,
+        default=now_for_pair,
         nullable=False,
         server_default=func.now(),
     )
 
     def __repr__(self) -> str:
-        return f"<MessagesPair {self.id}>"
+        return f"<MessagesPair {self.user_chat_id}:{self.user_message_id}>"
@@ -1,7 +1,7 @@
 import datetime
 from typing import Optional
 
-from sqlalchemy import Boolean, DateTime, Integer, String, Unicode, BIGINT
+from sqlalchemy import Boolean, DateTime, Index, Integer, String, Unicode, BIGINT
 from sqlalchemy.orm import Mapped, mapped_column
 
 from infrastructure.database.models.base import Base, TableNameMixin
@@ -39,6 +39,17 @@ class Question(Base, TableNameMixin):
     """
 
     __tablename__ = "questions"
+    __table_args__ = (
+        Index("ix_questions_group_topic", "group_id", "topic_id"),
+        Index("ix_questions_status_duty", "status", "duty_userid"),
+        Index("ix_questions_employee_start", "employee_userid", "start_time"),
+        Index("ix_questions_duty_start", "duty_userid", "start_time"),
+        Index(
+            "ix_questions_employee_status_end", "employee_userid", "status", "end_time"
+        ),
+        Index("ix_questions_status_end", "status", "end_time"),
+        Index("ix_questions_start_token", "start_time", "token"),
+    )
 
     token: Mapped[str] = mapped_column(String(255), primary_key=True)
     group_id: Mapped[int] = mapped_column(BIGINT, nullable=False)
@@ -51,7 +62,7 @@ class Question(Base, TableNameMixin):
     clever_link: Mapped[Optional[str]] = mapped_column(Unicode, nullable=True)
     quality_employee: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
     quality_duty: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True)
-    status: Mapped[Optional[str]] = mapped_column(Unicode, nullable=True)
+    status: Mapped[Optional[str]] = mapped_column(Unicode(32), nullable=True)
     allow_return: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
     activity_status_enabled: Mapped[Optional[bool]] = mapped_column(
         Boolean, nullable=True, default=None
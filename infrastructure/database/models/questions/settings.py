@@ -53,15 +53,27 @@ class Settings(Base, TableNameMixin):
     def __repr__(self) -> str:
         return f"<Settings id={self.id} group_id={self.group_id}>"
 
+    def _parsed_values(self) -> Dict[str, Any]:
+        """
+        Разобранные настройки. JSON разбирается один раз для каждой строки values
+        :return: Словарь с настройками (не изменять)
+        """
+        raw = self.values
+        if getattr(self, "_parsed_raw", None) is not raw:
+            try:
+                parsed = json.loads(raw)
+            except (json.JSONDecodeError, TypeError):
+                parsed = {}
+            self._parsed = parsed if isinstance(parsed, dict) else {}
+            self._parsed_raw = raw
+        return self._parsed
+
     def get_values(self) -> Dict[str, Any]:
         """
         Получение настроек в виде словаря
         :return: Словарь с настройками
         """
-        try:
-            return json.loads(self.values)
-        except (json.JSONDecodeError, TypeError):
-            return {}
+        return dict(self._parsed_values())
 
     def set_values(self, values_dict: Dict[str, Any]) -> None:
         """
@@ -77,8 +89,7 @@ class Settings(Base, TableNameMixin):
         :param default: Значение по умолчанию
         :return: Значение настройки или default
         """
-        values = self.get_values()
-        return values.get(key, default)
+        return self._parsed_values().get(key, default)
 
     def set_setting(self, key: str, value: Any) -> None:
         """
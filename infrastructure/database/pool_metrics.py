@@ -0,0 +1,184 @@
+import asyncio
+import bisect
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from tgbot.services.logger import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы ожидания соединения, мс
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolMetrics:
+    """
+    Метрики пула соединений одного движка БД.
+
+    Накопительные счетчики живут все время работы бота, а гистограмма ожидания и пиковые значения
+    считаются за окно между выводами в лог и сбрасываются методом reset_window
+    """
+
+    def __init__(self, name: str, pool_size: int):
+        self.name = name
+        self.pool_size = pool_size
+
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.pre_ping_failures = 0
+
+        self.checked_out_peak = 0
+        self.overflow_peak = 0
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def observe_wait(self, seconds: float) -> None:
+        wait_ms = seconds * 1000
+        self.wait_histogram[bisect.bisect_left(WAIT_BUCKETS_MS, wait_ms)] += 1
+        self.wait_total_ms += wait_ms
+        self.wait_max_ms = max(self.wait_max_ms, wait_ms)
+
+    def on_checkout(self) -> None:
+        self.checkouts += 1
+        self.checked_out += 1
+        self.checked_out_peak = max(self.checked_out_peak, self.checked_out)
+        self.overflow_peak = max(self.overflow_peak, self.checked_out - self.pool_size)
+
+    def on_checkin(self) -> None:
+        self.checked_out = max(self.checked_out - 1, 0)
+
+    def reset_window(self) -> None:
+        """Сброс гистограммы и пиковых значений для следующего окна."""
+        self.checked_out_peak = self.checked_out
+        self.overflow_peak = max(self.checked_out - self.pool_size, 0)
+        self.wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+
+    def snapshot(self) -> dict:
+        """
+        Текущие значения метрик
+        :return: Словарь метрик
+        """
+        waits = sum(self.wait_histogram)
+        labels = [f"<{bound}" for bound in WAIT_BUCKETS_MS] + [
+            f">={WAIT_BUCKETS_MS[-1]}"
+        ]
+        return {
+            "checked_out": self.checked_out,
+            "checked_out_peak": self.checked_out_peak,
+            "overflow_peak": max(self.overflow_peak, 0),
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "pre_ping_failures": self.pre_ping_failures,
+            "wait_avg_ms": round(self.wait_total_ms / waits, 2) if waits else 0.0,
+            "wait_max_ms": round(self.wait_max_ms, 2),
+            "wait_histogram_ms": dict(zip(labels, self.wait_histogram)),
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания свободного соединения."""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_wait(time.perf_counter() - started_at)
+
+
+# Метрики всех инструментированных пулов по имени движка
+pool_metrics: dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(engine: AsyncEngine, name: str, pool_size: int) -> PoolMetrics:
+    """
+    Подключение метрик к пулу соединений движка через события SQLAlchemy
+    :param engine: Асинхронный движок БД
+    :param name: Имя движка в метриках и логах
+    :param pool_size: Размер пула без учета overflow
+    :return: Метрики пула
+    """
+    metrics = PoolMetrics(name, pool_size)
+    sync_engine = engine.sync_engine
+    pool = sync_engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.metrics = metrics
+
+    @event.listens_for(pool, "connect")
+    def on_connect(dbapi_connection, connection_record):
+        metrics.connects += 1
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.on_checkout()
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        metrics.on_checkin()
+
+    @event.listens_for(pool, "invalidate")
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    @event.listens_for(sync_engine, "handle_error")
+    def on_error(context):
+        if context.is_pre_ping:
+            metrics.pre_ping_failures += 1
+
+    pool_metrics[name] = metrics
+    return metrics
+
+
+class PoolMetricsReporter:
+    """Периодический вывод метрик пулов соединений в лог."""
+
+    def __init__(self, interval: float = 300):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def report(self) -> None:
+        for metrics in pool_metrics.values():
+            logger.info(f"[БД] Пул {metrics.name}: {metrics.snapshot()}")
+            metrics.reset_window()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.report()
+            except Exception as e:
+                logger.error(f"[БД] Ошибка вывода метрик пула: {e}")
+
+    def start(self) -> None:
+        """Запуск периодического вывода метрик."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка вывода метрик с выводом итоговых значений."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.report()
+
+
+pool_metrics_reporter = PoolMetricsReporter()
@@ -6,6 +6,8 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from infrastructure.database.models.STP.employee import Employee
 from infrastructure.database.repo.base import BaseRepo
+from tgbot.services.cache import MISSING
+from tgbot.services.employee_cache import employee_cache
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +46,16 @@ class EmployeeRepo(BaseRepo):
         Returns:
             Объект User или ничего
         """
+        # Поиск по одному user_id или ФИО обслуживается кешем сотрудников
+        cache_field = None
+        if not username and not email and bool(user_id) != bool(fullname):
+            cache_field, cache_value = (
+                ("user_id", user_id) if user_id else ("fullname", fullname)
+            )
+            cached = await employee_cache.get(cache_field, cache_value)
+            if cached is not MISSING:
+                return cached
+
         filters = []
 
         if user_id:
@@ -63,11 +75,15 @@ class EmployeeRepo(BaseRepo):
 
         try:
             result = await self.session.execute(query)
-            return result.scalar_one_or_none()
+            user = result.scalar_one_or_none()
         except SQLAlchemyError as e:
             logger.error(f"[БД] Ошибка получения пользователя: {e}")
             return None
 
+        if cache_field:
+            await employee_cache.set(cache_field, cache_value, user)
+        return user
+
     async def get_users(
         self, roles: Optional[int | list[int]] = None
     ) -> Sequence[Employee] | None:
@@ -102,6 +118,29 @@ class EmployeeRepo(BaseRepo):
             logger.error(f"[БД] Ошибка получения списка пользователей: {e}")
             return None
 
+    async def get_users_by_ids(self, user_ids: Sequence[int]) -> dict[int, Employee]:
+        """
+        Получить пользователей по списку идентификаторов Telegram одним запросом
+
+        Args:
+            user_ids: Список идентификаторов пользователей Telegram
+
+        Returns:
+            Словарь вида {user_id: Employee}. Ненайденные пользователи в словарь не попадают
+        """
+        ids = {user_id for user_id in user_ids if user_id}
+        if not ids:
+            return {}
+
+        query = select(Employee).where(Employee.user_id.in_(ids))
+
+        try:
+            result = await self.session.execute(query)
+            return {user.user_id: user for user in result.scalars().all()}
+        except SQLAlchemyError as e:
+            logger.error(f"[БД] Ошибка получения списка пользователей: {e}")
+            return {}
+
     async def get_unauthorized_users(self, head_name: str = None) -> Sequence[Employee]:
         """
         Получить список неавторизованных пользователей
@@ -143,9 +182,14 @@ class EmployeeRepo(BaseRepo):
 
         # Если пользователь существует - обновляем его
         if user:
+            # Старые значения (например, ФИО) тоже должны уйти из кеша
+            await employee_cache.invalidate(user)
             for key, value in kwargs.items():
                 setattr(user, key, value)
             await self.session.commit()
+            await employee_cache.invalidate(user)
+        else:
+            await employee_cache.invalidate(user_id=user_id)
 
         return user
 
@@ -287,6 +331,7 @@ class EmployeeRepo(BaseRepo):
 
             if deleted_count > 0:
                 await self.session.commit()
+                await employee_cache.invalidate(*users)
                 identifier = f"ФИО {fullname}" if fullname else f"user_id {user_id}"
                 logger.info(
                     f"[БД] Всего удалено {deleted_count} пользователей по {identifier}"
@@ -1,10 +1,63 @@
+from datetime import date, datetime, timedelta
 from typing import Optional, Sequence
 
 import pytz
-from sqlalchemy import and_, select
+from sqlalchemy import and_, delete, insert, select, text, tuple_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from infrastructure.database.models import MessagesPair
+from tgbot.services.cache import MISSING
+from tgbot.services.pairs_cache import pairs_cache
+
+# Размер пачки пар сообщений, удаляемой одним запросом в отдельной транзакции
+DELETE_CHUNK_SIZE = 1000
+
+INSERT_COLUMNS = (
+    "user_chat_id",
+    "user_message_id",
+    "topic_chat_id",
+    "topic_message_id",
+    "topic_thread_id",
+    "question_token",
+    "direction",
+    "created_at",
+)
+
+# Первичный ключ пары
+KEY_COLUMNS = (
+    MessagesPair.user_chat_id,
+    MessagesPair.user_message_id,
+    MessagesPair.created_at,
+)
+
+# Поиск пар ограничивается последними днями, чтобы затрагивать только свежие секции таблицы.
+# Пары старше дня удаляются очисткой, так что окно с запасом покрывает все хранимые пары
+RECENT_PAIRS_DAYS = 2
+
+# Разница между TO_DAYS() в MariaDB и date.toordinal() в Python
+TO_DAYS_OFFSET = 365
+
+PARTITIONS_QUERY = text(
+    """
+    SELECT PARTITION_NAME AS name, PARTITION_DESCRIPTION AS bound
+    FROM information_schema.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE()
+      AND TABLE_NAME = 'messages_pairs'
+      AND PARTITION_NAME IS NOT NULL
+    ORDER BY PARTITION_ORDINAL_POSITION
+    """
+)
+
+
+def _recent_since() -> datetime:
+    return datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")).replace(
+        tzinfo=None
+    ) - timedelta(days=RECENT_PAIRS_DAYS)
+
+
+def _daily_partition(day: date) -> str:
+    next_day = day + timedelta(days=1)
+    return f"PARTITION p{day:%Y%m%d} VALUES LESS THAN (TO_DAYS('{next_day:%Y-%m-%d}'))"
 
 
 class MessagesPairsRepo:
@@ -50,35 +103,71 @@ class MessagesPairsRepo:
 
         self.session.add(connection)
         await self.session.commit()
-        await self.session.flush()
-        await self.session.refresh(connection)
+        # Ключ пары известен до вставки, повторно читать пару из БД не нужно
+        await pairs_cache.set(connection)
         return connection
 
-    async def find_by_user_message(
-        self, user_chat_id: int, user_message_id: int
+    async def add_pairs(self, pairs: Sequence[MessagesPair]) -> int:
+        """
+        Add message connections with a single multi-row INSERT
+
+        Args:
+            pairs: New MessagesPair instances. They are not attached to the session
+
+        Returns:
+            Number of inserted connections
+        """
+        if not pairs:
+            return 0
+
+        rows = [
+            {column: getattr(pair, column) for column in INSERT_COLUMNS}
+            for pair in pairs
+        ]
+        await self.session.execute(insert(MessagesPair), rows)
+        await self.session.commit()
+        return len(rows)
+
+    async def _find_by_message(
+        self, side: str, chat_id: int, message_id: int
     ) -> Optional[MessagesPair]:
-        """Find connection by user chat message"""
-        stmt = select(MessagesPair).where(
-            and_(
-                MessagesPair.user_chat_id == user_chat_id,
-                MessagesPair.user_message_id == user_message_id,
+        cached = await pairs_cache.get(side, chat_id, message_id)
+        if cached is not MISSING:
+            return cached
+
+        if side == "user":
+            criteria = (
+                MessagesPair.user_chat_id == chat_id,
+                MessagesPair.user_message_id == message_id,
+            )
+        else:
+            criteria = (
+                MessagesPair.topic_chat_id == chat_id,
+                MessagesPair.topic_message_id == message_id,
             )
+
+        stmt = select(MessagesPair).where(
+            and_(*criteria, MessagesPair.created_at >= _recent_since())
         )
         result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
+        connection = result.scalar_one_or_none()
+
+        # Отсутствие пары не кешируется: она может быть еще не записана
+        if connection is not None:
+            await pairs_cache.set(connection)
+        return connection
+
+    async def find_by_user_message(
+        self, user_chat_id: int, user_message_id: int
+    ) -> Optional[MessagesPair]:
+        """Find connection by user chat message among recent pairs, cache first"""
+        return await self._find_by_message("user", user_chat_id, user_message_id)
 
     async def find_by_topic_message(
         self, topic_chat_id: int, topic_message_id: int
     ) -> Optional[MessagesPair]:
-        """Find connection by topic message"""
-        stmt = select(MessagesPair).where(
-            and_(
-                MessagesPair.topic_chat_id == topic_chat_id,
-                MessagesPair.topic_message_id == topic_message_id,
-            )
-        )
-        result = await self.session.execute(stmt)
-        return result.scalar_one_or_none()
+        """Find connection by topic message among recent pairs, cache first"""
+        return await self._find_by_message("topic", topic_chat_id, topic_message_id)
 
     async def find_pair_for_edit(
         self, chat_id: int, message_id: int
@@ -103,35 +192,101 @@ class MessagesPairsRepo:
         return connection
 
     async def get_pairs_by_question(self, question_token: str) -> list[MessagesPair]:
-        """Get all message connections for a specific question"""
-        stmt = select(MessagesPair).where(MessagesPair.question_token == question_token)
+        """Get recent message connections for a specific question"""
+        stmt = select(MessagesPair).where(
+            MessagesPair.question_token == question_token,
+            MessagesPair.created_at >= _recent_since(),
+        )
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
-    async def get_old_pairs(self) -> Sequence[MessagesPair]:
+    async def _delete_pairs_chunk(self, criteria: Sequence, limit: int) -> int:
         """
-        Получает пары сообщений старше 1 дня (в связи с невозможностью вернуть вопрос старше дня).
+        Удаляет пачку пар сообщений, подходящих под условия, в отдельной короткой транзакции.
+
+        Args:
+            criteria: Условия отбора пар
+            limit: Максимальный размер пачки
 
         Returns:
-            Sequence[MessagesPair]: Список пар сообщений старше 1 дня
+            int: Количество удаленных пар
         """
-        from datetime import datetime, timedelta
+        keys_stmt = select(*KEY_COLUMNS).where(*criteria).limit(limit)
+        keys = [tuple(row) for row in (await self.session.execute(keys_stmt)).all()]
+        if not keys:
+            return 0
 
-        # Считаем дату день назад
-        today = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
-        two_days_ago = today - timedelta(days=1)
+        result = await self.session.execute(
+            delete(MessagesPair).where(tuple_(*KEY_COLUMNS).in_(keys))
+        )
+        await self.session.commit()
+        return result.rowcount
 
-        stmt = select(MessagesPair).where(MessagesPair.created_at < two_days_ago)
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+    async def delete_pairs_where(
+        self, *criteria, chunk_size: int = DELETE_CHUNK_SIZE
+    ) -> dict:
+        """
+        Удаляет все пары сообщений, подходящие под условия, пачками ограниченного размера.
+        Каждая пачка удаляется одним запросом в своей транзакции.
 
-    async def delete_pairs(self, pairs: Sequence[MessagesPair] = None) -> dict:
+        Args:
+            *criteria: Условия отбора пар, например MessagesPair.created_at < cutoff
+            chunk_size: Максимальный размер пачки
+
+        Returns:
+            dict: Результат операции с ключами success, deleted_count, total_count и errors
         """
-        Удаляет старые пары сообщений из базы данных.
+        deleted_count = 0
+        try:
+            while True:
+                deleted = await self._delete_pairs_chunk(criteria, chunk_size)
+                deleted_count += deleted
+                if deleted < chunk_size:
+                    break
+        except Exception as e:
+            await self.session.rollback()
+            return {
+                "success": False,
+                "deleted_count": deleted_count,
+                "total_count": deleted_count,
+                "errors": [f"Database error: {str(e)}"],
+            }
+
+        return {
+            "success": True,
+            "deleted_count": deleted_count,
+            "total_count": deleted_count,
+            "errors": [],
+        }
+
+    async def delete_pairs_older_than(
+        self, cutoff, chunk_size: int = DELETE_CHUNK_SIZE
+    ) -> dict:
+        """
+        Удаляет пары сообщений, созданные раньше указанного времени, пачками ограниченного размера.
+
+        Args:
+            cutoff: Граница даты создания пары
+            chunk_size: Максимальный размер пачки
+
+        Returns:
+            dict: Результат операции с ключами success, deleted_count, total_count и errors
+        """
+        return await self.delete_pairs_where(
+            MessagesPair.created_at < cutoff, chunk_size=chunk_size
+        )
+
+    async def delete_pairs(
+        self,
+        pairs: Sequence[MessagesPair] = None,
+        chunk_size: int = DELETE_CHUNK_SIZE,
+    ) -> dict:
+        """
+        Удаляет пары сообщений из базы данных пачками по ключу, без загрузки каждой пары в сессию.
 
         Args:
-            pairs (Sequence[QuestionConnection], optional): Последовательность связей для удаления.
-                                                                Если не указано, получает их автоматически.
+            pairs (Sequence[MessagesPair]): Последовательность пар для удаления
+            chunk_size: Максимальный размер пачки
 
         Returns:
             dict: Результат операции с ключами:
@@ -140,50 +295,114 @@ class MessagesPairsRepo:
                 - total_count (int): Общее количество связей для удаления
                 - errors (list): Список ошибок, если они возникли
         """
+        keys = list(
+            dict.fromkeys(
+                (pair.user_chat_id, pair.user_message_id, pair.created_at)
+                for pair in pairs or ()
+            )
+        )
+        await pairs_cache.invalidate(*(pairs or ()))
+        if not keys:
+            return {
+                "success": True,
+                "deleted_count": 0,
+                "total_count": 0,
+                "errors": [],
+            }
+
         deleted_count = 0
-        total_count = 0
         errors = []
+        for offset in range(0, len(keys), chunk_size):
+            chunk = keys[offset : offset + chunk_size]
+            try:
+                deleted_count += await self._delete_pairs_chunk(
+                    [tuple_(*KEY_COLUMNS).in_(chunk)], len(chunk)
+                )
+            except Exception as e:
+                # Откатываем изменения в случае ошибки
+                await self.session.rollback()
+                errors.append(f"Database error: {str(e)}")
 
-        try:
-            total_count = len(pairs)
-
-            if total_count == 0:
-                return {
-                    "success": True,
-                    "deleted_count": 0,
-                    "total_count": 0,
-                    "errors": [],
-                }
-
-            # Удаляем каждую связь
-            for connection in pairs:
-                try:
-                    # Обновляем объект в текущей сессии
-                    await self.session.refresh(connection)
-                    await self.session.delete(connection)
-                    deleted_count += 1
-                except Exception as e:
-                    errors.append(
-                        f"Error deleting connection {connection.id}: {str(e)}"
-                    )
-
-            await self.session.commit()
+        return {
+            "success": deleted_count > 0,
+            "deleted_count": deleted_count,
+            "total_count": len(keys),
+            "errors": errors,
+        }
 
-            return {
-                "success": deleted_count > 0,
-                "deleted_count": deleted_count,
-                "total_count": total_count,
-                "errors": errors,
-            }
+    async def get_partitions(self) -> list[tuple[str, Optional[date]]]:
+        """
+        Получает дневные секции таблицы пар сообщений.
 
-        except Exception as e:
-            # Откатываем изменения в случае ошибки
-            await self.session.rollback()
-            errors.append(f"Database error: {str(e)}")
+        Returns:
+            list: Пары (название секции, дата верхней границы). Для секции MAXVALUE граница - None.
+                Пустой список, если таблица не секционирована
+        """
+        result = await self.session.execute(PARTITIONS_QUERY)
+        return [
+            (
+                row.name,
+                None
+                if row.bound == "MAXVALUE"
+                else date.fromordinal(int(row.bound) - TO_DAYS_OFFSET),
+            )
+            for row in result.all()
+        ]
 
-            return {
-                "success": False,
-                "deleted_count": deleted_count,
-                "total_count": total_count if "total_count" in locals() else 0,
-                "errors": errors,
-            }
+    async def add_daily_partitions(self, until: date) -> list[str]:
+        """
+        Создает дневные секции вплоть до указанной даты, отделяя их от секции MAXVALUE.
+
+        Args:
+            until: Последний день, для которого должна существовать секция
+
+        Returns:
+            list: Названия созданных секций
+        """
+        partitions = await self.get_partitions()
+        bounds = [bound for _, bound in partitions if bound is not None]
+        if not partitions or partitions[-1][1] is not None or not bounds:
+            return []
+
+        first_day = max(bounds)
+        days = [
+            first_day + timedelta(days=offset)
+            for offset in range((until - first_day).days + 1)
+        ]
+        if not days:
+            return []
+
+        definitions = [_daily_partition(day) for day in days]
+        definitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+        await self.session.execute(
+            text(
+                f"ALTER TABLE messages_pairs REORGANIZE PARTITION {partitions[-1][0]} "
+                f"INTO ({', '.join(definitions)})"
+            )
+        )
+        await self.session.commit()
+        return [f"p{day:%Y%m%d}" for day in days]
+
+    async def drop_partitions_before(self, cutoff: date) -> list[str]:
+        """
+        Удаляет секции, все пары в которых созданы раньше указанной даты.
+
+        Args:
+            cutoff: Граница даты создания пар
+
+        Returns:
+            list: Названия удаленных секций
+        """
+        names = [
+            name
+            for name, bound in await self.get_partitions()
+            if bound is not None and bound <= cutoff
+        ]
+        if not names:
+            return []
+
+        await self.session.execute(
+            text(f"ALTER TABLE messages_pairs DROP PARTITION {', '.join(names)}")
+        )
+        await self.session.commit()
+        return names
@@ -1,21 +1,51 @@
+import asyncio
 import logging
 import uuid
+from dataclasses import fields, replace
 from datetime import date, datetime, timedelta
-from typing import Optional, Sequence, TypedDict, Unpack
+from typing import Any, Optional, Sequence, TypedDict, Unpack
 
 import pytz
-from sqlalchemy import and_, extract, func, or_, select
+from sqlalchemy import Row, and_, delete, func, or_, select, tuple_, update
+from sqlalchemy.orm.util import identity_key
 
 from infrastructure.database.models import Question, Employee
 from infrastructure.database.repo.base import BaseRepo
 from tgbot.config import load_config
+from tgbot.services.active_questions import (
+    ACTIVE_STATUSES,
+    ActiveQuestionSnapshot,
+    active_questions_index,
+)
+from tgbot.services.cache import MISSING, TTLCache
 from tgbot.services.logger import setup_logging
+from tgbot.services.question_counters import (
+    local_time,
+    period_bounds,
+    question_counters,
+)
 
 config = load_config(".env")
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Топ специалистов по направлению меняется медленно, поэтому пересчитывается не чаще раза в TOP_USERS_TTL секунд
+TOP_USERS_TTL = 600
+TOP_USERS_BATCH_SIZE = 500
+top_users_cache: TTLCache[list[Employee]] = TTLCache(ttl=TOP_USERS_TTL, maxsize=16)
+_top_users_lock = asyncio.Lock()
+
+# Размер пачки вопросов, удаляемой одним запросом в отдельной транзакции
+DELETE_CHUNK_SIZE = 500
+
+
+# Поля вопроса, хранящиеся в индексе активных вопросов
+SNAPSHOT_FIELDS = frozenset(field.name for field in fields(ActiveQuestionSnapshot))
+
+# Поля вопроса, от которых зависят счетчики вопросов
+COUNTER_FIELDS = frozenset({"employee_userid", "duty_userid", "start_time"})
+
 
 class QuestionUpdateParams(TypedDict, total=False):
     """Доступные параметры для обновления вопроса."""
@@ -35,6 +65,19 @@ class QuestionUpdateParams(TypedDict, total=False):
     activity_status_enabled: bool | None
 
 
+async def _sync_active_index(question: Question = None, removed: Sequence[str] = ()):
+    """Запись изменений вопроса в индекс активных вопросов. Ошибка индекса не должна ломать работу с БД."""
+    try:
+        if question is not None:
+            await active_questions_index.put(question)
+        if removed:
+            await active_questions_index.remove(*removed)
+    except Exception as e:
+        logger.error(
+            f"[Активные вопросы] Ошибка обновления индекса активных вопросов: {e}"
+        )
+
+
 class QuestionsRepo(BaseRepo):
     async def add_question(
         self,
@@ -75,6 +118,8 @@ class QuestionsRepo(BaseRepo):
         self.session.add(question)
         await self.session.commit()
         await self.session.refresh(question)
+        await _sync_active_index(question)
+        await question_counters.add("employee", employee_userid, start_time)
         return question
 
     async def update_question(
@@ -100,12 +145,84 @@ class QuestionsRepo(BaseRepo):
 
         # Если вопрос существует - обновляем его
         if question:
+            before = ActiveQuestionSnapshot.from_question(question)
             for key, value in kwargs.items():
                 setattr(question, key, value)
             await self.session.commit()
+            await _sync_active_index(question)
+            await question_counters.move(before, question)
 
         return question
 
+    async def update_question_where(
+        self,
+        token: str,
+        where: Optional[dict[str, Any]] = None,
+        **values: Unpack[QuestionUpdateParams],
+    ) -> bool:
+        """
+        Обновление вопроса одним запросом UPDATE ... WHERE без предварительного чтения.
+        Условия where позволяют выполнить сравнение с обменом: вопрос обновится, только если его поля
+        все еще имеют ожидаемые значения. Так два дежурных не смогут одновременно взять один вопрос.
+        Индекс активных вопросов и счетчики обновляются по строке, прочитанной после обновления,
+        прежние значения полей счетчиков берутся из where или из загруженного в сессию вопроса
+        :param token: Уникальный токен вопроса
+        :param where: Ожидаемые значения полей, например {"duty_userid": None, "status": "open"}
+        :param values: Новые значения полей
+        :return: True, если вопрос обновлен, иначе False
+        """
+        if not values:
+            return False
+
+        criteria = [Question.token == token]
+        for key, expected in (where or {}).items():
+            column = getattr(Question, key)
+            criteria.append(
+                column.is_(None) if expected is None else column == expected
+            )
+
+        # Значения полей счетчиков до обновления: из условий сравнения или из загруженного в сессию объекта
+        loaded = self.session.identity_map.get(identity_key(Question, token))
+        before_counters = {}
+        for key in COUNTER_FIELDS.intersection(values):
+            if key in (where or {}):
+                before_counters[key] = where[key]
+            elif loaded is not None:
+                before_counters[key] = getattr(loaded, key)
+
+        # Загруженный в сессию объект вопроса обновляется без обращения к БД (synchronize_session="evaluate")
+        result = await self.session.execute(
+            update(Question)
+            .where(*criteria)
+            .values(**values)
+            .execution_options(synchronize_session="evaluate")
+        )
+        await self.session.commit()
+        if not result.rowcount:
+            # evaluate мог изменить загруженный объект, хотя строка в БД не обновилась
+            if loaded is not None:
+                await self.session.refresh(loaded)
+            return False
+
+        if not SNAPSHOT_FIELDS.intersection(values):
+            return True
+
+        # Индекс и счетчики обновляются по строке, прочитанной после обновления
+        question = await self.session.get(Question, token, populate_existing=True)
+        if question is None:
+            await _sync_active_index(removed=[token])
+            return True
+
+        await _sync_active_index(question)
+        after = ActiveQuestionSnapshot.from_question(question)
+        unknown = COUNTER_FIELDS.intersection(values).difference(before_counters)
+        if unknown:
+            logger.warning(
+                f"[Вопрос] Не известны значения {sorted(unknown)} вопроса {token} до обновления, счетчики по ним не изменены"
+            )
+        await question_counters.move(replace(after, **before_counters), after)
+        return True
+
     async def get_question(
         self, token: str = None, group_id: str | int = None, topic_id: int = None
     ) -> Optional[Question]:
@@ -136,6 +253,61 @@ class QuestionsRepo(BaseRepo):
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_active_question_by_employee(
+        self, employee_userid: int
+    ) -> Optional[ActiveQuestionSnapshot | Question]:
+        """
+        Получение активного вопроса специалиста. Сначала ищется в индексе активных вопросов,
+        при промахе или ошибке индекса - в БД, и найденный вопрос возвращается в индекс
+        :param employee_userid: Идентификатор Telegram специалиста
+        :return: Снимок вопроса из индекса, вопрос из БД или None
+        """
+        try:
+            snapshot = await active_questions_index.get_by_employee(employee_userid)
+        except Exception as e:
+            logger.error(
+                f"[Активные вопросы] Ошибка чтения индекса активных вопросов: {e}"
+            )
+            snapshot = None
+        if snapshot is not None:
+            return snapshot
+
+        stmt = (
+            select(Question)
+            .where(
+                Question.employee_userid == employee_userid,
+                Question.status.in_(ACTIVE_STATUSES),
+            )
+            .order_by(Question.start_time.desc())
+            .limit(1)
+        )
+        result = await self.session.execute(stmt)
+        question = result.scalar_one_or_none()
+        if question is not None:
+            logger.warning(
+                f"[Активные вопросы] Вопрос {question.token} специалиста {employee_userid} отсутствовал в индексе, индекс обновлен"
+            )
+            await _sync_active_index(question)
+        return question
+
+    async def get_unassigned_questions(
+        self, started_before: Optional[datetime] = None
+    ) -> Sequence[Question]:
+        """
+        Получение открытых вопросов без дежурного
+        :param started_before: Вернуть только вопросы, открытые раньше указанного времени
+        :return: Последовательность вопросов, отсортированных по времени открытия
+        """
+        stmt = select(Question).where(
+            Question.status == "open", Question.duty_userid.is_(None)
+        )
+        if started_before is not None:
+            stmt = stmt.where(Question.start_time <= started_before)
+        stmt = stmt.order_by(Question.start_time)
+
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
     async def get_questions_by_month(self, month: int, year: int) -> Sequence[Question]:
         """
         Получение вопросов за указанный месяц
@@ -144,9 +316,14 @@ class QuestionsRepo(BaseRepo):
         :param year: Год для фильтрации
         :return: Последовательность вопросов
         """
+        # Диапазон вместо extract(), чтобы запрос мог использовать индекс по start_time
+        month_start = datetime(year, month, 1)
+        next_month_start = (
+            datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+        )
         stmt = select(Question).where(
-            extract("month", Question.start_time) == month,
-            extract("year", Question.start_time) == year,
+            Question.start_time >= month_start,
+            Question.start_time < next_month_start,
         )
 
         result = await self.session.execute(stmt)
@@ -156,76 +333,81 @@ class QuestionsRepo(BaseRepo):
 
         return questions
 
-    async def get_questions_count_today(
-        self, employee_userid: int = None, duty_userid: int = None
+    async def count_questions(
+        self,
+        start: datetime,
+        end: datetime,
+        employee_userid: int = None,
+        duty_userid: int = None,
     ) -> int:
         """
-        Получение кол-ва вопросов специалиста за последний день. Может использоваться как для поиска вопросов специалиста, так и для вопросов дежурного
+        Подсчет вопросов специалиста или дежурного, открытых в указанном промежутке времени
+        :param start: Начало промежутка (включительно)
+        :param end: Конец промежутка (не включительно)
         :param employee_userid: Идентификатор Telegram искомого специалиста
         :param duty_userid: Идентификатор Telegram искомого дежурного
-        :return: Кол-во вопросов за последний день
+        :return: Кол-во вопросов
         """
-        today = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")).date()
-        tomorrow = today + timedelta(days=1)
-
         if employee_userid:
-            stmt = select(func.count(Question.token)).where(
-                and_(
-                    Question.employee_userid == employee_userid,
-                    Question.start_time >= today,
-                    Question.start_time < tomorrow,
-                )
-            )
+            user_filter = Question.employee_userid == employee_userid
         else:
-            stmt = select(func.count(Question.token)).where(
-                and_(
-                    Question.duty_userid == duty_userid,
-                    Question.start_time >= today,
-                    Question.start_time < tomorrow,
-                )
+            user_filter = Question.duty_userid == duty_userid
+
+        stmt = select(func.count(Question.token)).where(
+            and_(
+                user_filter,
+                Question.start_time >= start,
+                Question.start_time < end,
             )
+        )
         result = await self.session.execute(stmt)
         return result.scalar() or 0
 
-    async def get_questions_count_last_month(
-        self, employee_userid: str = None, duty_userid: str = None
+    async def _get_questions_count(
+        self, period: str, employee_userid: int = None, duty_userid: int = None
+    ) -> int:
+        """Получение кол-ва вопросов за текущий период из счетчиков. При промахе счетчик заполняется из БД."""
+        role, user_id = (
+            ("employee", employee_userid) if employee_userid else ("duty", duty_userid)
+        )
+        now = local_time()
+
+        count = await question_counters.get(role, user_id, period, now)
+        if count is not None:
+            return count
+
+        start, end = period_bounds(period, now)
+        count = await self.count_questions(
+            start, end, employee_userid=employee_userid, duty_userid=duty_userid
+        )
+        await question_counters.seed(role, user_id, period, now, count)
+        return count
+
+    async def get_questions_count_today(
+        self, employee_userid: int = None, duty_userid: int = None
     ) -> int:
         """
-        Получение кол-ва вопросов специалиста за последний месяц. Может использоваться как для поиска вопросов специалиста, так и для вопросов дежурного
+        Получение кол-ва вопросов специалиста за текущий день. Может использоваться как для поиска вопросов специалиста, так и для вопросов дежурного
         :param employee_userid: Идентификатор Telegram искомого специалиста
         :param duty_userid: Идентификатор Telegram искомого дежурного
-        :return: Кол-во вопросов за последний месяц
+        :return: Кол-во вопросов за текущий день
         """
-        today = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
-        first_day_current_month = datetime(today.year, today.month, 1).date()
-
-        if today.month == 12:
-            next_month = 1
-            next_year = today.year + 1
-        else:
-            next_month = today.month + 1
-            next_year = today.year
-
-        first_day_next_month = datetime(next_year, next_month, 1).date()
+        return await self._get_questions_count(
+            "day", employee_userid=employee_userid, duty_userid=duty_userid
+        )
 
-        if employee_userid:
-            stmt = select(func.count(Question.token)).where(
-                and_(
-                    Question.employee_userid == employee_userid,
-                    Question.start_time >= first_day_current_month,
-                    Question.start_time < first_day_next_month,
-                )
-            )
-        else:
-            stmt = select(func.count(Question.token)).where(
-                and_(
-                    Question.duty_userid == duty_userid,
-                    Question.start_time >= first_day_current_month,
-                    Question.start_time < first_day_next_month,
-                )
-            )
-        result = await self.session.execute(stmt)
-        return result.scalar() or 0
+    async def get_questions_count_last_month(
+        self, employee_userid: int = None, duty_userid: int = None
+    ) -> int:
+        """
+        Получение кол-ва вопросов специалиста за текущий месяц. Может использоваться как для поиска вопросов специалиста, так и для вопросов дежурного
+        :param employee_userid: Идентификатор Telegram искомого специалиста
+        :param duty_userid: Идентификатор Telegram искомого дежурного
+        :return: Кол-во вопросов за текущий месяц
+        """
+        return await self._get_questions_count(
+            "month", employee_userid=employee_userid, duty_userid=duty_userid
+        )
 
     async def get_last_questions_by_chat_id(
         self, employee_chat_id: int, limit: int = 5
@@ -287,54 +469,56 @@ class QuestionsRepo(BaseRepo):
         self, division: str, main_repo, limit: int = 15
     ) -> Sequence[Employee]:
         """
-        Получение топ-15 пользователей по количеству вопросов в рамках указанного направления
+        Получение топ-15 пользователей по количеству вопросов в рамках указанного направления.
+        Результат кешируется для направления на TOP_USERS_TTL секунд
         :param division: Направление для фильтрации (например, "НЦК")
         :param main_repo: Репозиторий для работы с основной БД (RegisteredUsers)
         :param limit: Лимит пользователей для возврата
         :return: Последовательность из топ-15 пользователей с наибольшим количеством вопросов
         """
-        # Получаем все вопросы
-        stmt = select(Question)
+        cache_key = (division.upper(), limit)
+        cached = top_users_cache.get(cache_key)
+        if cached is not MISSING:
+            return cached
+
+        async with _top_users_lock:
+            # Пока ждали блокировку, топ мог посчитать другой обработчик
+            cached = top_users_cache.get(cache_key)
+            if cached is not MISSING:
+                return cached
+
+            top_users = await self._rank_users_by_division(division, main_repo, limit)
+            top_users_cache.set(cache_key, top_users)
+            return top_users
+
+    async def _rank_users_by_division(
+        self, division: str, main_repo, limit: int
+    ) -> list[Employee]:
+        """Подсчет вопросов по специалистам в БД и отбор лучших специалистов направления."""
+        questions_count = func.count(Question.token)
+        stmt = (
+            select(Question.employee_userid, questions_count)
+            .group_by(Question.employee_userid)
+            .order_by(questions_count.desc(), Question.employee_userid)
+        )
         result = await self.session.execute(stmt)
-        questions = result.scalars().all()
+        ranking = [row.employee_userid for row in result.all()]
 
-        # Словарь для подсчета вопросов по пользователям
-        user_question_counts = {}
-        processed_users = {}  # Кеш для пользователей, чтобы не запрашивать их повторно
+        # Направление хранится в основной БД, поэтому специалистов запрашиваем пачками по рейтингу,
+        # пока не наберется нужное кол-во
+        top_users = []
+        for offset in range(0, len(ranking), TOP_USERS_BATCH_SIZE):
+            user_ids = ranking[offset : offset + TOP_USERS_BATCH_SIZE]
+            users = await main_repo.employee.get_users_by_ids(user_ids)
 
-        for question in questions:
-            try:
-                # Проверяем, есть ли пользователь в кеше
-                if question.employee_userid not in processed_users:
-                    user: Employee = await main_repo.employee.get_user(
-                        user_id=question.employee_userid
-                    )
-                    processed_users[question.employee_userid] = user
-                else:
-                    user: Employee = processed_users[question.employee_userid]
-
-                # Фильтруем по направлению
-                if user and division.upper() in user.division.upper():
-                    if user.fullname not in user_question_counts:
-                        user_question_counts[user.fullname] = {
-                            "user": Employee,
-                            "count": 0,
-                        }
-                    user_question_counts[user.fullname]["count"] += 1
+            for user_id in user_ids:
+                user = users.get(user_id)
+                if user and division.upper() in (user.division or "").upper():
+                    top_users.append(user)
+                    if len(top_users) >= limit:
+                        return top_users
 
-            except Exception as e:
-                logger.warning(
-                    f"Error processing question {question.token} for top users: {e}"
-                )
-                continue
-
-        # Сортируем пользователей по количеству вопросов (по убыванию) и берем топ-15
-        sorted_users = sorted(
-            user_question_counts.values(), key=lambda x: x["count"], reverse=True
-        )[:limit]
-
-        # Возвращаем только объекты User
-        return [user_data["user"] for user_data in sorted_users]
+        return top_users
 
     async def get_old_questions(self) -> Sequence[Question]:
         """
@@ -348,6 +532,138 @@ class QuestionsRepo(BaseRepo):
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
+    async def get_old_questions_chunk(
+        self,
+        old_date: datetime,
+        after: Optional[tuple[datetime, str]] = None,
+        limit: int = 500,
+    ) -> Sequence[Row]:
+        """
+        Получение пачки вопросов старше указанной даты с keyset-пагинацией по (start_time, token).
+        Возвращает только поля, необходимые для удаления топиков
+        :param old_date: Граница даты открытия вопроса
+        :param after: Ключ (start_time, token) последнего вопроса предыдущей пачки
+        :param limit: Размер пачки
+        :return: Последовательность строк (token, group_id, topic_id, start_time)
+        """
+        stmt = select(
+            Question.token, Question.group_id, Question.topic_id, Question.start_time
+        ).where(Question.start_time < old_date)
+        if after is not None:
+            stmt = stmt.where(tuple_(Question.start_time, Question.token) > after)
+        stmt = stmt.order_by(Question.start_time, Question.token).limit(limit)
+
+        result = await self.session.execute(stmt)
+        return result.all()
+
+    async def _delete_questions_chunk(self, criteria: Sequence, limit: int) -> int:
+        """
+        Удаление пачки вопросов, подходящих под условия, в отдельной короткой транзакции
+        :param criteria: Условия отбора вопросов
+        :param limit: Максимальный размер пачки
+        :return: Кол-во удаленных вопросов
+        """
+        stmt = (
+            select(
+                Question.token,
+                Question.employee_userid,
+                Question.duty_userid,
+                Question.start_time,
+            )
+            .where(*criteria)
+            .limit(limit)
+        )
+        rows = (await self.session.execute(stmt)).all()
+        if not rows:
+            return 0
+
+        tokens = [row.token for row in rows]
+        result = await self.session.execute(
+            delete(Question).where(Question.token.in_(tokens))
+        )
+        await self.session.commit()
+
+        await _sync_active_index(removed=tokens)
+        await question_counters.remove_many(rows)
+        return result.rowcount
+
+    async def delete_questions_where(
+        self, *criteria, chunk_size: int = DELETE_CHUNK_SIZE
+    ) -> dict:
+        """
+        Удаление всех вопросов, подходящих под условия, пачками ограниченного размера.
+        Каждая пачка удаляется одним запросом в своей транзакции, чтобы не держать долгие блокировки
+        :param criteria: Условия отбора вопросов, например Question.start_time < cutoff
+        :param chunk_size: Максимальный размер пачки
+        :return: Словарь с результатом удаления
+        """
+        deleted_count = 0
+        try:
+            while True:
+                deleted = await self._delete_questions_chunk(criteria, chunk_size)
+                deleted_count += deleted
+                if deleted < chunk_size:
+                    break
+        except Exception as e:
+            await self.session.rollback()
+            return {
+                "success": False,
+                "deleted_count": deleted_count,
+                "total_count": deleted_count,
+                "errors": [f"Database error: {str(e)}"],
+            }
+
+        return {
+            "success": True,
+            "deleted_count": deleted_count,
+            "total_count": deleted_count,
+            "errors": [],
+        }
+
+    async def delete_questions_older_than(
+        self, cutoff: datetime, chunk_size: int = DELETE_CHUNK_SIZE
+    ) -> dict:
+        """
+        Удаление вопросов, открытых раньше указанного времени, пачками ограниченного размера
+        :param cutoff: Граница времени открытия вопроса
+        :param chunk_size: Максимальный размер пачки
+        :return: Словарь с результатом удаления
+        """
+        return await self.delete_questions_where(
+            Question.start_time < cutoff, chunk_size=chunk_size
+        )
+
+    async def delete_questions_by_tokens(
+        self, tokens: Sequence[str], chunk_size: int = DELETE_CHUNK_SIZE
+    ) -> dict:
+        """
+        Удаление вопросов по списку токенов пачками ограниченного размера.
+        Каждая пачка удаляется одним запросом в своей транзакции
+        :param tokens: Последовательность токенов вопросов
+        :param chunk_size: Максимальный размер пачки
+        :return: Словарь с результатом удаления
+        """
+        tokens = list(dict.fromkeys(tokens))
+        deleted_count = 0
+        errors = []
+
+        for offset in range(0, len(tokens), chunk_size):
+            chunk = tokens[offset : offset + chunk_size]
+            try:
+                deleted_count += await self._delete_questions_chunk(
+                    [Question.token.in_(chunk)], len(chunk)
+                )
+            except Exception as e:
+                await self.session.rollback()
+                errors.append(f"Database error: {str(e)}")
+
+        return {
+            "success": not errors,
+            "deleted_count": deleted_count,
+            "total_count": len(tokens),
+            "errors": errors,
+        }
+
     async def delete_question(
         self, token: str = None, questions: Sequence[Question] = None
     ) -> dict:
@@ -365,50 +681,13 @@ class QuestionsRepo(BaseRepo):
                 "errors": ["Either token or questions must be provided"],
             }
 
-        deleted_count = 0
-        total_count = 0
-        errors = []
-
-        try:
-            if token:
-                question = await self.session.get(Question, token)
-                if question is None:
-                    return {
-                        "success": False,
-                        "deleted_count": 0,
-                        "total_count": 1,
-                        "errors": [f"Question with token {token} not found"],
-                    }
-                await self.session.delete(question)
-                deleted_count = 1
-                total_count = 1
-            else:
-                total_count = len(questions)
-                for question in questions:
-                    try:
-                        await self.session.refresh(question)
-                        await self.session.delete(question)
-                        deleted_count += 1
-                    except Exception as e:
-                        errors.append(
-                            f"Error deleting question {question.token}: {str(e)}"
-                        )
-
-            await self.session.commit()
-
-            return {
-                "success": deleted_count > 0,
-                "deleted_count": deleted_count,
-                "total_count": total_count,
-                "errors": errors,
-            }
-
-        except Exception as e:
-            await self.session.rollback()
-            errors.append(f"Database error: {str(e)}")
-            return {
-                "success": False,
-                "deleted_count": deleted_count,
-                "total_count": total_count if "total_count" in locals() else 0,
-                "errors": errors,
-            }
+        if token:
+            result = await self.delete_questions_by_tokens([token])
+            if result["success"] and not result["deleted_count"]:
+                result["success"] = False
+                result["errors"].append(f"Question with token {token} not found")
+            return result
+
+        result = await self.delete_questions_by_tokens([q.token for q in questions])
+        result["success"] = result["deleted_count"] > 0
+        return result
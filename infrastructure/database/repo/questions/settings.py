@@ -6,11 +6,30 @@ from sqlalchemy import func, select
 
 from infrastructure.database.models.questions.settings import Settings
 from infrastructure.database.repo.base import BaseRepo
+from tgbot.services.cache import MISSING, TTLCache
 from tgbot.services.logger import setup_logging
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Настройки групп меняются редко, а читаются почти в каждом обработчике.
+# TTL ограничивает время жизни устаревших настроек на других репликах бота
+settings_cache: TTLCache[Settings] = TTLCache(ttl=60, maxsize=1024)
+
+
+def _detached_copy(settings: Settings) -> Settings:
+    """Копия настроек, не привязанная к сессии, с уже разобранными значениями."""
+    copy = Settings(
+        id=settings.id,
+        group_id=settings.group_id,
+        group_name=settings.group_name,
+        values=settings.values,
+        last_update=settings.last_update,
+    )
+    copy._parsed_raw = settings.values
+    copy._parsed = settings._parsed_values()
+    return copy
+
 
 class SettingsUpdateParams(TypedDict, total=False):
     """Доступные параметры для обновления настроек."""
@@ -42,6 +61,7 @@ class SettingsRepo(BaseRepo):
 
         self.session.add(settings)
         await self.session.commit()
+        settings_cache.invalidate(group_id)
         await self.session.refresh(settings)
 
         logger.info(f"Settings created for group {group_id}")
@@ -49,14 +69,43 @@ class SettingsRepo(BaseRepo):
 
     async def get_settings_by_group_id(self, group_id: int) -> Optional[Settings]:
         """
-        Получение настроек по ID группы
+        Получение настроек по ID группы. Настройки читаются из кеша, возвращается копия,
+        не привязанная к сессии - для изменения настроек используются методы update_*
         :param group_id: ID группы Telegram
         :return: Объект Settings или None, если не найден
         """
+        cached = settings_cache.get(group_id)
+        if cached is not MISSING:
+            return _detached_copy(cached)
+
+        settings = await self._select_by_group_id(group_id)
+        if settings is None:
+            return None
+
+        cached = _detached_copy(settings)
+        settings_cache.set(group_id, cached)
+        return _detached_copy(cached)
+
+    async def _select_by_group_id(self, group_id: int) -> Optional[Settings]:
         stmt = select(Settings).where(Settings.group_id == group_id)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
 
+    async def get_settings_by_group_ids(
+        self, group_ids: Sequence[int]
+    ) -> Sequence[Settings]:
+        """
+        Получение настроек нескольких групп одним запросом
+        :param group_ids: Список ID групп Telegram
+        :return: Список найденных Settings
+        """
+        if not group_ids:
+            return []
+
+        stmt = select(Settings).where(Settings.group_id.in_(set(group_ids)))
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
     async def get_settings_by_id(self, settings_id: int) -> Optional[Settings]:
         """
         Получение настроек по ID записи
@@ -83,7 +132,7 @@ class SettingsRepo(BaseRepo):
         :param values: Новые значения настроек
         :return: Обновленный объект Settings или None, если не найден
         """
-        settings = await self.get_settings_by_group_id(group_id)
+        settings = await self._select_by_group_id(group_id)
         if settings is None:
             return None
 
@@ -91,6 +140,7 @@ class SettingsRepo(BaseRepo):
         settings.last_update = func.now()
 
         await self.session.commit()
+        settings_cache.invalidate(group_id)
         await self.session.refresh(settings)
 
         logger.info(f"[Настройки] Изменены настройки для группы {group_id}")
@@ -106,7 +156,7 @@ class SettingsRepo(BaseRepo):
         :param value: Новое значение
         :return: Обновленный объект Settings или None, если не найден
         """
-        settings = await self.get_settings_by_group_id(group_id)
+        settings = await self._select_by_group_id(group_id)
         if settings is None:
             return None
 
@@ -114,6 +164,7 @@ class SettingsRepo(BaseRepo):
         settings.last_update = func.now()
 
         await self.session.commit()
+        settings_cache.invalidate(group_id)
         await self.session.refresh(settings)
 
         logger.info(f"Setting '{key}' updated for group {group_id}")
@@ -148,7 +199,7 @@ class SettingsRepo(BaseRepo):
         :return: Словарь с результатом удаления
         """
         try:
-            settings = await self.get_settings_by_group_id(group_id)
+            settings = await self._select_by_group_id(group_id)
             if settings is None:
                 return {
                     "success": False,
@@ -158,6 +209,7 @@ class SettingsRepo(BaseRepo):
 
             await self.session.delete(settings)
             await self.session.commit()
+            settings_cache.invalidate(group_id)
 
             logger.info(f"Settings deleted for group {group_id}")
             return {
@@ -196,26 +248,43 @@ class SettingsRepo(BaseRepo):
         self, group_ids: Sequence[int], key: str, value: Any
     ) -> dict:
         """
-        Массовое обновление настройки для нескольких групп
+        Массовое обновление настройки для нескольких групп.
+        Настройки загружаются одним запросом и сохраняются одной транзакцией
         :param group_ids: Список ID групп
         :param key: Ключ настройки
         :param value: Новое значение
         :return: Словарь с результатом операции
         """
+        group_ids = list(dict.fromkeys(group_ids))
         updated_count = 0
         errors = []
 
         try:
+            stmt = select(Settings).where(Settings.group_id.in_(group_ids))
+            found = {
+                settings.group_id: settings
+                for settings in (await self.session.execute(stmt)).scalars().all()
+            }
+
             for group_id in group_ids:
+                settings = found.get(group_id)
+                if settings is None:
+                    errors.append(f"Settings for group {group_id} not found")
+                    continue
                 try:
-                    result = await self.update_setting(group_id, key, value)
-                    if result:
-                        updated_count += 1
-                    else:
-                        errors.append(f"Settings for group {group_id} not found")
+                    settings.set_setting(key, value)
+                    settings.last_update = func.now()
+                    updated_count += 1
                 except Exception as e:
                     errors.append(f"Error updating group {group_id}: {str(e)}")
 
+            # Все изменения записываются одной транзакцией
+            await self.session.commit()
+            settings_cache.invalidate(*found)
+
+            logger.info(
+                f"[Настройки] Настройка '{key}' изменена для {updated_count} из {len(group_ids)} групп"
+            )
             return {
                 "success": updated_count > 0,
                 "updated_count": updated_count,
@@ -229,7 +298,7 @@ class SettingsRepo(BaseRepo):
             logger.error(f"Error in bulk update: {error_msg}")
             return {
                 "success": False,
-                "updated_count": updated_count,
+                "updated_count": 0,
                 "total_count": len(group_ids),
                 "errors": [error_msg],
             }
@@ -1,14 +1,24 @@
+from typing import Optional
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
-from tgbot.config import DbConfig
+from infrastructure.database.pool_metrics import (
+    InstrumentedQueuePool,
+    instrument_engine,
+)
+from tgbot.config import DbConfig, DbPoolConfig
 
 
-def create_engine(db: DbConfig, db_name: str, echo=False):
+def create_engine(
+    db: DbConfig, db_name: str, echo=False, pool: Optional[DbPoolConfig] = None
+):
+    pool = pool or db.pool_for(db_name)
     engine = create_async_engine(
         db.construct_sqlalchemy_url(db_name),
         query_cache_size=1200,
-        pool_size=20,
-        max_overflow=200,
+        poolclass=InstrumentedQueuePool,
+        pool_size=pool.pool_size,
+        max_overflow=pool.max_overflow,
         future=True,
         echo=echo,
         connect_args={
@@ -18,11 +28,12 @@ def create_engine(db: DbConfig, db_name: str, echo=False):
             "sql_mode": "TRADITIONAL",
             "connect_timeout": 30,
         },
-        pool_pre_ping=True,
-        pool_recycle=1800,
-        pool_timeout=30,
+        pool_pre_ping=pool.pool_pre_ping,
+        pool_recycle=pool.pool_recycle,
+        pool_timeout=pool.pool_timeout,
         pool_reset_on_return="commit",
     )
+    instrument_engine(engine, db_name, pool.pool_size)
     return engine
 
 
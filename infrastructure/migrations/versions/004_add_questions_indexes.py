@@ -0,0 +1,63 @@
+"""Add indexes for hot questions queries
+
+Revision ID: 004_add_questions_indexes
+Revises: 003_create_settings
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "004_add_questions_indexes"
+down_revision: Union[str, None] = "003_create_settings"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Название индекса -> колонки. Порядок колонок повторяет фильтры запросов QuestionsRepo
+QUESTIONS_INDEXES = {
+    # get_question(group_id, topic_id), фильтры активного вопроса в топике
+    "ix_questions_group_topic": ["group_id", "topic_id"],
+    # get_active_questions, get_unassigned_questions
+    "ix_questions_status_duty": ["status", "duty_userid"],
+    # get_questions_count_today/last_month по специалисту
+    "ix_questions_employee_start": ["employee_userid", "start_time"],
+    # get_questions_count_today/last_month по дежурному
+    "ix_questions_duty_start": ["duty_userid", "start_time"],
+    # get_last_questions_by_chat_id
+    "ix_questions_employee_status_end": ["employee_userid", "status", "end_time"],
+    # get_available_to_return_questions
+    "ix_questions_status_end": ["status", "end_time"],
+    # get_old_questions_chunk, get_questions_by_month
+    "ix_questions_start_token": ["start_time", "token"],
+}
+
+
+def upgrade() -> None:
+    # Unicode(5000) нельзя проиндексировать целиком, а статусы - короткие строки
+    op.alter_column(
+        "questions",
+        "status",
+        existing_type=sa.Unicode(5000),
+        type_=sa.Unicode(32),
+        existing_nullable=True,
+    )
+
+    for name, columns in QUESTIONS_INDEXES.items():
+        op.create_index(name, "questions", columns)
+
+
+def downgrade() -> None:
+    for name in reversed(QUESTIONS_INDEXES):
+        op.drop_index(name, table_name="questions")
+
+    op.alter_column(
+        "questions",
+        "status",
+        existing_type=sa.Unicode(32),
+        type_=sa.Unicode(5000),
+        existing_nullable=True,
+    )
@@ -0,0 +1,65 @@
+"""Partition messages_pairs by day
+
+Revision ID: 005_partition_messages_pairs
+Revises: 004_add_questions_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Sequence, Union
+
+import pytz
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "005_partition_messages_pairs"
+down_revision: Union[str, None] = "004_add_questions_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Кол-во дневных секций, создаваемых заранее. Дальше секции добавляет бот (tgbot.services.cleanup)
+DAYS_AHEAD = 7
+
+
+def _daily_partition(day: date) -> str:
+    next_day = day + timedelta(days=1)
+    return f"PARTITION p{day:%Y%m%d} VALUES LESS THAN (TO_DAYS('{next_day:%Y-%m-%d}'))"
+
+
+def upgrade() -> None:
+    # Поиск по времени заменяется отсечением секций, поиск по вопросу бот не использует
+    op.drop_index("ix_messages_pairs_created_at", table_name="messages_pairs")
+    op.drop_index("ix_messages_pairs_question_token", table_name="messages_pairs")
+
+    # Ключ секционирования должен входить в первичный ключ
+    op.execute(
+        "ALTER TABLE messages_pairs DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)"
+    )
+
+    # created_at хранится по времени Екатеринбурга, как и секции, которые создает бот
+    today = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")).date()
+    partitions = [
+        # Все накопленные пары попадают в одну секцию и удаляются при первой очистке
+        f"PARTITION p_history VALUES LESS THAN (TO_DAYS('{today - timedelta(days=1):%Y-%m-%d}'))",
+        *(
+            _daily_partition(today + timedelta(days=offset))
+            for offset in range(-1, DAYS_AHEAD + 1)
+        ),
+        "PARTITION pmax VALUES LESS THAN MAXVALUE",
+    ]
+    op.execute(
+        "ALTER TABLE messages_pairs PARTITION BY RANGE (TO_DAYS(created_at)) ("
+        + ", ".join(partitions)
+        + ")"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE messages_pairs REMOVE PARTITIONING")
+    op.execute("ALTER TABLE messages_pairs DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+
+    op.create_index(
+        "ix_messages_pairs_question_token", "messages_pairs", ["question_token"]
+    )
+    op.create_index("ix_messages_pairs_created_at", "messages_pairs", ["created_at"])
@@ -0,0 +1,51 @@
+"""Key messages_pairs by user message instead of autoincrement id
+
+Revision ID: 006_key_messages_pairs_by_message
+Revises: 005_partition_messages_pairs
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "006_key_messages_pairs_by_message"
+down_revision: Union[str, None] = "005_partition_messages_pairs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Сообщение специалиста пересылается один раз, поэтому повторы могли появиться только из-за дублей апдейтов.
+    # Оставляем первую пару, иначе новый первичный ключ не создать
+    op.execute(
+        "DELETE newer FROM messages_pairs newer "
+        "JOIN messages_pairs older "
+        "ON newer.user_chat_id = older.user_chat_id "
+        "AND newer.user_message_id = older.user_message_id "
+        "AND newer.created_at = older.created_at "
+        "AND newer.id > older.id"
+    )
+
+    # Поиск по сообщению специалиста идет по первичному ключу, отдельный индекс для него не нужен.
+    # Поиск по сообщению в топике остается на индексе ix_messages_pairs_topic_chat_message
+    op.execute(
+        "ALTER TABLE messages_pairs DROP PRIMARY KEY, DROP COLUMN id, "
+        "ADD PRIMARY KEY (user_chat_id, user_message_id, created_at)"
+    )
+    op.drop_index("ix_messages_pairs_user_chat_message", table_name="messages_pairs")
+
+
+def downgrade() -> None:
+    op.create_index(
+        "ix_messages_pairs_user_chat_message",
+        "messages_pairs",
+        ["user_chat_id", "user_message_id"],
+    )
+    op.execute(
+        "ALTER TABLE messages_pairs DROP PRIMARY KEY, "
+        "ADD COLUMN id BIGINT NOT NULL AUTO_INCREMENT FIRST, "
+        "ADD PRIMARY KEY (id, created_at)"
+    )
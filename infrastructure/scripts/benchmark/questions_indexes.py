@@ -0,0 +1,259 @@
+"""
+Бенчмарк горячих запросов таблицы questions до и после создания индексов миграции 004.
+
+Скрипт создает таблицу questions в отдельной БД, заполняет ее реалистичными данными,
+замеряет задержку методов QuestionsRepo без вторичных индексов, создает индексы
+и повторяет замеры. Для каждого запроса также выводится план выполнения (EXPLAIN).
+
+Запуск из корня проекта (нужен .env с доступом к серверу БД):
+    python -m infrastructure.scripts.benchmark.questions_indexes --database questioner_benchmark --rows 1000000
+
+ВНИМАНИЕ: таблица questions в указанной БД будет пересоздана. Не запускать на рабочей БД вопросника
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytz
+from sqlalchemy import MetaData, Table, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from infrastructure.database.models import Question
+from infrastructure.database.repo.questions.questions import QuestionsRepo
+from infrastructure.database.setup import create_engine, create_session_pool
+from tgbot.config import load_config
+from tgbot.services.question_counters import local_time, period_bounds
+
+GROUPS = [-1001000000001, -1001000000002, -1001000000003, -1001000000004]
+EMPLOYEES = 3000
+DUTIES = 300
+ACTIVE_QUESTIONS = 300
+HISTORY_DAYS = 365
+INSERT_BATCH = 10_000
+
+
+def build_row(index: int, now: datetime) -> dict:
+    start_time = now - timedelta(seconds=random.randint(0, HISTORY_DAYS * 86400))
+    active = index < ACTIVE_QUESTIONS
+    status = random.choice(["open", "in_progress"]) if active else "closed"
+    duty_userid = (
+        None if status == "open" else 2_000_000_000 + random.randint(1, DUTIES)
+    )
+
+    return {
+        "token": str(uuid.uuid4()),
+        "group_id": random.choice(GROUPS),
+        "topic_id": index + 1,
+        "duty_userid": duty_userid,
+        "employee_userid": 1_000_000_000 + random.randint(1, EMPLOYEES),
+        "question_text": "Тестовый вопрос " * random.randint(1, 20),
+        "start_time": start_time,
+        "end_time": None
+        if active
+        else start_time + timedelta(minutes=random.randint(1, 120)),
+        "clever_link": "https://clever.ertelecom.ru/content/space/4/article/0",
+        "quality_duty": None,
+        "quality_employee": None,
+        "status": status,
+        "allow_return": True,
+        "activity_status_enabled": None,
+    }
+
+
+def table_without_indexes() -> Table:
+    """Копия таблицы questions без вторичных индексов."""
+    table = Question.__table__.to_metadata(MetaData())
+    table.indexes.clear()
+    return table
+
+
+async def seed(engine: AsyncEngine, rows: int) -> None:
+    table = table_without_indexes()
+    now = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")).replace(tzinfo=None)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(table.drop, checkfirst=True)
+        await conn.run_sync(table.create)
+
+    started_at = time.perf_counter()
+    for offset in range(0, rows, INSERT_BATCH):
+        batch = [
+            build_row(index, now)
+            for index in range(offset, min(offset + INSERT_BATCH, rows))
+        ]
+        async with engine.begin() as conn:
+            await conn.execute(table.insert(), batch)
+        print(f"Заполнено {offset + len(batch)} из {rows} строк", end="\r")
+
+    print(
+        f"\nТаблица заполнена за {time.perf_counter() - started_at:.1f} с ({rows} строк)"
+    )
+
+
+async def create_indexes(engine: AsyncEngine) -> None:
+    started_at = time.perf_counter()
+    async with engine.begin() as conn:
+        for index in Question.__table__.indexes:
+            await conn.run_sync(index.create)
+        await conn.execute(text("ANALYZE TABLE questions"))
+    print(f"Индексы созданы за {time.perf_counter() - started_at:.1f} с")
+
+
+async def sample_keys(engine: AsyncEngine) -> dict:
+    async with engine.connect() as conn:
+        row = (
+            await conn.execute(
+                text(
+                    "SELECT group_id, topic_id, employee_userid, duty_userid "
+                    "FROM questions WHERE duty_userid IS NOT NULL LIMIT 1"
+                )
+            )
+        ).one()
+    return {
+        "group_id": row.group_id,
+        "topic_id": row.topic_id,
+        "employee_userid": row.employee_userid,
+        "duty_userid": row.duty_userid,
+    }
+
+
+def repo_calls(keys: dict) -> dict:
+    """Методы QuestionsRepo, вызываемые на горячих путях бота."""
+    now = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
+    old_date = now - timedelta(days=HISTORY_DAYS // 2)
+    day_start, day_end = period_bounds("day", local_time(now))
+    month_start, month_end = period_bounds("month", local_time(now))
+
+    return {
+        "get_question(group_id, topic_id)": lambda repo: repo.get_question(
+            group_id=keys["group_id"], topic_id=keys["topic_id"]
+        ),
+        "get_active_questions": lambda repo: repo.get_active_questions(),
+        "get_unassigned_questions": lambda repo: repo.get_unassigned_questions(),
+        # Подсчет напрямую в БД: счетчики вопросов в боте закешированы
+        "count_questions(employee, day)": lambda repo: repo.count_questions(
+            day_start, day_end, employee_userid=keys["employee_userid"]
+        ),
+        "count_questions(duty, day)": lambda repo: repo.count_questions(
+            day_start, day_end, duty_userid=keys["duty_userid"]
+        ),
+        "count_questions(employee, month)": lambda repo: repo.count_questions(
+            month_start, month_end, employee_userid=keys["employee_userid"]
+        ),
+        "count_questions(duty, month)": lambda repo: repo.count_questions(
+            month_start, month_end, duty_userid=keys["duty_userid"]
+        ),
+        "get_last_questions_by_chat_id": lambda repo: (
+            repo.get_last_questions_by_chat_id(keys["employee_userid"])
+        ),
+        "get_available_to_return_questions": lambda repo: (
+            repo.get_available_to_return_questions()
+        ),
+        "get_questions_by_month": lambda repo: repo.get_questions_by_month(
+            now.month, now.year
+        ),
+        "get_old_questions_chunk": lambda repo: repo.get_old_questions_chunk(
+            old_date=old_date
+        ),
+    }
+
+
+async def measure(session_pool, calls: dict, repeats: int) -> dict:
+    results = {}
+    for name, call in calls.items():
+        timings = []
+        for _ in range(repeats):
+            async with session_pool() as session:
+                repo = QuestionsRepo(session)
+                started_at = time.perf_counter()
+                await call(repo)
+                timings.append((time.perf_counter() - started_at) * 1000)
+        results[name] = {
+            "p50": statistics.median(timings),
+            "max": max(timings),
+        }
+    return results
+
+
+async def explain(engine: AsyncEngine, session_pool, calls: dict) -> None:
+    """Выводит планы выполнения: перехватывает запросы репозитория и выполняет для них EXPLAIN."""
+    for name, call in calls.items():
+        statements = []
+        async with session_pool() as session:
+            execute = session.execute
+
+            async def capture(statement, *args, **kwargs):
+                statements.append(statement)
+                return await execute(statement, *args, **kwargs)
+
+            session.execute = capture
+            await call(QuestionsRepo(session))
+
+        async with engine.connect() as conn:
+            for statement in statements:
+                compiled = statement.compile(dialect=engine.dialect)
+                params = tuple(compiled.params[key] for key in compiled.positiontup)
+                plan = await conn.exec_driver_sql(f"EXPLAIN {compiled}", params)
+                for row in plan.mappings():
+                    print(
+                        f"  {name}: type={row['type']} key={row['key']} rows={row['rows']}"
+                    )
+
+
+def report(before: dict, after: dict) -> None:
+    print(
+        f"\n{'Метод':<45}{'до, мс (p50/max)':>22}{'после, мс (p50/max)':>24}{'ускорение':>12}"
+    )
+    for name in before:
+        b, a = before[name], after[name]
+        speedup = b["p50"] / a["p50"] if a["p50"] else float("inf")
+        print(
+            f"{name:<45}{b['p50']:>11.2f}/{b['max']:<10.2f}{a['p50']:>13.2f}/{a['max']:<10.2f}{speedup:>10.1f}x"
+        )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--database",
+        required=True,
+        help="Отдельная БД для бенчмарка на сервере из .env",
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    db_config = load_config(".env").db
+    if args.database == db_config.questioner_db:
+        parser.error("Нельзя запускать бенчмарк на рабочей БД вопросника")
+
+    engine = create_engine(db_config, args.database)
+    session_pool = create_session_pool(engine)
+
+    try:
+        await seed(engine, args.rows)
+
+        calls = repo_calls(await sample_keys(engine))
+
+        print("\nПланы без индексов:")
+        await explain(engine, session_pool, calls)
+        before = await measure(session_pool, calls, args.repeats)
+
+        await create_indexes(engine)
+
+        print("\nПланы с индексами:")
+        await explain(engine, session_pool, calls)
+        after = await measure(session_pool, calls, args.repeats)
+
+        report(before, after)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
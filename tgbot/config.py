@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
 from environs import Env
@@ -110,6 +110,48 @@ class QuestionerConfig:
         )
 
 
+@dataclass
+class DbPoolConfig:
+    """
+    Класс конфигурации пула соединений одного движка БД.
+
+    Attributes
+    ----------
+    pool_size : int
+        Кол-во постоянно открытых соединений.
+    max_overflow : int
+        Кол-во соединений, открываемых сверх pool_size при нехватке.
+    pool_timeout : int
+        Время ожидания свободного соединения в секундах.
+    pool_recycle : int
+        Время жизни соединения в секундах.
+    pool_pre_ping : bool
+        Проверять ли соединение перед выдачей из пула.
+    """
+
+    pool_size: int = 20
+    max_overflow: int = 200
+    pool_timeout: int = 30
+    pool_recycle: int = 1800
+    pool_pre_ping: bool = True
+
+    @staticmethod
+    def from_env(env: Env, prefix: str):
+        """
+        Создает объект DbPoolConfig из переменных окружения с префиксом движка.
+        Незаданные переменные принимают значения по умолчанию.
+        """
+        defaults = DbPoolConfig()
+
+        return DbPoolConfig(
+            pool_size=env.int(f"{prefix}_POOL_SIZE", defaults.pool_size),
+            max_overflow=env.int(f"{prefix}_POOL_MAX_OVERFLOW", defaults.max_overflow),
+            pool_timeout=env.int(f"{prefix}_POOL_TIMEOUT", defaults.pool_timeout),
+            pool_recycle=env.int(f"{prefix}_POOL_RECYCLE", defaults.pool_recycle),
+            pool_pre_ping=env.bool(f"{prefix}_POOL_PRE_PING", defaults.pool_pre_ping),
+        )
+
+
 @dataclass
 class DbConfig:
     """
@@ -128,6 +170,10 @@ class DbConfig:
         Имя основной базы данных.
     questioner_db : str
         Имя базы данных вопросника.
+    main_pool : DbPoolConfig
+        Настройки пула соединений основной базы данных.
+    questioner_pool : DbPoolConfig
+        Настройки пула соединений базы данных вопросника.
     """
 
     host: str
@@ -137,6 +183,19 @@ class DbConfig:
     main_db: str
     questioner_db: str
 
+    main_pool: DbPoolConfig = field(default_factory=DbPoolConfig)
+    questioner_pool: DbPoolConfig = field(default_factory=DbPoolConfig)
+
+    def pool_for(self, db_name: str) -> DbPoolConfig:
+        """
+        Возвращает настройки пула соединений для базы данных по ее имени
+        """
+        if db_name == self.main_db:
+            return self.main_pool
+        if db_name == self.questioner_db:
+            return self.questioner_pool
+        return DbPoolConfig()
+
     def construct_sqlalchemy_url(
         self,
         db_name=None,
@@ -181,6 +240,8 @@ class DbConfig:
             password=password,
             main_db=main_db,
             questioner_db=questioner_db,
+            main_pool=DbPoolConfig.from_env(env, "MAIN_DB"),
+            questioner_pool=DbPoolConfig.from_env(env, "QUESTIONS_DB"),
         )
 
 
@@ -233,6 +294,62 @@ class RedisConfig:
         )
 
 
+@dataclass
+class RateLimitConfig:
+    """
+    Класс конфигурации лимитов исходящих запросов к Bot API.
+
+    Attributes
+    ----------
+    global_rate : float
+        Запросов в секунду на всего бота.
+    private_rate : float
+        Сообщений в секунду в один личный чат.
+    private_burst : float
+        Сколько сообщений в личный чат можно отправить разом.
+    topic_rate : float
+        Запросов в секунду в один топик форума.
+    topic_burst : float
+        Сколько запросов в топик можно отправить разом.
+    group_per_minute : float
+        Сообщений в минуту в одну группу, на все ее топики вместе.
+    group_burst : float
+        Сколько сообщений в группу можно отправить разом.
+    aging : float
+        Через сколько секунд ожидания запрос поднимается на один уровень приоритета.
+    """
+
+    global_rate: float = 30
+    private_rate: float = 1
+    private_burst: float = 3
+    topic_rate: float = 1
+    topic_burst: float = 3
+    group_per_minute: float = 20
+    group_burst: float = 20
+    aging: float = 5
+
+    @staticmethod
+    def from_env(env: Env):
+        """
+        Создает объект RateLimitConfig из переменных окружения.
+        Незаданные переменные принимают значения по умолчанию.
+        """
+        defaults = RateLimitConfig()
+
+        return RateLimitConfig(
+            global_rate=env.float("RATE_LIMIT_GLOBAL_RATE", defaults.global_rate),
+            private_rate=env.float("RATE_LIMIT_PRIVATE_RATE", defaults.private_rate),
+            private_burst=env.float("RATE_LIMIT_PRIVATE_BURST", defaults.private_burst),
+            topic_rate=env.float("RATE_LIMIT_TOPIC_RATE", defaults.topic_rate),
+            topic_burst=env.float("RATE_LIMIT_TOPIC_BURST", defaults.topic_burst),
+            group_per_minute=env.float(
+                "RATE_LIMIT_GROUP_PER_MINUTE", defaults.group_per_minute
+            ),
+            group_burst=env.float("RATE_LIMIT_GROUP_BURST", defaults.group_burst),
+            aging=env.float("RATE_LIMIT_AGING", defaults.aging),
+        )
+
+
 @dataclass
 class Config:
     """
@@ -248,6 +365,8 @@ class Config:
         Хранит специфичные для базы данных настройки (стандартно None).
     redis : Optional[RedisConfig]
         Хранит специфичные для Redis настройки (стандартно None).
+    rate_limit : RateLimitConfig
+        Хранит лимиты исходящих запросов к Bot API.
     """
 
     tg_bot: TgBot
@@ -255,6 +374,7 @@ class Config:
     questioner: QuestionerConfig
     db: DbConfig
     redis: Optional[RedisConfig] = None
+    rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
 
 
 def load_config(path: str = None) -> Config:
@@ -276,4 +396,5 @@ def load_config(path: str = None) -> Config:
         questioner=QuestionerConfig.from_env(env),
         db=DbConfig.from_env(env),
         redis=RedisConfig.from_env(env),
+        rate_limit=RateLimitConfig.from_env(env),
     )
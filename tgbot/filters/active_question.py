@@ -2,9 +2,7 @@ import logging
 
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
-from sqlalchemy import Sequence
 
-from infrastructure.database.models import Question
 from infrastructure.database.repo.questions.requests import QuestionsRequestsRepo
 from tgbot.services.logger import setup_logging
 
@@ -27,19 +25,17 @@ class ActiveQuestion(BaseFilter):
         if obj.chat.type != "private":
             return False
 
-        active_questions: Sequence[
-            Question
-        ] = await questions_repo.questions.get_active_questions()
+        question = await questions_repo.questions.get_active_question_by_employee(
+            obj.from_user.id
+        )
+        if question:
+            active_question_token = question.token
 
-        for question in active_questions:
-            if question.employee_userid == obj.from_user.id:
-                active_question_token = question.token
+            logger.info(
+                f"[Активные вопросы] Найден активный вопрос с токеном {active_question_token} у специалиста {obj.from_user.id}"
+            )
 
-                logger.info(
-                    f"[Активные вопросы] Найден активный вопрос с токеном {active_question_token} у специалиста {obj.from_user.id}"
-                )
-
-                return {"active_question_token": active_question_token}
+            return {"active_question_token": active_question_token}
 
         logger.info(
             f"[Активные вопросы] Не найдено активных вопросов у специалиста {obj.from_user.id}"
@@ -61,19 +57,17 @@ class ActiveQuestionWithCommand(BaseFilter):
             if not obj.text or not obj.text.startswith(f"/{self.command}"):
                 return False
 
-            current_questions: Sequence[
-                Question
-            ] = await questions_repo.questions.get_active_questions()
-
-            for question in current_questions:
-                if question.employee_userid == obj.from_user.id:
-                    active_question_token = question.token
+            question = await questions_repo.questions.get_active_question_by_employee(
+                obj.from_user.id
+            )
+            if question:
+                active_question_token = question.token
 
-                    logger.info(
-                        f"[Активные вопросы] Найден активный вопрос с токеном {active_question_token} у специалиста {obj.from_user.id}"
-                    )
+                logger.info(
+                    f"[Активные вопросы] Найден активный вопрос с токеном {active_question_token} у специалиста {obj.from_user.id}"
+                )
 
-                    return {"active_question_token": active_question_token}
+                return {"active_question_token": active_question_token}
 
             return False
         logger.info(
@@ -37,11 +37,11 @@ async def admin_start(
     questions_repo: QuestionsRequestsRepo,
 ) -> None:
     employee_topics_today = await questions_repo.questions.get_questions_count_today(
-        employee_userid=user.fullname
+        employee_userid=user.user_id
     )
     employee_topics_month = (
         await questions_repo.questions.get_questions_count_last_month(
-            employee_userid=user.fullname
+            employee_userid=user.user_id
         )
     )
 
@@ -31,9 +31,10 @@ from tgbot.keyboards.user.main import (
     activity_status_toggle_kb,
     finish_question_kb,
 )
-from tgbot.middlewares.MessagePairingMiddleware import store_message_connection
+from tgbot.middlewares.MessagePairingMiddleware import store_message_connections
 from tgbot.misc.helpers import check_premium_emoji, short_name
 from tgbot.services.logger import setup_logging
+from tgbot.services.media_groups import media_group_buffer, relay_messages
 from tgbot.services.scheduler import (
     restart_inactivity_timer,
     run_delete_timer,
@@ -47,6 +48,31 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
+def topic_to_user_pairs(
+    question: Question, messages: list[Message], copied_message_ids: list[int | None]
+) -> list[MessagesPair]:
+    """
+    Пары сообщений топика и их копий в чате специалиста
+    :param question: Вопрос
+    :param messages: Сообщения топика
+    :param copied_message_ids: Идентификаторы копий в порядке сообщений топика
+    :return: Список пар для сохранения
+    """
+    return [
+        MessagesPair(
+            user_chat_id=question.employee_userid,
+            user_message_id=copied_message_id,
+            topic_chat_id=question.group_id,
+            topic_message_id=source.message_id,
+            topic_thread_id=question.topic_id,
+            question_token=question.token,
+            direction="topic_to_user",
+        )
+        for source, copied_message_id in zip(messages, copied_message_ids)
+        if copied_message_id is not None
+    ]
+
+
 @topic_router.message(IsTopicMessage())
 async def handle_q_message(
     message: Message,
@@ -54,9 +80,21 @@ async def handle_q_message(
     questions_repo: QuestionsRequestsRepo,
     main_repo: MainRequestsRepo,
 ):
+    # Альбом пересылается целиком обработчиком первого сообщения
+    messages = [message]
+    if message.media_group_id:
+        messages = await media_group_buffer.collect(message)
+        if messages is None:
+            return
+        message = messages[0]
+
     question: Question = await questions_repo.questions.get_question(
         group_id=message.chat.id, topic_id=message.message_thread_id
     )
+    # Топики из резерва еще не привязаны к вопросу
+    if question is None:
+        return
+
     employee: Employee = await main_repo.employee.get_user(
         user_id=question.employee_userid
     )
@@ -79,6 +117,7 @@ async def handle_q_message(
         return
 
     if question is not None and question.status != "closed":
+        taken = False
         if not question.duty_userid and "".join(
             c for c in employee.division if c.isalpha()
         ) == "".join(c for c in user.division if c.isalpha()):
@@ -89,16 +128,34 @@ async def handle_q_message(
             )
             duty_topics_month = (
                 await questions_repo.questions.get_questions_count_last_month(
-                    duty_userid=user.fullname
+                    duty_userid=user.user_id
                 )
             )
 
-            await questions_repo.questions.update_question(
+            # Вопрос берется, только если его еще никто не взял
+            taken = await questions_repo.questions.update_question_where(
                 token=question.token,
+                where={"duty_userid": None, "status": "open"},
                 duty_userid=user.user_id,
                 status="in_progress",
             )
-            stop_attention_reminder(question.token)
+            if not taken:
+                # Вопрос мог взять этот же дежурный предыдущим сообщением (например, другим сообщением альбома)
+                token = question.token
+                question = await questions_repo.questions.get_question(token=token)
+                if question is None or question.duty_userid != user.user_id:
+                    await message.reply("""<b>⚠️ Предупреждение</b>
+
+Вопрос уже взял в работу другой дежурный
+
+<i>Твое сообщение не отобразится специалисту</i>""")
+                    logger.warning(
+                        f"[Вопрос] - [В работе] Пользователь {message.from_user.username} ({message.from_user.id}): Вопрос {token} уже взят в работу другим дежурным"
+                    )
+                    return
+
+        if taken:
+            await stop_attention_reminder(question.token)
 
             # Запускаем таймер бездействия для нового вопроса
             if question.activity_status_enabled:
@@ -147,23 +204,17 @@ async def handle_q_message(
                 reply_markup=finish_question_kb(),
             )
 
-            copied_message = await message.bot.copy_message(
-                from_chat_id=question.group_id,
-                message_id=message.message_id,
-                chat_id=employee.user_id,
+            copied_message_ids = await relay_messages(
+                message.bot, messages, chat_id=employee.user_id
             )
 
             # Сохраняем коннект сообщений
             try:
-                await store_message_connection(
+                await store_message_connections(
                     questions_repo=questions_repo,
-                    user_chat_id=question.employee_userid,
-                    user_message_id=copied_message.message_id,
-                    topic_chat_id=question.group_id,
-                    topic_message_id=message.message_id,
-                    topic_thread_id=question.topic_id,
-                    question_token=question.token,
-                    direction="topic_to_user",
+                    connections=topic_to_user_pairs(
+                        question, messages, copied_message_ids
+                    ),
                 )
             except Exception as e:
                 logger.error(f"Failed to store message connection: {e}")
@@ -192,6 +243,7 @@ async def handle_q_message(
                 )
 
                 # Если реплай - пробуем отправить ответом
+                reply_to_message_id = None
                 if message.reply_to_message:
                     # Находим связь с отвеченным сообщением
                     message_pair = (
@@ -203,40 +255,25 @@ async def handle_q_message(
 
                     if message_pair:
                         # Копируем с ответом если нашли связь
-                        copied_message = await message.bot.copy_message(
-                            from_chat_id=question.group_id,
-                            message_id=message.message_id,
-                            chat_id=question.employee_userid,
-                            reply_to_message_id=message_pair.user_message_id,
-                        )
+                        reply_to_message_id = message_pair.user_message_id
                         logger.info(
                             f"[Вопрос] - [Ответ] Найдена связь для ответа дежурного: {message.chat.id}:{message.reply_to_message.message_id} -> {message_pair.user_chat_id}:{message_pair.user_message_id}"
                         )
-                    else:
-                        # Не найдено связи, просто копируем
-                        copied_message = await message.bot.copy_message(
-                            from_chat_id=question.group_id,
-                            message_id=message.message_id,
-                            chat_id=question.employee_userid,
-                        )
-                else:
-                    copied_message = await message.bot.copy_message(
-                        from_chat_id=question.group_id,
-                        message_id=message.message_id,
-                        chat_id=question.employee_userid,
-                    )
+
+                copied_message_ids = await relay_messages(
+                    message.bot,
+                    messages,
+                    chat_id=question.employee_userid,
+                    reply_to_message_id=reply_to_message_id,
+                )
 
                 # Сохраняем коннект сообщений
                 try:
-                    await store_message_connection(
+                    await store_message_connections(
                         questions_repo=questions_repo,
-                        user_chat_id=question.employee_userid,
-                        user_message_id=copied_message.message_id,
-                        topic_chat_id=question.group_id,
-                        topic_message_id=message.message_id,
-                        topic_thread_id=question.topic_id,
-                        question_token=question.token,
-                        direction="topic_to_user",
+                        connections=topic_to_user_pairs(
+                            question, messages, copied_message_ids
+                        ),
                     )
                 except Exception as e:
                     logger.error(f"Failed to store message connection: {e}")
@@ -428,16 +465,19 @@ async def return_q_duty(
     available_to_return_questions: Sequence[
         Question
     ] = await questions_repo.questions.get_available_to_return_questions()
-    active_questions = await questions_repo.questions.get_active_questions()
+    employee_active_question = (
+        await questions_repo.questions.get_active_question_by_employee(
+            question.employee_userid
+        )
+    )
 
     if (
         question.status == "closed"
-        and question.employee_userid
-        not in [u.employee_userid for u in active_questions]
+        and employee_active_question is None
         and question.token in [d.token for d in available_to_return_questions]
         and (question.duty_userid == user.user_id or question.duty_userid is None)
     ):
-        await questions_repo.questions.update_question(
+        await questions_repo.questions.update_question_where(
             token=question.token, status="in_progress"
         )
 
@@ -473,7 +513,7 @@ async def return_q_duty(
         logger.warning(
             f"[Вопрос] - [Переоткрытие] Пользователь {callback.from_user.username} ({callback.from_user.id}): Неудачная попытка переоткрытия, вопрос {question.token} принадлежит другому старшему"
         )
-    elif question.employee_userid in [d.employee_userid for d in active_questions]:
+    elif employee_active_question:
         await callback.answer(
             "У специалиста есть другой открытый вопрос", show_alert=True
         )
@@ -506,7 +546,7 @@ async def change_q_return_status(
     question: Question = await questions_repo.questions.get_question(
         group_id=callback.message.chat.id, topic_id=callback.message.message_thread_id
     )
-    await questions_repo.questions.update_question(
+    await questions_repo.questions.update_question_where(
         token=callback_data.token, allow_return=callback_data.allow_return
     )
     if callback_data.allow_return:
@@ -535,7 +575,7 @@ async def quality_q_duty(
         group_id=callback.message.chat.id, topic_id=callback.message.message_thread_id
     )
     if question.duty_userid == user.user_id:
-        await questions_repo.questions.update_question(
+        await questions_repo.questions.update_question_where(
             token=question.token, quality_duty=callback_data.answer
         )
         await callback.answer("Оценка успешно выставлена ❤️")
@@ -604,10 +644,10 @@ async def toggle_activity_status(
             action_text = "отключен"
             from tgbot.services.scheduler import stop_inactivity_timer
 
-            stop_inactivity_timer(question.token)
+            await stop_inactivity_timer(question.token)
 
         # Обновляем статус в базе данных
-        await questions_repo.questions.update_question(
+        await questions_repo.questions.update_question_where(
             token=callback_data.token, activity_status_enabled=new_status
         )
 
@@ -1,7 +1,5 @@
-import datetime
 import logging
 
-import pytz
 from aiogram import F, Router
 from aiogram.types import CallbackQuery, Message, ReplyKeyboardRemove
 
@@ -13,9 +11,9 @@ from tgbot.keyboards.group.main import FinishedQuestion, question_quality_duty_k
 from tgbot.keyboards.user.main import question_quality_specialist_kb
 from tgbot.misc.helpers import short_name
 from tgbot.services.logger import setup_logging
+from tgbot.services.question_close import Notice, close_question, close_topic
 from tgbot.services.scheduler import (
     start_attention_reminder,
-    stop_inactivity_timer,
 )
 
 topic_cmds_router = Router()
@@ -43,86 +41,57 @@ async def end_q_cmd(
         if question.status != "closed" and (
             question.duty_userid == user.user_id or user.role == 10
         ):
-            # Останавливаем таймер бездействия
-            stop_inactivity_timer(question.token)
-
-            await questions_repo.questions.update_question(
-                token=question.token,
-                status="closed",
-                end_time=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")),
-            )
-
             if question.quality_duty is not None:
                 if question.quality_duty:
-                    await message.bot.send_message(
-                        chat_id=question.group_id,
-                        message_thread_id=question.topic_id,
-                        text=f"""<b>🔒 Вопрос закрыт</b>
-
-👮‍♂️ Дежурный: <b>{user.fullname if user.fullname else "Не закреплен"}</b>
-👍 Специалист <b>не мог решить вопрос самостоятельно</b>""",
-                        reply_markup=question_quality_duty_kb(
-                            token=question.token,
-                            show_quality=None,
-                            allow_return=question.allow_return,
-                        ),
+                    quality_text = (
+                        "👍 Специалист <b>не мог решить вопрос самостоятельно</b>"
                     )
                 else:
-                    await message.bot.send_message(
+                    quality_text = (
+                        "👎 Специалист <b>мог решить вопрос самостоятельно</b>"
+                    )
+            else:
+                quality_text = "Оцени, мог ли специалист решить его самостоятельно"
+
+            result = await close_question(
+                bot=message.bot,
+                questions_repo=questions_repo,
+                question=question,
+                emoji_closed=group_settings.get_setting("emoji_closed"),
+                notices=[
+                    Notice(
                         chat_id=question.group_id,
                         message_thread_id=question.topic_id,
                         text=f"""<b>🔒 Вопрос закрыт</b>
-                        
-👮‍♂️ Дежурный: <b>{user.fullname}</b>
-👎 Специалист <b>мог решить вопрос самостоятельно</b>""",
+
+👮‍♂️ Дежурный: <b>{user.fullname if user.fullname else "Не закреплен"}</b>
+{quality_text}""",
                         reply_markup=question_quality_duty_kb(
                             token=question.token,
-                            show_quality=None,
+                            show_quality=True
+                            if question.quality_duty is None
+                            else None,
                             allow_return=question.allow_return,
                         ),
-                    )
-            else:
-                await message.bot.send_message(
-                    chat_id=question.group_id,
-                    message_thread_id=question.topic_id,
-                    text=f"""<b>🔒 Вопрос закрыт</b>
-                    
-👮‍♂️ Дежурный: <b>{user.fullname}</b>
-Оцени, мог ли специалист решить его самостоятельно""",
-                    reply_markup=question_quality_duty_kb(
-                        token=question.token,
-                        show_quality=True,
-                        allow_return=question.allow_return,
                     ),
-                )
-
-            await message.bot.edit_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                name=question.token,
-                icon_custom_emoji_id=group_settings.get_setting("emoji_closed"),
-            )
-            await message.bot.close_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-            )
-
-            employee: Employee = await main_repo.employee.get_user(
-                user_id=question.employee_userid
-            )
-
-            await message.bot.send_message(
-                chat_id=employee.user_id,
-                text="<b>🔒 Вопрос закрыт</b>",
-                reply_markup=ReplyKeyboardRemove(),
-            )
-
-            await message.bot.send_message(
-                chat_id=employee.user_id,
-                text=f"""Дежурный <b>{short_name(user.fullname)}</b> закрыл вопрос
+                    Notice(
+                        chat_id=question.employee_userid,
+                        text="<b>🔒 Вопрос закрыт</b>",
+                        reply_markup=ReplyKeyboardRemove(),
+                    ),
+                    Notice(
+                        chat_id=question.employee_userid,
+                        text=f"""Дежурный <b>{short_name(user.fullname)}</b> закрыл вопрос
 Оцени, помогли ли тебе решить его""",
-                reply_markup=question_quality_specialist_kb(token=question.token),
+                        reply_markup=question_quality_specialist_kb(
+                            token=question.token
+                        ),
+                    ),
+                ],
             )
+            if not result["success"]:
+                await message.reply("<b>🔒 Вопрос был закрыт</b>")
+                return
 
             logger.info(
                 f"[Вопрос] - [Закрытие] Пользователь {message.from_user.username} ({message.from_user.id}): Закрыт вопрос {question.token} со специалистом {question.employee_userid}"
@@ -137,16 +106,9 @@ async def end_q_cmd(
                 f"[Вопрос] - [Закрытие] Пользователь {message.from_user.username} ({message.from_user.id}): Попытка закрытия вопроса {question.token} неуспешна. Вопрос принадлежит другому дежурному"
             )
         elif question.status == "closed":
-            await message.bot.edit_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                name=question.token,
-                icon_custom_emoji_id=group_settings.get_setting("emoji_closed"),
-            )
             await message.reply("<b>🔒 Вопрос был закрыт</b>")
-            await message.bot.close_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
+            await close_topic(
+                message.bot, question, group_settings.get_setting("emoji_closed")
             )
             logger.warning(
                 f"[Вопрос] - [Закрытие] Пользователь {message.from_user.username} ({message.from_user.id}): Попытка закрытия вопроса {question.token} неуспешна. Вопрос уже закрыт"
@@ -180,7 +142,7 @@ async def release_q_cmd(
                 group_id=question.group_id,
             )
 
-            await questions_repo.questions.update_question(
+            await questions_repo.questions.update_question_where(
                 token=question.token,
                 duty_userid=None,
                 status="open",
@@ -254,7 +216,7 @@ async def release_q_cb(
             group_id=question.group_id,
         )
 
-        await questions_repo.questions.update_question(
+        await questions_repo.questions.update_question_where(
             token=question.token,
             duty_userid=None,
             status="open",
@@ -24,13 +24,14 @@ from tgbot.keyboards.user.main import (
     closed_question_specialist_kb,
     question_quality_specialist_kb,
 )
-from tgbot.middlewares.MessagePairingMiddleware import store_message_connection
+from tgbot.middlewares.MessagePairingMiddleware import store_message_connections
 from tgbot.misc.helpers import check_premium_emoji, short_name
 from tgbot.services.logger import setup_logging
+from tgbot.services.media_groups import media_group_buffer, relay_messages
+from tgbot.services.question_close import Notice, close_question, close_topic
 from tgbot.services.scheduler import (
     restart_inactivity_timer,
     run_delete_timer,
-    stop_inactivity_timer,
 )
 
 user_q_router = Router()
@@ -58,93 +59,66 @@ async def active_question_end(
         )
 
         if question.status != "closed":
-            # Останавливаем таймер бездействия
-            stop_inactivity_timer(question.token)
-
-            await questions_repo.questions.update_question(
-                token=question.token,
-                end_time=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")),
-                status="closed",
-            )
-
             if question.quality_duty is not None:
                 if question.quality_duty:
-                    await message.bot.send_message(
-                        chat_id=question.group_id,
-                        message_thread_id=question.topic_id,
-                        text=f"""<b>🔒 Вопрос закрыт</b>
-    
-Специалист <b>{short_name(user.fullname)}</b> закрыл вопрос
-👍 Специалист <b>не мог решить вопрос самостоятельно</b>""",
-                        reply_markup=question_quality_duty_kb(
-                            token=question.token,
-                            show_quality=None,
-                            allow_return=question.allow_return,
-                        ),
+                    quality_text = (
+                        "👍 Специалист <b>не мог решить вопрос самостоятельно</b>"
                     )
                 else:
-                    await message.bot.send_message(
+                    quality_text = (
+                        "👎 Специалист <b>мог решить вопрос самостоятельно</b>"
+                    )
+            else:
+                quality_text = "Оцени, мог ли специалист решить его самостоятельно"
+
+            result = await close_question(
+                bot=message.bot,
+                questions_repo=questions_repo,
+                question=question,
+                emoji_closed=group_settings.get_setting("emoji_closed"),
+                notices=[
+                    Notice(
                         chat_id=question.group_id,
                         message_thread_id=question.topic_id,
                         text=f"""<b>🔒 Вопрос закрыт</b>
 
 Специалист <b>{short_name(user.fullname)}</b> закрыл вопрос
-👎 Специалист <b>мог решить вопрос самостоятельно</b>""",
+{quality_text}""",
                         reply_markup=question_quality_duty_kb(
                             token=question.token,
-                            show_quality=None,
+                            show_quality=True
+                            if question.quality_duty is None
+                            else None,
                             allow_return=question.allow_return,
                         ),
-                    )
-            else:
-                await message.bot.send_message(
-                    chat_id=question.group_id,
-                    message_thread_id=question.topic_id,
-                    text=f"""<b>🔒 Вопрос закрыт</b>
-
-Специалист <b>{short_name(user.fullname)}</b> закрыл вопрос
-Оцени, мог ли специалист решить его самостоятельно""",
-                    reply_markup=question_quality_duty_kb(
-                        token=question.token,
-                        show_quality=True,
-                        allow_return=question.allow_return,
                     ),
-                )
-
-            await message.bot.edit_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                name=question.token,
-                icon_custom_emoji_id=group_settings.get_setting("emoji_closed"),
-            )
-            await message.bot.close_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-            )
-
-            await message.reply(
-                text="<b>🔒 Вопрос закрыт</b>", reply_markup=ReplyKeyboardRemove()
-            )
-            await message.answer(
-                """Ты закрыл вопрос
+                    Notice(
+                        chat_id=message.chat.id,
+                        text="<b>🔒 Вопрос закрыт</b>",
+                        reply_to_message_id=message.message_id,
+                        reply_markup=ReplyKeyboardRemove(),
+                    ),
+                    Notice(
+                        chat_id=message.chat.id,
+                        text="""Ты закрыл вопрос
 Оцени, помогли ли тебе решить вопрос""",
-                reply_markup=question_quality_specialist_kb(token=question.token),
+                        reply_markup=question_quality_specialist_kb(
+                            token=question.token
+                        ),
+                    ),
+                ],
             )
+            if not result["success"]:
+                await message.reply("<b>🔒 Вопрос был закрыт</b>")
+                return
 
             logger.info(
                 f"[Вопрос] - [Закрытие] Пользователь {message.from_user.username} ({message.from_user.id}): Закрыт вопрос {question.token} со старшим {question.duty_userid}"
             )
         elif question.status == "closed":
-            await message.bot.edit_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                name=question.token,
-                icon_custom_emoji_id=group_settings.get_setting("emoji_closed"),
-            )
             await message.reply("<b>🔒 Вопрос был закрыт</b>")
-            await message.bot.close_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
+            await close_topic(
+                message.bot, question, group_settings.get_setting("emoji_closed")
             )
             logger.info(
                 f"[Вопрос] - [Закрытие] Пользователь {message.from_user.username} ({message.from_user.id}): Неудачная попытка закрытия вопроса {question.token} со старшим {question.duty_userid}. Вопрос уже закрыт"
@@ -169,6 +143,14 @@ async def active_question(
     if message.message_thread_id:
         return
 
+    # Альбом пересылается целиком обработчиком первого сообщения
+    messages = [message]
+    if message.media_group_id:
+        messages = await media_group_buffer.collect(message)
+        if messages is None:
+            return
+        message = messages[0]
+
     question: Question = await questions_repo.questions.get_question(
         token=active_question_token
     )
@@ -188,6 +170,7 @@ async def active_question(
     )
 
     # Если реплай - пробуем отправить ответом
+    reply_to_message_id = None
     if message.reply_to_message:
         # Находим связь с отвеченным сообщением
         message_pair = await questions_repo.messages_pairs.find_by_user_message(
@@ -197,43 +180,36 @@ async def active_question(
 
         if message_pair:
             # Копируем с ответом если нашли связь
-            copied_message = await message.bot.copy_message(
-                from_chat_id=message.chat.id,
-                message_id=message.message_id,
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                reply_to_message_id=message_pair.topic_message_id,
-            )
+            reply_to_message_id = message_pair.topic_message_id
             logger.info(
                 f"[Вопрос] - [Ответ] Найдена связь для ответа: {message.chat.id}:{message.reply_to_message.message_id} -> {message_pair.topic_chat_id}:{message_pair.topic_message_id}"
             )
-        else:
-            # Не найдено связи, просто копируем
-            copied_message = await message.bot.copy_message(
-                from_chat_id=message.chat.id,
-                message_id=message.message_id,
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-            )
-    else:
-        copied_message = await message.bot.copy_message(
-            from_chat_id=message.chat.id,
-            message_id=message.message_id,
-            chat_id=question.group_id,
-            message_thread_id=question.topic_id,
-        )
+
+    copied_message_ids = await relay_messages(
+        message.bot,
+        messages,
+        chat_id=question.group_id,
+        message_thread_id=question.topic_id,
+        reply_to_message_id=reply_to_message_id,
+    )
 
     # Сохраняем коннект сообщений
     try:
-        await store_message_connection(
+        await store_message_connections(
             questions_repo=questions_repo,
-            user_chat_id=message.chat.id,
-            user_message_id=message.message_id,
-            topic_chat_id=question.group_id,
-            topic_message_id=copied_message.message_id,
-            topic_thread_id=question.topic_id,
-            question_token=question.token,
-            direction="user_to_topic",
+            connections=[
+                MessagesPair(
+                    user_chat_id=message.chat.id,
+                    user_message_id=source.message_id,
+                    topic_chat_id=question.group_id,
+                    topic_message_id=copied_message_id,
+                    topic_thread_id=question.topic_id,
+                    question_token=question.token,
+                    direction="user_to_topic",
+                )
+                for source, copied_message_id in zip(messages, copied_message_ids)
+                if copied_message_id is not None
+            ],
         )
     except Exception as e:
         logger.error(f"Failed to store message connection: {e}")
@@ -1,5 +1,6 @@
 import datetime
 import logging
+from typing import Sequence
 
 import pytz
 from aiogram import F, Router
@@ -33,6 +34,7 @@ from tgbot.services.scheduler import (
     start_attention_reminder,
     start_inactivity_timer,
 )
+from tgbot.services.topic_pool import topic_pool
 
 user_router = Router()
 user_router.message.filter(F.chat.type == "private")
@@ -55,7 +57,7 @@ async def main_cmd(
     )
     employee_topics_month = (
         await questions_repo.questions.get_questions_count_last_month(
-            employee_userid=user.fullname
+            employee_userid=user.user_id
         )
     )
 
@@ -105,7 +107,7 @@ async def main_cb(
     )
     employee_topics_month = (
         await questions_repo.questions.get_questions_count_last_month(
-            employee_userid=user.fullname
+            employee_userid=user.user_id
         )
     )
 
@@ -138,8 +140,7 @@ async def ask_question(
     user: Employee,
     questions_repo: QuestionsRequestsRepo,
 ):
-    active_questions = await questions_repo.questions.get_active_questions()
-    if user.user_id in [d.employee_userid for d in active_questions]:
+    if await questions_repo.questions.get_active_question_by_employee(user.user_id):
         await callback.answer("У тебя есть другой открытый вопрос", show_alert=True)
         return
 
@@ -168,8 +169,7 @@ async def question_text(
     questions_repo: QuestionsRequestsRepo,
     main_repo: MainRequestsRepo,
 ):
-    active_questions = await questions_repo.questions.get_active_questions()
-    if user.user_id in [q.employee_userid for q in active_questions]:
+    if await questions_repo.questions.get_active_question_by_employee(user.user_id):
         await state.clear()
         await message.answer("У тебя уже есть активный вопрос")
         return
@@ -239,11 +239,12 @@ async def question_text(
         )
         employee_topics_month = (
             await questions_repo.questions.get_questions_count_last_month(
-                employee_userid=user.fullname
+                employee_userid=user.user_id
             )
         )
 
-        new_topic = await message.bot.create_forum_topic(
+        new_topic_id = await topic_pool.take(
+            message.bot,
             chat_id=target_forum_id,
             name=f"{user.division} | {short_name(user.fullname)}"
             if group_settings.get_setting("show_division")
@@ -253,7 +254,7 @@ async def question_text(
 
         new_question = await questions_repo.questions.add_question(
             group_id=target_forum_id,
-            topic_id=new_topic.message_thread_id,
+            topic_id=new_topic_id,
             employee_userid=message.chat.id,
             start_time=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")),
             question_text=state_data.get("question"),
@@ -301,7 +302,7 @@ async def question_text(
 
         topic_info_msg = await message.bot.send_message(
             chat_id=new_question.group_id,
-            message_thread_id=new_topic.message_thread_id,
+            message_thread_id=new_topic_id,
             text=topic_text,
             disable_web_page_preview=True,
             reply_markup=activity_status_toggle_kb(
@@ -314,7 +315,7 @@ async def question_text(
 
         await message.bot.copy_message(
             chat_id=new_question.group_id,
-            message_thread_id=new_topic.message_thread_id,
+            message_thread_id=new_topic_id,
             from_chat_id=message.chat.id,
             message_id=state_data.get("question_message_id"),
         )  # Копирование сообщения специалиста в тему
@@ -337,24 +338,20 @@ async def question_text(
     # Отключаем кнопки на предыдущих шагах
     await disable_previous_buttons(message, state)
 
-    # TODO Вернуть проверку на топ юзеров после обсуждения
-    # top_users: Sequence[
-    #     User
-    # ] = await questions_repo.questions.get_top_users_by_division(
-    #     division="НЦК" if "НЦК" in user.division else "НТП", main_repo=main_repo
-    # )
+    top_users: Sequence[
+        Employee
+    ] = await questions_repo.questions.get_top_users_by_division(
+        division="НЦК" if "НЦК" in user.division else "НТП", main_repo=main_repo
+    )
 
     # Если дошли до сюда, значит нужно запросить ссылку на регламент
     response_msg = await message.answer(
         """<b>🗃️ Регламент</b>
 
 Прикрепи ссылку на регламент из клевера, по которому у тебя вопрос""",
-        reply_markup=question_ask_kb(is_user_in_top=True),
-        # reply_markup=question_ask_kb(
-        #     is_user_in_top=True
-        #     if user.user_id in (u.user_id for u in top_users)
-        #     else False
-        # ),
+        reply_markup=question_ask_kb(
+            is_user_in_top=user.user_id in (u.user_id for u in top_users)
+        ),
     )
 
     messages_with_buttons = state_data.get("messages_with_buttons", [])
@@ -375,8 +372,7 @@ async def clever_link_handler(
     questions_repo: QuestionsRequestsRepo,
     main_repo: MainRequestsRepo,
 ):
-    active_questions = await questions_repo.questions.get_active_questions()
-    if user.user_id in [q.employee_userid for q in active_questions]:
+    if await questions_repo.questions.get_active_question_by_employee(user.user_id):
         await state.clear()
         await message.answer("У тебя уже есть активный вопрос")
         return
@@ -432,7 +428,7 @@ async def clever_link_handler(
     )
     employee_topics_month = (
         await questions_repo.questions.get_questions_count_last_month(
-            employee_userid=user.fullname
+            employee_userid=user.user_id
         )
     )
 
@@ -444,7 +440,8 @@ async def clever_link_handler(
     # Выключаем все предыдущие кнопки
     await disable_previous_buttons(message, state)
 
-    new_topic = await message.bot.create_forum_topic(
+    new_topic_id = await topic_pool.take(
+        message.bot,
         chat_id=target_forum_id,
         name=f"{user.division} | {short_name(user.fullname)}"
         if group_settings.get_setting("show_division")
@@ -454,7 +451,7 @@ async def clever_link_handler(
 
     new_question = await questions_repo.questions.add_question(
         group_id=target_forum_id,
-        topic_id=new_topic.message_thread_id,
+        topic_id=new_topic_id,
         employee_userid=message.chat.id,
         start_time=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")),
         question_text=state_data.get("question"),
@@ -486,7 +483,7 @@ async def clever_link_handler(
 
     topic_info_msg = await message.bot.send_message(
         chat_id=target_forum_id,
-        message_thread_id=new_topic.message_thread_id,
+        message_thread_id=new_topic_id,
         text=f"""Вопрос задает <b>{user_fullname}</b>
 
 <blockquote expandable><b>👔 Должность:</b> {user.position}
@@ -504,7 +501,7 @@ async def clever_link_handler(
 
     await message.bot.copy_message(
         chat_id=new_question.group_id,
-        message_thread_id=new_topic.message_thread_id,
+        message_thread_id=new_topic_id,
         from_chat_id=message.chat.id,
         message_id=state_data.get("question_message_id"),
     )  # Копирование сообщения специалиста в тему
@@ -541,7 +538,7 @@ async def regulation_not_found_handler(
     )
     employee_topics_month = (
         await questions_repo.questions.get_questions_count_last_month(
-            employee_userid=user.fullname
+            employee_userid=user.user_id
         )
     )
 
@@ -554,7 +551,8 @@ async def regulation_not_found_handler(
     await disable_previous_buttons(callback.message, state)
 
     # Создаем новую тему
-    new_topic = await callback.bot.create_forum_topic(
+    new_topic_id = await topic_pool.take(
+        callback.bot,
         chat_id=target_forum_id,
         name=f"{user.division} | {short_name(user.fullname)}"
         if group_settings.get_setting("show_division")
@@ -565,7 +563,7 @@ async def regulation_not_found_handler(
     # Создаем новый вопрос с clever_link = "не нашел"
     new_question = await questions_repo.questions.add_question(
         group_id=target_forum_id,
-        topic_id=new_topic.message_thread_id,
+        topic_id=new_topic_id,
         employee_userid=callback.from_user.id,
         start_time=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")),
         question_text=state_data.get("question"),
@@ -613,7 +611,7 @@ async def regulation_not_found_handler(
     # Отправляем информацию в тему
     topic_info_msg = await callback.bot.send_message(
         chat_id=new_question.group_id,
-        message_thread_id=new_topic.message_thread_id,
+        message_thread_id=new_topic_id,
         text=topic_text,
         disable_web_page_preview=True,
         reply_markup=activity_status_toggle_kb(
@@ -626,7 +624,7 @@ async def regulation_not_found_handler(
     # Копируем оригинальное сообщение с вопросом
     await callback.bot.copy_message(
         chat_id=new_question.group_id,
-        message_thread_id=new_topic.message_thread_id,
+        message_thread_id=new_topic_id,
         from_chat_id=callback.message.chat.id,
         message_id=state_data.get("question_message_id"),
     )
@@ -725,9 +723,7 @@ async def default_message_handler(
 
     # Проверяем есть ли у пользователя активные вопросы
     try:
-        active_questions = await questions_repo.questions.get_active_questions()
-        logger.info(active_questions)
-        if user.user_id in [q.employee_userid for q in active_questions]:
+        if await questions_repo.questions.get_active_question_by_employee(user.user_id):
             return
     except Exception as e:
         logger.error(f"Error checking active questions for user {user.fullname}: {e}")
@@ -740,7 +736,7 @@ async def default_message_handler(
     )
     employee_topics_month = (
         await questions_repo.questions.get_questions_count_last_month(
-            employee_userid=user.fullname
+            employee_userid=user.user_id
         )
     )
 
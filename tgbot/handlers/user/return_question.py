@@ -46,12 +46,12 @@ async def return_finished_q(
     """
     await state.clear()
 
-    active_questions: Sequence[
-        Question
-    ] = await questions_repo.questions.get_active_questions()
     question: Question = await questions_repo.questions.get_question(
         callback_data.token
     )
+    employee_active_question = (
+        await questions_repo.questions.get_active_question_by_employee(user.user_id)
+    )
     group_settings = await questions_repo.settings.get_settings_by_group_id(
         group_id=question.group_id,
     )
@@ -61,14 +61,21 @@ async def return_finished_q(
 
     if (
         question.status == "closed"
-        and user.user_id not in [d.employee_userid for d in active_questions]
+        and employee_active_question is None
         and question.token in [d.token for d in available_to_return_questions]
     ):
         duty: Employee = await main_repo.employee.get_user(user_id=question.duty_userid)
-        await questions_repo.questions.update_question(
+        reopened = await questions_repo.questions.update_question_where(
             token=question.token,
+            where={"status": "closed"},
             status="open",
         )
+        if not reopened:
+            await callback.answer("Вопрос уже переоткрыт", show_alert=True)
+            logger.info(
+                f"[Вопрос] - [Переоткрытие] Пользователь {callback.from_user.username} ({callback.from_user.id}): Вопрос {question.token} уже переоткрыт"
+            )
+            return
 
         await callback.bot.edit_forum_topic(
             chat_id=question.group_id,
@@ -110,7 +117,7 @@ async def return_finished_q(
         logger.info(
             f"[Вопрос] - [Переоткрытие] Пользователь {callback.from_user.username} ({callback.from_user.id}): Вопрос {question.token} переоткрыт специалистом"
         )
-    elif user.user_id in [d.employee_userid for d in active_questions]:
+    elif employee_active_question:
         await callback.answer("У тебя есть другой открытый вопрос", show_alert=True)
         logger.info(
             f"[Вопрос] - [Переоткрытие] Пользователь {callback.from_user.username} ({callback.from_user.id}): Неудачная попытка переоткрытия, у специалиста есть другой открытый вопрос"
@@ -259,11 +266,13 @@ async def return_q_confirm(
         group_id=question.group_id,
     )
 
-    active_questions = await questions_repo.questions.get_active_questions()
+    employee_active_question = (
+        await questions_repo.questions.get_active_question_by_employee(user.user_id)
+    )
 
     if (
         question.status == "closed"
-        and user.user_id not in [d.employee_userid for d in active_questions]
+        and employee_active_question is None
         and question.allow_return
     ):
         # Get duty user only if topic_duty_fullname exists
@@ -274,10 +283,17 @@ async def return_q_confirm(
             )
 
         # 1. Обновляем статус вопроса на "open"
-        await questions_repo.questions.update_question(
+        reopened = await questions_repo.questions.update_question_where(
             token=question.token,
+            where={"status": "closed"},
             status="open",
         )
+        if not reopened:
+            await callback.answer("Вопрос уже переоткрыт", show_alert=True)
+            logger.info(
+                f"[Вопрос] - [Переоткрытие] Пользователь {callback.from_user.username} ({callback.from_user.id}): Вопрос {question.token} уже переоткрыт"
+            )
+            return
 
         # 2. Обновляем название и иконку темы
         await callback.bot.edit_forum_topic(
@@ -322,7 +338,7 @@ async def return_q_confirm(
             reply_markup=reopened_question_kb(),
             disable_web_page_preview=True,
         )
-    elif user.user_id in [d.employee_userid for d in active_questions]:
+    elif employee_active_question:
         # Проверка на наличие открытых вопросов у специалиста
         await callback.answer("У тебя есть другой открытый вопрос", show_alert=True)
         logger.error(
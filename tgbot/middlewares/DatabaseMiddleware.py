@@ -5,6 +5,7 @@ from aiogram import BaseMiddleware, Bot
 from aiogram.types import CallbackQuery, Message
 from sqlalchemy.exc import DBAPIError, DisconnectionError, OperationalError
 
+from infrastructure.database.lazy_session import LazySession
 from infrastructure.database.repo.STP.requests import MainRequestsRepo
 from infrastructure.database.repo.questions.requests import QuestionsRequestsRepo
 from tgbot.config import Config
@@ -18,6 +19,9 @@ class DatabaseMiddleware(BaseMiddleware):
     """
     Middleware responsible only for database connections and session management.
     Provides database repositories to other middlewares and handlers.
+
+    Sessions are lazy: a connection is taken from the pool only when a repository
+    actually queries the database and is returned right after each read step.
     """
 
     def __init__(
@@ -36,56 +40,43 @@ class DatabaseMiddleware(BaseMiddleware):
         event: Union[Message, CallbackQuery],
         data: Dict[str, Any],
     ) -> Any:
-        max_retries = 3
-        retry_count = 0
-
-        while retry_count < max_retries:
-            try:
-                # Use separate sessions for different databases
-                async with self.main_session_pool() as main_session:
-                    async with self.questioner_session_pool() as questioner_session:
-                        # Create repositories for different databases
-                        main_repo = MainRequestsRepo(main_session)  # For STPMain DB
-                        questioner_repo = QuestionsRequestsRepo(
-                            questioner_session
-                        )  # For QuestionerBot DB
+        # Use separate sessions for different databases
+        async with LazySession(self.main_session_pool) as main_session:
+            async with LazySession(self.questioner_session_pool) as questioner_session:
+                # Create repositories for different databases
+                main_repo = MainRequestsRepo(main_session)  # For STPMain DB
+                questioner_repo = QuestionsRequestsRepo(
+                    questioner_session
+                )  # For QuestionerBot DB
 
-                        # Get user from database
-                        user = await main_repo.employee.get_user(
-                            user_id=event.from_user.id
+                try:
+                    # Get user from database
+                    user = await main_repo.employee.get_user(user_id=event.from_user.id)
+                except (OperationalError, DBAPIError, DisconnectionError) as e:
+                    # Повторные попытки получения соединения уже исчерпаны в LazySession
+                    logger.error(
+                        f"[DatabaseMiddleware] All database connection attempts exhausted: {e}"
+                    )
+                    if isinstance(event, Message):
+                        await event.reply(
+                            "⚠️ Временные проблемы с базой данных. Попробуйте позже."
                         )
+                    return None
 
-                        # Add repositories and user to data for other middlewares
-                        data["main_repo"] = main_repo
-                        data["main_session"] = main_session
-                        data["questioner_session"] = questioner_session
-                        data["questions_repo"] = questioner_repo
-                        data["user"] = user
-
-                        # Continue to the next middleware/handler
-                        result = await handler(event, data)
-                        return result
+                # Add repositories and user to data for other middlewares
+                data["main_repo"] = main_repo
+                data["main_session"] = main_session
+                data["questioner_session"] = questioner_session
+                data["questions_repo"] = questioner_repo
+                data["user"] = user
 
-            except (OperationalError, DBAPIError, DisconnectionError) as e:
-                if "Connection is busy" in str(e) or "HY000" in str(e):
-                    retry_count += 1
-                    logger.warning(
-                        f"[DatabaseMiddleware] Database connection error, retry {retry_count}/{max_retries}: {e}"
-                    )
-                    if retry_count >= max_retries:
-                        logger.error(
-                            f"[DatabaseMiddleware] All database connection attempts exhausted: {e}"
-                        )
-                        if isinstance(event, Message):
-                            await event.reply(
-                                "⚠️ Временные проблемы с базой данных. Попробуйте позже."
-                            )
-                        return None
-                else:
+                # Continue to the next middleware/handler. The handler is never
+                # retried as a whole, so Telegram side effects are not repeated
+                try:
+                    return await handler(event, data)
+                except (OperationalError, DBAPIError, DisconnectionError) as e:
                     logger.error(f"[DatabaseMiddleware] Critical database error: {e}")
                     return None
-            except Exception as e:
-                logger.error(f"[DatabaseMiddleware] Unexpected error: {e}")
-                return None
-
-        return None
+                except Exception as e:
+                    logger.error(f"[DatabaseMiddleware] Unexpected error: {e}")
+                    return None
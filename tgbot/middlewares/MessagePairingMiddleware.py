@@ -1,12 +1,15 @@
 import logging
-from typing import Any, Awaitable, Callable, Dict
+from typing import Any, Awaitable, Callable, Dict, Sequence
 
 from aiogram import BaseMiddleware
 from aiogram.types import Message
 
 from infrastructure.database.models import MessagesPair
+from infrastructure.database.models.questions.pairs import now_for_pair
 from infrastructure.database.repo.questions.requests import QuestionsRequestsRepo
 from tgbot.services.logger import setup_logging
+from tgbot.services.pairs_cache import pairs_cache
+from tgbot.services.pairs_writer import pairs_writer
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -80,48 +83,43 @@ class MessagePairingMiddleware(BaseMiddleware):
         return await handler(event, data)
 
 
-async def store_message_connection(
+async def store_message_connections(
     questions_repo: QuestionsRequestsRepo,
-    user_chat_id: int,
-    user_message_id: int,
-    topic_chat_id: int,
-    topic_message_id: int,
-    topic_thread_id: int,
-    question_token: str,
-    direction: str,
-) -> MessagesPair:
+    connections: Sequence[MessagesPair],
+) -> list[MessagesPair]:
     """
-    Helper function to store message connection in database.
+    Helper function to store several message connections at once, e.g. for an album.
+
+    While the background pairs writer is running, the connections are queued and land
+    in the same batch. Otherwise they are inserted with a single multi-row INSERT.
 
     Args:
         questions_repo: Repository instance
-        user_chat_id: Employee chat ID
-        user_message_id: Message ID in user chat
-        topic_chat_id: Forum chat ID
-        topic_message_id: Message ID in forum topic
-        topic_thread_id: Thread ID in forum topic
-        question_token: Associated question token
-        direction: 'user_to_topic' or 'topic_to_user'
+        connections: New MessagesPair instances
 
     Returns:
-        Created MessageConnection instance
+        Stored MessagesPair instances
     """
+    if not connections:
+        return []
+
+    for connection in connections:
+        if connection.created_at is None:
+            connection.created_at = now_for_pair()
+
     try:
-        connection = await questions_repo.messages_pairs.add_pair(
-            user_chat_id=user_chat_id,
-            user_message_id=user_message_id,
-            topic_chat_id=topic_chat_id,
-            topic_message_id=topic_message_id,
-            topic_thread_id=topic_thread_id,
-            question_token=question_token,
-            direction=direction,
-        )
+        if pairs_writer.running:
+            for connection in connections:
+                await pairs_writer.add(connection)
+        else:
+            await questions_repo.messages_pairs.add_pairs(connections)
+            await pairs_cache.set(*connections)
         logger.info(
-            f"[Редактирование] Сохраняем пару из сообщений: {direction} - "
-            f"юзер:{user_chat_id}:{user_message_id} <-> "
-            f"топик:{topic_chat_id}:{topic_message_id}"
+            f"[Редактирование] Сохраняем {len(connections)} пар из сообщений: {connections[0].direction} - "
+            f"юзер:{connections[0].user_chat_id}:{','.join(str(c.user_message_id) for c in connections)} <-> "
+            f"топик:{connections[0].topic_chat_id}:{','.join(str(c.topic_message_id) for c in connections)}"
         )
-        return connection
+        return list(connections)
     except Exception as e:
-        logger.error(f"Failed to store message connection: {e}")
+        logger.error(f"Failed to store message connections: {e}")
         raise
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Union
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    CloseForumTopic,
+    DeleteForumTopic,
+    DeleteMessage,
+    DeleteMessages,
+    EditForumTopic,
+    EditGeneralForumTopic,
+    GetUpdates,
+    PinChatMessage,
+    ReopenForumTopic,
+    UnpinChatMessage,
+)
+from aiogram.methods.base import Response, TelegramMethod, TelegramType
+
+from tgbot.config import RateLimitConfig
+from tgbot.services.logger import setup_logging
+from tgbot.services.rate_limit import Priority, TokenBucket, request_priority
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Методы, которые не видит собеседник напрямую. Они всегда уступают пересылке сообщений
+LOW_PRIORITY_METHODS = (
+    EditForumTopic,
+    EditGeneralForumTopic,
+    CloseForumTopic,
+    ReopenForumTopic,
+    DeleteForumTopic,
+    PinChatMessage,
+    UnpinChatMessage,
+    DeleteMessage,
+    DeleteMessages,
+)
+
+# Методы, которые пишут в чат и попадают под лимиты Telegram на сообщения.
+# Чтение (get*) и прочие методы лимитами чатов не ограничиваются
+RATE_LIMITED_PREFIXES = (
+    "send",
+    "copy",
+    "forward",
+    "edit",
+    "pin",
+    "unpin",
+    "delete",
+    "closeForumTopic",
+    "reopenForumTopic",
+    "createForumTopic",
+)
+
+# Методы, которые создают сообщения и расходуют общий лимит группы на сообщения в минуту
+MESSAGE_PREFIXES = ("send", "copy", "forward")
+
+# RetryAfter из нескольких разных чатов за короткое время считается общим лимитом бота
+GLOBAL_RETRY_WINDOW = 1.0
+GLOBAL_RETRY_CHATS = 3
+
+
+class RequestRateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Ограничение частоты всех исходящих запросов к Bot API.
+
+    Запросы, которые пишут в чат (send, copy, edit, pin, delete и подобные), проходят корзину чата
+    (для форумов - отдельную корзину каждого топика), затем сообщения проходят общую корзину группы
+    на все ее топики, и в конце все запросы проходят глобальную корзину бота. Так бот держится
+    в пределах лимитов Telegram, а не упирается в них. Ожидающие запросы обслуживаются по приоритету:
+    пересылка при обработке апдейтов раньше фоновых сообщений, а они раньше оформления топиков.
+    Долго ожидающие запросы постепенно поднимаются в приоритете, поэтому оформление топиков не голодает.
+    При TelegramRetryAfter корзины чата и группы приостанавливаются на указанное время и запрос повторяется.
+    Если RetryAfter приходит без чата или сразу из нескольких чатов, приостанавливается и глобальная корзина
+    """
+
+    def __init__(
+        self,
+        limits: Optional[RateLimitConfig] = None,
+        max_retries: int = 3,
+        max_buckets: int = 10000,
+    ) -> None:
+        self.limits = limits or RateLimitConfig()
+        self.max_retries = max_retries
+        self.max_buckets = max_buckets
+
+        self.global_bucket = TokenBucket(
+            rate=self.limits.global_rate,
+            capacity=self.limits.global_rate,
+            aging=self.limits.aging,
+        )
+        self._buckets: dict[tuple, TokenBucket] = {}
+        self._retry_after_chats: dict[Union[int, str], float] = {}
+
+    def _bucket(self, key: tuple, rate: float, capacity: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            return bucket
+
+        if len(self._buckets) >= self.max_buckets:
+            # Полные корзины без очереди ничего не помнят, их можно создать заново
+            for stale in [k for k, b in self._buckets.items() if b.idle]:
+                del self._buckets[stale]
+
+        bucket = TokenBucket(rate=rate, capacity=capacity, aging=self.limits.aging)
+        self._buckets[key] = bucket
+        return bucket
+
+    def _chat_buckets(
+        self, chat_id: Union[int, str], thread_id: Optional[int], is_message: bool
+    ) -> list[TokenBucket]:
+        # Положительные идентификаторы - личные чаты, отрицательные и юзернеймы - группы и каналы
+        if isinstance(chat_id, int) and chat_id > 0:
+            return [
+                self._bucket(
+                    ("chat", chat_id),
+                    self.limits.private_rate,
+                    self.limits.private_burst,
+                )
+            ]
+
+        buckets = [
+            self._bucket(
+                ("topic", chat_id, thread_id),
+                self.limits.topic_rate,
+                self.limits.topic_burst,
+            )
+        ]
+        if is_message:
+            buckets.append(
+                self._bucket(
+                    ("group", chat_id),
+                    self.limits.group_per_minute / 60,
+                    self.limits.group_burst,
+                )
+            )
+        return buckets
+
+    def _is_global_retry(self, chat_id: Optional[Union[int, str]]) -> bool:
+        if chat_id is None:
+            return True
+
+        now = time.monotonic()
+        self._retry_after_chats[chat_id] = now
+        for key in [
+            k
+            for k, at in self._retry_after_chats.items()
+            if now - at > GLOBAL_RETRY_WINDOW
+        ]:
+            del self._retry_after_chats[key]
+        return len(self._retry_after_chats) >= GLOBAL_RETRY_CHATS
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        # Long polling не ограничивается и не повторяется здесь
+        if isinstance(method, GetUpdates):
+            return await make_request(bot, method)
+
+        api_method = method.__api_method__
+        chat_id: Optional[Union[int, str]] = getattr(method, "chat_id", None)
+        limited = chat_id is not None and api_method.startswith(RATE_LIMITED_PREFIXES)
+        priority = request_priority.get()
+        if isinstance(method, LOW_PRIORITY_METHODS) and priority != Priority.URGENT:
+            priority = Priority.LOW
+
+        chat_buckets = []
+        if limited:
+            chat_buckets = self._chat_buckets(
+                chat_id,
+                getattr(method, "message_thread_id", None),
+                api_method.startswith(MESSAGE_PREFIXES),
+            )
+
+        attempt = 0
+        while True:
+            for bucket in chat_buckets:
+                await bucket.acquire(priority)
+            if limited:
+                await self.global_bucket.acquire(priority)
+
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    logger.error(
+                        f"[Исходящие запросы] {api_method} в чат {chat_id}: "
+                        f"превышено кол-во повторов после RetryAfter"
+                    )
+                    raise
+
+                is_global = self._is_global_retry(chat_id if limited else None)
+                logger.warning(
+                    f"[Исходящие запросы] {api_method} в чат {chat_id}: "
+                    f"RetryAfter {e.retry_after} сек{' (общий лимит бота)' if is_global else ''}, "
+                    f"повтор {attempt}/{self.max_retries}"
+                )
+                for bucket in chat_buckets:
+                    bucket.pause(e.retry_after)
+                if is_global:
+                    self.global_bucket.pause(e.retry_after)
+                if not limited:
+                    await asyncio.sleep(e.retry_after)
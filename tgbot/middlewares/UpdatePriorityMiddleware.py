@@ -0,0 +1,24 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from tgbot.services.rate_limit import Priority, priority
+
+
+class UpdatePriorityMiddleware(BaseMiddleware):
+    """
+    Повышение приоритета исходящих запросов на время обработки апдейта.
+
+    Запросы из обработчиков отвечают пользователю прямо сейчас, поэтому RequestRateLimitMiddleware
+    обслуживает их раньше напоминаний и другого фонового трафика
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        with priority(Priority.HIGH):
+            return await handler(event, data)
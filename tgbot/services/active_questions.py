@@ -0,0 +1,267 @@
+import json
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Optional, Sequence
+
+from redis.asyncio import Redis
+
+from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import get_redis, redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("open", "in_progress")
+
+# Удаляем вопрос из индексов, только если они все еще указывают на этот вопрос
+REMOVE_SCRIPT = """
+local raw = redis.call('HGET', KEYS[1], ARGV[1])
+if not raw then
+    return 0
+end
+local snapshot = cjson.decode(raw)
+if redis.call('HGET', KEYS[2], snapshot.employee_key) == ARGV[1] then
+    redis.call('HDEL', KEYS[2], snapshot.employee_key)
+end
+if redis.call('HGET', KEYS[3], snapshot.topic_key) == ARGV[1] then
+    redis.call('HDEL', KEYS[3], snapshot.topic_key)
+end
+redis.call('HDEL', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+@dataclass(frozen=True)
+class ActiveQuestionSnapshot:
+    """Снимок полей активного вопроса, нужных для поиска без обращения к БД."""
+
+    token: str
+    group_id: int
+    topic_id: int
+    employee_userid: int
+    duty_userid: Optional[int]
+    status: str
+    start_time: Optional[datetime]
+    activity_status_enabled: Optional[bool]
+
+    @classmethod
+    def from_question(cls, question) -> "ActiveQuestionSnapshot":
+        return cls(
+            token=question.token,
+            group_id=question.group_id,
+            topic_id=question.topic_id,
+            employee_userid=question.employee_userid,
+            duty_userid=question.duty_userid,
+            status=question.status,
+            start_time=question.start_time,
+            activity_status_enabled=question.activity_status_enabled,
+        )
+
+    @property
+    def employee_key(self) -> str:
+        return str(self.employee_userid)
+
+    @property
+    def topic_key(self) -> str:
+        return topic_key(self.group_id, self.topic_id)
+
+    def dumps(self) -> str:
+        data = asdict(self)
+        data["start_time"] = self.start_time.isoformat() if self.start_time else None
+        data["employee_key"] = self.employee_key
+        data["topic_key"] = self.topic_key
+        return json.dumps(data)
+
+    @classmethod
+    def loads(cls, raw: str) -> "ActiveQuestionSnapshot":
+        data = json.loads(raw)
+        data.pop("employee_key", None)
+        data.pop("topic_key", None)
+        if data["start_time"]:
+            data["start_time"] = datetime.fromisoformat(data["start_time"])
+        return cls(**data)
+
+
+def topic_key(group_id: int, topic_id: int) -> str:
+    return f"{group_id}:{topic_id}"
+
+
+class ActiveQuestionsIndex:
+    """
+    Индекс активных вопросов в памяти процесса: токен, специалист и топик -> вопрос.
+    Поддерживается записью из QuestionsRepo и заполняется из БД при запуске бота
+    """
+
+    def __init__(self):
+        self._by_token: dict[str, ActiveQuestionSnapshot] = {}
+        self._by_employee: dict[int, str] = {}
+        self._by_topic: dict[str, str] = {}
+
+    async def get(self, token: str) -> Optional[ActiveQuestionSnapshot]:
+        """
+        Получение активного вопроса по токену
+        :param token: Уникальный токен вопроса
+        :return: Снимок вопроса или None
+        """
+        return self._by_token.get(token)
+
+    async def get_by_employee(
+        self, employee_userid: int
+    ) -> Optional[ActiveQuestionSnapshot]:
+        """
+        Получение активного вопроса специалиста
+        :param employee_userid: Идентификатор Telegram специалиста
+        :return: Снимок вопроса или None
+        """
+        token = self._by_employee.get(employee_userid)
+        return self._by_token.get(token) if token else None
+
+    async def get_by_topic(
+        self, group_id: int, topic_id: int
+    ) -> Optional[ActiveQuestionSnapshot]:
+        """
+        Получение активного вопроса по топику
+        :param group_id: Идентификатор группы Telegram
+        :param topic_id: Идентификатор топика Telegram
+        :return: Снимок вопроса или None
+        """
+        token = self._by_topic.get(topic_key(group_id, topic_id))
+        return self._by_token.get(token) if token else None
+
+    async def put(self, question) -> None:
+        """
+        Обновление вопроса в индексе. Неактивные вопросы из индекса удаляются
+        :param question: Объект вопроса из БД
+        """
+        if question.status not in ACTIVE_STATUSES:
+            await self.remove(question.token)
+            return
+
+        snapshot = ActiveQuestionSnapshot.from_question(question)
+        self._by_token[snapshot.token] = snapshot
+        self._by_employee[snapshot.employee_userid] = snapshot.token
+        self._by_topic[snapshot.topic_key] = snapshot.token
+
+    async def remove(self, *tokens: str) -> None:
+        """
+        Удаление вопросов из индекса
+        :param tokens: Токены вопросов
+        """
+        for token in tokens:
+            snapshot = self._by_token.pop(token, None)
+            if snapshot is None:
+                continue
+            if self._by_employee.get(snapshot.employee_userid) == token:
+                del self._by_employee[snapshot.employee_userid]
+            if self._by_topic.get(snapshot.topic_key) == token:
+                del self._by_topic[snapshot.topic_key]
+
+    async def rebuild(self, questions: Sequence) -> int:
+        """
+        Полное заполнение индекса активными вопросами из БД
+        :param questions: Последовательность активных вопросов
+        :return: Кол-во вопросов в индексе
+        """
+        self._by_token.clear()
+        self._by_employee.clear()
+        self._by_topic.clear()
+        for question in questions:
+            await self.put(question)
+        return len(self._by_token)
+
+
+class RedisActiveQuestionsIndex(ActiveQuestionsIndex):
+    """
+    Индекс активных вопросов в Redis, общий для всех реплик бота.
+    Хранится в трех хешах: снимки вопросов по токену, токены по специалисту и по топику
+    """
+
+    def __init__(self, redis: Redis):
+        super().__init__()
+        self.redis = redis
+        self.questions_key = redis_key("active_questions", "by_token")
+        self.employees_key = redis_key("active_questions", "by_employee")
+        self.topics_key = redis_key("active_questions", "by_topic")
+        self._remove_script = redis.register_script(REMOVE_SCRIPT)
+
+    @property
+    def _keys(self) -> list[str]:
+        return [self.questions_key, self.employees_key, self.topics_key]
+
+    async def _get_by(self, key: str, field: str) -> Optional[ActiveQuestionSnapshot]:
+        token = await self.redis.hget(key, field)
+        return await self.get(token) if token else None
+
+    async def get(self, token: str) -> Optional[ActiveQuestionSnapshot]:
+        raw = await self.redis.hget(self.questions_key, token)
+        return ActiveQuestionSnapshot.loads(raw) if raw else None
+
+    async def get_by_employee(
+        self, employee_userid: int
+    ) -> Optional[ActiveQuestionSnapshot]:
+        return await self._get_by(self.employees_key, str(employee_userid))
+
+    async def get_by_topic(
+        self, group_id: int, topic_id: int
+    ) -> Optional[ActiveQuestionSnapshot]:
+        return await self._get_by(self.topics_key, topic_key(group_id, topic_id))
+
+    async def put(self, question) -> None:
+        if question.status not in ACTIVE_STATUSES:
+            await self.remove(question.token)
+            return
+
+        snapshot = ActiveQuestionSnapshot.from_question(question)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(self.questions_key, snapshot.token, snapshot.dumps())
+            pipe.hset(self.employees_key, snapshot.employee_key, snapshot.token)
+            pipe.hset(self.topics_key, snapshot.topic_key, snapshot.token)
+            await pipe.execute()
+
+    async def remove(self, *tokens: str) -> None:
+        if not tokens:
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for token in tokens:
+                await self._remove_script(keys=self._keys, args=[token], client=pipe)
+            await pipe.execute()
+
+    async def rebuild(self, questions: Sequence) -> int:
+        snapshots = [
+            ActiveQuestionSnapshot.from_question(question)
+            for question in questions
+            if question.status in ACTIVE_STATUSES
+        ]
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*self._keys)
+            if snapshots:
+                pipe.hset(
+                    self.questions_key,
+                    mapping={s.token: s.dumps() for s in snapshots},
+                )
+                pipe.hset(
+                    self.employees_key,
+                    mapping={s.employee_key: s.token for s in snapshots},
+                )
+                pipe.hset(
+                    self.topics_key,
+                    mapping={s.topic_key: s.token for s in snapshots},
+                )
+            await pipe.execute()
+
+        return len(snapshots)
+
+
+def create_active_questions_index() -> ActiveQuestionsIndex:
+    """
+    Создание индекса активных вопросов: в Redis, если он включен, иначе в памяти процесса
+    :return: Индекс активных вопросов
+    """
+    redis = get_redis()
+    return RedisActiveQuestionsIndex(redis) if redis else ActiveQuestionsIndex()
+
+
+active_questions_index = create_active_questions_index()
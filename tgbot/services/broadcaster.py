@@ -1,10 +1,35 @@
 import asyncio
 import logging
-from typing import Union
+import time
+import uuid
+from typing import Optional, Union
 
 from aiogram import Bot, exceptions
 from aiogram.types import InlineKeyboardMarkup
 
+from tgbot.services.logger import setup_logging
+from tgbot.services.rate_limit import Priority, priority
+from tgbot.services.redis_client import get_redis, redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Статусы доставки. FAILED - постоянная ошибка запроса (например, чат не найден),
+# RETRY - временная ошибка сети или Telegram
+SENT = "sent"
+BLOCKED = "blocked"
+FAILED = "failed"
+RETRY = "retry"
+
+# Получатели с этими статусами пропускаются при повторном запуске рассылки
+FINAL_STATUSES = frozenset({SENT, BLOCKED, FAILED})
+
+# Сколько хранится состояние доставки рассылки
+STATE_TTL = 7 * 24 * 3600
+
+# Состояние доставки без Redis: broadcast_id -> user_id -> статус
+_memory_state: dict[str, dict[str, str]] = {}
+
 
 async def send_message(
     bot: Bot,
@@ -35,13 +60,10 @@ async def send_message(
     except exceptions.TelegramForbiddenError:
         logging.error(f"Target [ID:{user_id}]: got TelegramForbiddenError")
     except exceptions.TelegramRetryAfter as e:
+        # Повторы после RetryAfter уже сделал RequestRateLimitMiddleware
         logging.error(
-            f"Target [ID:{user_id}]: Flood limit is exceeded. Sleep {e.retry_after} seconds."
+            f"Target [ID:{user_id}]: Flood limit is exceeded, retry after {e.retry_after} seconds."
         )
-        await asyncio.sleep(e.retry_after)
-        return await send_message(
-            bot, user_id, text, disable_notification, reply_markup
-        )  # Recursive call
     except exceptions.TelegramAPIError:
         logging.exception(f"Target [ID:{user_id}]: failed")
     else:
@@ -50,32 +72,293 @@ async def send_message(
     return False
 
 
+def make_broadcast_id() -> str:
+    """
+    Новый идентификатор рассылки. Чтобы продолжить рассылку после перезапуска,
+    нужно передать идентификатор прошлого запуска явно
+    :return: Идентификатор рассылки
+    """
+    return uuid.uuid4().hex[:16]
+
+
+class DeliveryState:
+    """Состояние доставки рассылки по получателям. Хранится в Redis, без него - в памяти процесса."""
+
+    def __init__(self, broadcast_id: str):
+        self.broadcast_id = broadcast_id
+        self.key = redis_key("broadcast", broadcast_id)
+
+    async def load(self) -> dict[str, str]:
+        """
+        Получение сохраненных статусов доставки
+        :return: Словарь user_id -> статус
+        """
+        redis = get_redis()
+        if redis is None:
+            return dict(_memory_state.get(self.broadcast_id, {}))
+        return await redis.hgetall(self.key)
+
+    async def mark(self, user_id: Union[str, int], status: str) -> None:
+        """
+        Сохранение статуса доставки получателю
+        :param user_id: Идентификатор получателя
+        :param status: Статус доставки
+        """
+        redis = get_redis()
+        if redis is None:
+            _memory_state.setdefault(self.broadcast_id, {})[str(user_id)] = status
+            return
+
+        async with redis.pipeline(transaction=False) as pipe:
+            pipe.hset(self.key, str(user_id), status)
+            pipe.expire(self.key, STATE_TTL)
+            await pipe.execute()
+
+
+class AimdPacer:
+    """
+    Темп отправки по принципу AIMD: после каждой успешной отправки скорость растет на increase
+    сообщений в секунду, а при RetryAfter падает вдвое, и отправка приостанавливается на указанное время
+    """
+
+    def __init__(
+        self, max_rate: float = 20, min_rate: float = 1, increase: float = 0.5
+    ):
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.rate = max(min_rate, max_rate / 2)
+
+        self._next = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        """Ожидание очереди на отправку следующего сообщения."""
+        async with self._lock:
+            delay = self._next - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next = max(self._next, time.monotonic()) + 1 / self.rate
+
+    def success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def throttle(self, retry_after: float) -> None:
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._next = max(self._next, time.monotonic() + retry_after)
+
+
+class Broadcaster:
+    """
+    Рассылка сообщения списку пользователей пулом воркеров.
+
+    Общий темп отправки задает AimdPacer. Статус доставки каждому получателю сохраняется сразу
+    после отправки, поэтому повторный запуск с тем же broadcast_id после перезапуска пропускает тех,
+    кому сообщение уже доставлено или не может быть доставлено, и повторяет отправку после временных ошибок.
+    Без broadcast_id каждый запуск - новая рассылка.
+    Если указан status_chat_id, прогресс выводится в сообщение,
+    которое обновляется раз в progress_interval секунд
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        users: list[Union[str, int]],
+        text: str,
+        disable_notification: bool = False,
+        reply_markup: InlineKeyboardMarkup = None,
+        broadcast_id: Optional[str] = None,
+        workers: int = 8,
+        max_rate: float = 20,
+        max_attempts: int = 2,
+        status_chat_id: Optional[Union[int, str]] = None,
+        progress_interval: float = 3,
+    ):
+        self.bot = bot
+        # Повторы в списке получают сообщение один раз
+        self.users = list(dict.fromkeys(users))
+        self.text = text
+        self.disable_notification = disable_notification
+        self.reply_markup = reply_markup
+        self.broadcast_id = broadcast_id or make_broadcast_id()
+        self.workers = workers
+        # RetryAfter доходит сюда, только когда RequestRateLimitMiddleware уже исчерпал свои повторы,
+        # поэтому каждая попытка - это несколько запросов
+        self.max_attempts = max_attempts
+        self.status_chat_id = status_chat_id
+        self.progress_interval = progress_interval
+
+        self.state = DeliveryState(self.broadcast_id)
+        self.pacer = AimdPacer(max_rate=max_rate)
+
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._attempts: dict[Union[str, int], int] = {}
+        self._status_message_id: Optional[int] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.users)
+
+    def result(self) -> dict:
+        return {
+            "broadcast_id": self.broadcast_id,
+            "total": self.total,
+            "sent": self.sent,
+            "failed": self.failed,
+            "skipped": self.skipped,
+        }
+
+    def _status_text(self, finished: bool = False) -> str:
+        done = self.sent + self.failed + self.skipped
+        title = "✅ Рассылка завершена" if finished else "📢 Рассылка"
+        return f"""<b>{title}</b>
+
+Обработано: {done} из {self.total}
+Отправлено: {self.sent}
+Ошибок: {self.failed}
+Пропущено (уже обработано): {self.skipped}"""
+
+    async def _report(self, finished: bool = False) -> None:
+        if self.status_chat_id is None:
+            return
+
+        text = self._status_text(finished)
+        try:
+            if self._status_message_id is None:
+                message = await self.bot.send_message(self.status_chat_id, text)
+                self._status_message_id = message.message_id
+            else:
+                await self.bot.edit_message_text(
+                    text,
+                    chat_id=self.status_chat_id,
+                    message_id=self._status_message_id,
+                )
+        except exceptions.TelegramAPIError as e:
+            # В том числе "message is not modified", если прогресс не изменился
+            logger.debug(f"[Рассылка] Не удалось обновить прогресс: {e}")
+
+    async def _report_progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            await self._report()
+
+    async def _deliver(self, user_id: Union[str, int]) -> None:
+        try:
+            await self.bot.send_message(
+                user_id,
+                self.text,
+                disable_notification=self.disable_notification,
+                reply_markup=self.reply_markup,
+            )
+        except exceptions.TelegramRetryAfter as e:
+            self.pacer.throttle(e.retry_after)
+            self._attempts[user_id] = self._attempts.get(user_id, 0) + 1
+            if self._attempts[user_id] < self.max_attempts:
+                logger.warning(
+                    f"[Рассылка] RetryAfter {e.retry_after} сек для {user_id}, темп снижен до {self.pacer.rate:.1f}/сек"
+                )
+                self._queue.put_nowait(user_id)
+                return
+            logger.error(f"[Рассылка] {user_id}: превышено кол-во попыток")
+            status = RETRY
+        except exceptions.TelegramForbiddenError:
+            logger.warning(f"[Рассылка] {user_id}: бот заблокирован")
+            status = BLOCKED
+        except exceptions.TelegramBadRequest as e:
+            logger.error(f"[Рассылка] {user_id}: ошибка отправки: {e}")
+            status = FAILED
+        except exceptions.TelegramAPIError as e:
+            # Ошибки сети и сервера Telegram: получатель остается для повторного запуска
+            logger.error(f"[Рассылка] {user_id}: временная ошибка отправки: {e}")
+            status = RETRY
+        else:
+            self.pacer.success()
+            status = SENT
+
+        if status == SENT:
+            self.sent += 1
+        else:
+            self.failed += 1
+        await self.state.mark(user_id, status)
+
+    async def _worker(self) -> None:
+        while not self._queue.empty():
+            user_id = self._queue.get_nowait()
+            await self.pacer.wait()
+            await self._deliver(user_id)
+
+    async def run(self) -> dict:
+        """
+        Запуск рассылки
+        :return: Словарь с идентификатором рассылки и кол-вом отправленных, ошибочных и пропущенных сообщений
+        """
+        statuses = await self.state.load()
+        for user_id in self.users:
+            if statuses.get(str(user_id)) in FINAL_STATUSES:
+                self.skipped += 1
+            else:
+                self._queue.put_nowait(user_id)
+
+        logger.info(
+            f"[Рассылка] {self.broadcast_id}: {self._queue.qsize()} получателей, пропущено {self.skipped}"
+        )
+
+        await self._report()
+        progress = asyncio.create_task(self._report_progress())
+        try:
+            with priority(Priority.NORMAL):
+                # Воркер, вернувший сообщение в очередь после RetryAfter, сам его и дождется,
+                # поэтому рассылка заканчивается, только когда очередь пуста у всех воркеров
+                while not self._queue.empty():
+                    await asyncio.gather(
+                        *(
+                            self._worker()
+                            for _ in range(min(self.workers, self._queue.qsize()))
+                        )
+                    )
+        finally:
+            progress.cancel()
+            try:
+                await progress
+            except asyncio.CancelledError:
+                pass
+
+        await self._report(finished=True)
+        logger.info(f"[Рассылка] {self.broadcast_id}: {self.result()}")
+        return self.result()
+
+
 async def broadcast(
     bot: Bot,
     users: list[Union[str, int]],
     text: str,
     disable_notification: bool = False,
     reply_markup: InlineKeyboardMarkup = None,
+    broadcast_id: Optional[str] = None,
+    status_chat_id: Optional[Union[int, str]] = None,
 ) -> int:
     """
-    Simple broadcaster.
-    :param bot: Bot instance.
-    :param users: List of users.
-    :param text: Text of the message.
-    :param disable_notification: Disable notification or not.
-    :param reply_markup: Reply markup.
-    :return: Count of messages.
+    Рассылка сообщения списку пользователей
+    :param bot: Экземпляр бота
+    :param users: Список пользователей
+    :param text: Текст рассылки
+    :param disable_notification: Выключить или включить уведомление
+    :param reply_markup: Клавиатура
+    :param broadcast_id: Идентификатор прошлой рассылки для ее продолжения после перезапуска. По умолчанию - новая рассылка
+    :param status_chat_id: Чат для вывода прогресса рассылки
+    :return: Кол-во отправленных сообщений
     """
-    count = 0
-    try:
-        for user_id in users:
-            if await send_message(
-                bot, user_id, text, disable_notification, reply_markup
-            ):
-                count += 1
-            await asyncio.sleep(
-                0.05
-            )  # 20 messages per second (Limit: 30 messages per second)
-    finally:
-        logging.info(f"{count} messages successful sent.")
-        return count
+    broadcaster = Broadcaster(
+        bot,
+        users,
+        text,
+        disable_notification=disable_notification,
+        reply_markup=reply_markup,
+        broadcast_id=broadcast_id,
+        status_chat_id=status_chat_id,
+    )
+    result = await broadcaster.run()
+    return result["sent"]
@@ -0,0 +1,81 @@
+import time
+from collections import OrderedDict
+from typing import Any, Generic, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Признак отсутствия значения в кеше, чтобы отличать его от закешированного None
+MISSING: Any = object()
+
+
+class TTLCache(Generic[T]):
+    """
+    Кеш в памяти процесса с ограничением по времени жизни записей и размеру.
+    При переполнении вытесняются давно не использованные записи
+    """
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, tuple[float, T]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = MISSING) -> T | Any:
+        """
+        Получение значения из кеша
+        :param key: Ключ записи
+        :param default: Значение, возвращаемое при отсутствии или устаревании записи
+        :return: Значение записи или default
+        """
+        item = self._data.get(key)
+        if item is None:
+            return default
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: T, ttl: Optional[float] = None) -> None:
+        """
+        Запись значения в кеш
+        :param key: Ключ записи
+        :param value: Значение
+        :param ttl: Время жизни записи в секундах. По умолчанию - ttl кеша
+        """
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def incr(self, key: Hashable, delta: int = 1) -> int | Any:
+        """
+        Изменение числового значения записи без продления времени ее жизни
+        :param key: Ключ записи
+        :param delta: Величина изменения
+        :return: Новое значение или MISSING, если записи в кеше нет
+        """
+        value = self.get(key)
+        if value is MISSING:
+            return MISSING
+
+        expires_at, _ = self._data[key]
+        self._data[key] = (expires_at, value + delta)
+        return value + delta
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """
+        Удаление записей из кеша
+        :param keys: Ключи записей
+        """
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очистка кеша."""
+        self._data.clear()
@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytz
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from infrastructure.database.repo.questions.requests import QuestionsRequestsRepo
+from tgbot.config import load_config
+from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import get_redis, redis_key
+
+config = load_config(".env")
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Размер пачки вопросов, обрабатываемой за одну короткую транзакцию
+QUESTIONS_CHUNK_SIZE = 500
+# Размер пачки пар сообщений для удаления, если таблица пар не секционирована
+PAIRS_CHUNK_SIZE = 1000
+# Срок хранения пар сообщений: вопрос старше дня вернуть нельзя
+PAIRS_RETENTION_DAYS = 1
+# На сколько дней вперед создаются секции таблицы пар сообщений
+PAIRS_PARTITIONS_AHEAD_DAYS = 7
+# Кол-во одновременных запросов на удаление топиков
+TOPIC_WORKERS = 5
+# Кол-во попыток удаления топика при ограничениях Telegram
+TOPIC_RETRIES = 3
+
+CURSOR_KEY = redis_key("cleanup", "old_topics", "cursor")
+
+# Курсор на случай работы без Redis
+_memory_cursor: dict[str, str] = {}
+
+_cleanup_lock = asyncio.Lock()
+
+
+def _encode_cursor(start_time: datetime, token: str) -> str:
+    return f"{start_time.isoformat()}|{token}"
+
+
+def _decode_cursor(value: Optional[str]) -> Optional[tuple[datetime, str]]:
+    if not value:
+        return None
+    start_time, _, token = value.partition("|")
+    return datetime.fromisoformat(start_time), token
+
+
+async def _load_cursor() -> Optional[tuple[datetime, str]]:
+    redis = get_redis()
+    value = await redis.get(CURSOR_KEY) if redis else _memory_cursor.get(CURSOR_KEY)
+    return _decode_cursor(value)
+
+
+async def _save_cursor(start_time: datetime, token: str) -> None:
+    value = _encode_cursor(start_time, token)
+    redis = get_redis()
+    if redis:
+        await redis.set(CURSOR_KEY, value)
+    else:
+        _memory_cursor[CURSOR_KEY] = value
+
+
+async def _clear_cursor() -> None:
+    redis = get_redis()
+    if redis:
+        await redis.delete(CURSOR_KEY)
+    else:
+        _memory_cursor.pop(CURSOR_KEY, None)
+
+
+class TopicDeleter:
+    """
+    Пул воркеров для удаления топиков с учетом ограничений Telegram.
+    При получении RetryAfter все воркеры приостанавливаются на указанное время
+    """
+
+    def __init__(self, bot: Bot, workers: int = TOPIC_WORKERS):
+        self.bot = bot
+        self.workers = workers
+        self.deleted = 0
+        self.failed = 0
+        self._resume_at = 0.0
+
+    async def _wait_pause(self) -> None:
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _delete_topic(self, group_id: int, topic_id: int) -> None:
+        for _ in range(TOPIC_RETRIES):
+            await self._wait_pause()
+            try:
+                await self.bot.delete_forum_topic(
+                    chat_id=group_id, message_thread_id=topic_id
+                )
+                self.deleted += 1
+                return
+            except TelegramRetryAfter as e:
+                self._resume_at = max(self._resume_at, time.monotonic() + e.retry_after)
+                logger.warning(
+                    f"[Старые топики] Ограничение Telegram, пауза {e.retry_after} с"
+                )
+            except TelegramBadRequest as e:
+                # Топик уже удален или недоступен - повторять бессмысленно
+                logger.warning(
+                    f"[Старые топики] Топик {topic_id} в группе {group_id} не удален: {e}"
+                )
+                self.failed += 1
+                return
+            except Exception as e:
+                logger.error(
+                    f"[Старые топики] Ошибка при удалении топика {topic_id}: {e}"
+                )
+                self.failed += 1
+                return
+
+        self.failed += 1
+        logger.error(
+            f"[Старые топики] Топик {topic_id} в группе {group_id} не удален после {TOPIC_RETRIES} попыток"
+        )
+
+    async def delete_many(self, topics: list[tuple[int, int]]) -> None:
+        """
+        Удаление списка топиков ограниченным пулом воркеров
+        :param topics: Список пар (group_id, topic_id)
+        """
+        queue: asyncio.Queue[tuple[int, int]] = asyncio.Queue()
+        for topic in topics:
+            queue.put_nowait(topic)
+
+        async def worker():
+            while not queue.empty():
+                group_id, topic_id = queue.get_nowait()
+                await self._delete_topic(group_id, topic_id)
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(topics)))))
+
+
+async def remove_old_topics(bot: Bot, session_pool) -> dict:
+    """
+    Удаление старых вопросов и их топиков.
+
+    Вопросы обходятся пачками в порядке (start_time, token), каждая пачка удаляется одним запросом
+    в отдельной короткой транзакции. Курсор последней пачки с удаленными топиками сохраняется,
+    поэтому после перезапуска топики уже обработанных вопросов повторно не удаляются
+    :param bot: Экземпляр бота
+    :param session_pool: Пул сессий БД вопросника
+    :return: Словарь со статистикой очистки
+    """
+    if _cleanup_lock.locked():
+        logger.info("[Старые топики] Очистка уже выполняется, пропускаем запуск")
+        return {}
+
+    async with _cleanup_lock:
+        started_at = time.perf_counter()
+        today = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
+        old_questions_date = today - timedelta(
+            days=config.questioner.remove_old_questions_days
+        )
+
+        deleter = TopicDeleter(bot)
+        deleted_questions = 0
+        errors = []
+
+        try:
+            cursor = await _load_cursor()
+            after = None
+
+            while True:
+                async with session_pool() as session:
+                    questions_repo = QuestionsRequestsRepo(session)
+                    rows = await questions_repo.questions.get_old_questions_chunk(
+                        old_date=old_questions_date,
+                        after=after,
+                        limit=QUESTIONS_CHUNK_SIZE,
+                    )
+                if not rows:
+                    break
+
+                last = rows[-1]
+                after = (last.start_time, last.token)
+
+                # Топики вопросов до курсора уже удалялись в прошлый запуск
+                topics = [
+                    (row.group_id, row.topic_id)
+                    for row in rows
+                    if cursor is None or (row.start_time, row.token) > cursor
+                ]
+                if topics:
+                    await deleter.delete_many(topics)
+                    await _save_cursor(*after)
+
+                async with session_pool() as session:
+                    questions_repo = QuestionsRequestsRepo(session)
+                    result = await questions_repo.questions.delete_questions_by_tokens(
+                        [row.token for row in rows]
+                    )
+                deleted_questions += result["deleted_count"]
+                errors.extend(result["errors"])
+
+            # Курсор нужен следующему запуску, пока в БД остались вопросы с уже удаленными топиками
+            if not errors:
+                await _clear_cursor()
+        except Exception as e:
+            errors.append(str(e))
+            logger.error(
+                f"[Старые топики] Общая ошибка при удалении старых данных: {e}"
+            )
+
+        logger.info(
+            f"[Старые топики] Удалено {deleted_questions} старых вопросов, топиков: {deleter.deleted}, не удалось удалить топиков: {deleter.failed}"
+        )
+        if errors:
+            logger.info(
+                f"[Старые топики] Произошла ошибка при удалении части данных: {errors}"
+            )
+        logger.info(
+            f"[Старые топики] Очистка заняла {time.perf_counter() - started_at:.2f} с"
+        )
+
+        return {
+            "success": not errors,
+            "deleted_count": deleted_questions,
+            "deleted_topics": deleter.deleted,
+            "failed_topics": deleter.failed,
+            "errors": errors,
+        }
+
+
+async def rotate_messages_pairs(session_pool) -> dict:
+    """
+    Обслуживание таблицы пар сообщений: создание дневных секций наперед и удаление устаревших секций целиком.
+    Если таблица не секционирована, старые пары удаляются пачками
+    :param session_pool: Пул сессий БД вопросника
+    :return: Словарь со статистикой очистки
+    """
+    today = datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")).replace(tzinfo=None)
+    old_pairs_date = today - timedelta(days=PAIRS_RETENTION_DAYS)
+
+    try:
+        async with session_pool() as session:
+            questions_repo = QuestionsRequestsRepo(session)
+            pairs_repo = questions_repo.messages_pairs
+
+            if not await pairs_repo.get_partitions():
+                result = await pairs_repo.delete_pairs_older_than(
+                    old_pairs_date, chunk_size=PAIRS_CHUNK_SIZE
+                )
+                logger.info(
+                    f"[Старые пары] Удалено {result['deleted_count']} старых пар сообщений"
+                )
+                return result
+
+            added = await pairs_repo.add_daily_partitions(
+                until=today.date() + timedelta(days=PAIRS_PARTITIONS_AHEAD_DAYS)
+            )
+            dropped = await pairs_repo.drop_partitions_before(old_pairs_date.date())
+    except Exception as e:
+        logger.error(f"[Старые пары] Ошибка обслуживания таблицы пар сообщений: {e}")
+        return {
+            "success": False,
+            "added_partitions": [],
+            "dropped_partitions": [],
+            "errors": [str(e)],
+        }
+
+    logger.info(
+        f"[Старые пары] Создано секций: {len(added)}, удалено устаревших секций: {len(dropped)} {dropped}"
+    )
+    return {
+        "success": True,
+        "added_partitions": added,
+        "dropped_partitions": dropped,
+        "errors": [],
+    }
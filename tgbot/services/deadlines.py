@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+
+from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+DeadlineHandler = Callable[[str], Awaitable[None]]
+
+# Забираем дедлайн, только если в Redis он все еще просрочен.
+# Если другой процесс успел продлить или удалить дедлайн - пропускаем его
+CLAIM_SCRIPT = """
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score and tonumber(score) <= tonumber(ARGV[2]) then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def _timestamp(due: datetime | float) -> float:
+    return due.timestamp() if isinstance(due, datetime) else float(due)
+
+
+class DeadlineIndex:
+    """
+    Индекс дедлайнов с единым обработчиком просроченных записей.
+
+    Без Redis дедлайны хранятся в памяти в виде кучи, отсортированной по времени срабатывания.
+    Продление дедлайна - это одна запись в кучу вместо пересоздания задач планировщика.
+    Устаревшие записи кучи удаляются лениво при обходе.
+
+    С Redis дедлайны хранятся только в sorted set, локальной копии у реплик нет: продление - один ZADD,
+    а просроченные записи выбираются из sorted set, поэтому дедлайны, выставленные другими репликами бота,
+    тоже срабатывают у реплики, выполняющей обход.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        redis: Optional[Redis] = None,
+        interval: float = 1.0,
+        batch_size: int = 500,
+    ):
+        self.name = name
+        self.key = redis_key("deadlines", name)
+        self.redis = redis
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self._due: dict[str, float] = {}
+        self._heap: list[tuple[float, str]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._claim_script = redis.register_script(CLAIM_SCRIPT) if redis else None
+
+    async def snapshot(self) -> dict[str, float]:
+        """
+        Получение всех запланированных записей
+        :return: Словарь вида {идентификатор записи: Unix-время срабатывания}
+        """
+        if not self.redis:
+            return dict(self._due)
+
+        items = await self.redis.zrange(self.key, 0, -1, withscores=True)
+        return {member: float(score) for member, score in items}
+
+    def _push(self, member: str, due: float) -> None:
+        self._due[member] = due
+        heapq.heappush(self._heap, (due, member))
+
+        # Не даем куче разрастись из-за устаревших записей
+        if len(self._heap) > 2 * len(self._due) + 64:
+            self._heap = [(ts, m) for m, ts in self._due.items()]
+            heapq.heapify(self._heap)
+
+    async def touch(self, deadlines: dict[str, datetime | float]) -> None:
+        """
+        Установка или продление дедлайнов
+        :param deadlines: Словарь вида {идентификатор записи: время срабатывания}
+        """
+        if not deadlines:
+            return
+
+        mapping = {member: _timestamp(due) for member, due in deadlines.items()}
+        if self.redis:
+            # Источник истины - Redis, в памяти ничего не храним: иначе записи копились бы
+            # у реплик, которые не выполняют обход и не забирают просроченные дедлайны
+            await self.redis.zadd(self.key, mapping)
+            return
+
+        for member, due in mapping.items():
+            self._push(member, due)
+
+    async def discard(self, *members: str) -> None:
+        """
+        Удаление дедлайнов
+        :param members: Идентификаторы записей
+        """
+        if not members:
+            return
+
+        if self.redis:
+            await self.redis.zrem(self.key, *members)
+            return
+
+        for member in members:
+            self._due.pop(member, None)
+
+    async def count(self) -> int:
+        """
+        Подсчет запланированных записей
+        :return: Кол-во записей
+        """
+        if not self.redis:
+            return len(self._due)
+
+        return await self.redis.zcard(self.key)
+
+    def _pop_due(self, now: float) -> list[str]:
+        members = []
+        while self._heap and self._heap[0][0] <= now:
+            due, member = heapq.heappop(self._heap)
+            if self._due.get(member) == due:
+                del self._due[member]
+                members.append(member)
+        return members
+
+    async def _fetch_due(self, now: float) -> list[str]:
+        if not self.redis:
+            return self._pop_due(now)
+
+        members = await self.redis.zrangebyscore(
+            self.key, "-inf", now, start=0, num=self.batch_size
+        )
+        return await self._claim(members, now)
+
+    async def _claim(self, members: list[str], now: float) -> list[str]:
+        if not members:
+            return members
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for member in members:
+                await self._claim_script(
+                    keys=[self.key], args=[member, now], client=pipe
+                )
+            results = await pipe.execute()
+
+        return [member for member, claimed in zip(members, results) if claimed]
+
+    async def sweep(self, handler: DeadlineHandler) -> int:
+        """
+        Обработка всех просроченных дедлайнов
+        :param handler: Обработчик, получающий идентификатор записи
+        :return: Кол-во обработанных записей
+        """
+        now = time.time()
+        members = await self._fetch_due(now)
+        if not members:
+            return 0
+
+        results = await asyncio.gather(
+            *(handler(member) for member in members), return_exceptions=True
+        )
+        for member, result in zip(members, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"[Дедлайны] Ошибка при обработке записи {member} индекса {self.name}: {result}"
+                )
+        return len(members)
+
+    async def _run(self, handler: DeadlineHandler) -> None:
+        while True:
+            try:
+                await self.sweep(handler)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Дедлайны] Ошибка обхода индекса {self.name}: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, handler: DeadlineHandler) -> None:
+        """
+        Запуск фонового обхода индекса
+        :param handler: Обработчик просроченных записей
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(handler))
+
+    async def stop(self) -> None:
+        """Остановка фонового обхода индекса."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
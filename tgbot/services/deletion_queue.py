@@ -0,0 +1,140 @@
+import asyncio
+import heapq
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Optional
+
+from aiogram import Bot
+
+from tgbot.services.logger import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Максимальное кол-во сообщений в одном запросе deleteMessages
+DELETE_BATCH_SIZE = 100
+
+
+async def bulk_delete_messages(bot: Bot, chat_id: int, message_ids: list[int]) -> int:
+    """
+    Удаление сообщений чата пачками через deleteMessages
+    :param bot: Экземпляр бота
+    :param chat_id: Идентификатор чата
+    :param message_ids: Список идентификаторов сообщений
+    :return: Кол-во успешно отправленных пачек
+    """
+    ids = sorted(set(message_ids))
+    sent = 0
+    for i in range(0, len(ids), DELETE_BATCH_SIZE):
+        batch = ids[i : i + DELETE_BATCH_SIZE]
+        try:
+            await bot.delete_messages(chat_id=chat_id, message_ids=batch)
+            sent += 1
+        except Exception as e:
+            logger.error(
+                f"[Удаление сообщений] Ошибка при удалении {len(batch)} сообщений в чате {chat_id}: {e}"
+            )
+    return sent
+
+
+class DeletionQueue:
+    """
+    Очередь отложенного удаления сообщений.
+
+    Сообщения группируются по чату и секунде срабатывания, поэтому все уведомления одного чата,
+    созревшие одновременно, удаляются одним вызовом deleteMessages.
+    Очередь живет в памяти: это временные уведомления, и держать под каждое задачу в хранилище
+    планировщика нет смысла
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self.bot: Optional[Bot] = None
+
+        self._pending: dict[int, dict[int, set[int]]] = {}
+        self._heap: list[int] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return sum(
+            len(ids) for chats in self._pending.values() for ids in chats.values()
+        )
+
+    def add(self, chat_id: int, message_ids: list[int], seconds: float = 60) -> None:
+        """
+        Постановка сообщений в очередь на удаление
+        :param chat_id: Идентификатор чата
+        :param message_ids: Список идентификаторов сообщений
+        :param seconds: Через сколько секунд удалить сообщения
+        """
+        if not message_ids:
+            return
+
+        due = math.ceil(time.time() + seconds)
+        if due not in self._pending:
+            self._pending[due] = defaultdict(set)
+            heapq.heappush(self._heap, due)
+        self._pending[due][chat_id].update(message_ids)
+
+    def _pop_due(self, now: float) -> dict[int, set[int]]:
+        by_chat: dict[int, set[int]] = defaultdict(set)
+        while self._heap and self._heap[0] <= now:
+            due = heapq.heappop(self._heap)
+            for chat_id, ids in self._pending.pop(due).items():
+                by_chat[chat_id].update(ids)
+        return by_chat
+
+    async def flush(self, force: bool = False) -> int:
+        """
+        Удаление созревших сообщений
+        :param force: Удалить все сообщения очереди, не дожидаясь их времени
+        :return: Кол-во сообщений, отправленных на удаление
+        """
+        by_chat = self._pop_due(math.inf if force else time.time())
+        if not by_chat:
+            return 0
+
+        if self.bot is None:
+            logger.error("[Удаление сообщений] Бот не зарегистрирован в очереди")
+            return 0
+
+        await asyncio.gather(
+            *(
+                bulk_delete_messages(self.bot, chat_id, list(ids))
+                for chat_id, ids in by_chat.items()
+            )
+        )
+        return sum(len(ids) for ids in by_chat.values())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[Удаление сообщений] Ошибка обхода очереди: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self, bot: Bot) -> None:
+        """
+        Запуск фоновой обработки очереди
+        :param bot: Экземпляр бота
+        """
+        self.bot = bot
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка обработки очереди с удалением всех оставшихся сообщений."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self.flush(force=True)
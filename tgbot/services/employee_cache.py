@@ -0,0 +1,148 @@
+import json
+import logging
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+
+from infrastructure.database.models import Employee
+from tgbot.services.cache import MISSING, TTLCache
+from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import get_redis, redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Поля, по которым сотрудники кешируются
+CACHED_FIELDS = ("user_id", "fullname")
+
+_EMPLOYEE_COLUMNS = tuple(column.key for column in Employee.__table__.columns)
+
+
+def _dump(employee: Optional[Employee]) -> Optional[dict[str, Any]]:
+    if employee is None:
+        return None
+    return {column: getattr(employee, column) for column in _EMPLOYEE_COLUMNS}
+
+
+def _load(data: Optional[dict[str, Any]]) -> Optional[Employee]:
+    return Employee(**data) if data is not None else None
+
+
+class EmployeeCache:
+    """
+    Двухуровневый кеш сотрудников основной БД: LRU в памяти процесса и, при наличии, Redis.
+
+    Сотрудники кешируются по user_id и ФИО. Отсутствие сотрудника тоже кешируется (на меньший срок),
+    чтобы сообщения незарегистрированных пользователей не нагружали основную БД.
+    Возвращаются копии, не привязанные к сессии
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl: int = 300,
+        negative_ttl: int = 60,
+        maxsize: int = 10000,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._local: TTLCache[Optional[dict]] = TTLCache(ttl=ttl, maxsize=maxsize)
+
+    @staticmethod
+    def _key(field: str, value: Any) -> str:
+        return f"{field}:{value}"
+
+    async def get(self, field: str, value: Any) -> Optional[Employee] | Any:
+        """
+        Получение сотрудника из кеша
+        :param field: Поле поиска (user_id или fullname)
+        :param value: Значение поля
+        :return: Сотрудник, None для закешированного отсутствия или MISSING, если записи в кеше нет
+        """
+        key = self._key(field, value)
+
+        data = self._local.get(key)
+        if data is not MISSING:
+            return _load(data)
+
+        if self.redis is None:
+            return MISSING
+
+        try:
+            raw = await self.redis.get(redis_key("employees", key))
+        except Exception as e:
+            logger.error(f"[Кеш сотрудников] Ошибка чтения из Redis: {e}")
+            return MISSING
+
+        if raw is None:
+            return MISSING
+
+        data = json.loads(raw)
+        self._local.set(key, data, ttl=self.ttl if data else self.negative_ttl)
+        return _load(data)
+
+    async def set(self, field: str, value: Any, employee: Optional[Employee]) -> None:
+        """
+        Запись результата поиска сотрудника в кеш
+        :param field: Поле поиска (user_id или fullname)
+        :param value: Значение поля
+        :param employee: Найденный сотрудник или None
+        """
+        data = _dump(employee)
+        ttl = self.ttl if data else self.negative_ttl
+
+        # Найденного сотрудника кешируем сразу по всем полям
+        keys = (
+            [self._key(f, data[f]) for f in CACHED_FIELDS if data.get(f) is not None]
+            if data
+            else [self._key(field, value)]
+        )
+        for key in keys:
+            self._local.set(key, data, ttl=ttl)
+
+        if self.redis is None:
+            return
+
+        try:
+            raw = json.dumps(data, ensure_ascii=False)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.set(redis_key("employees", key), raw, ex=ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"[Кеш сотрудников] Ошибка записи в Redis: {e}")
+
+    async def invalidate(self, *employees: Optional[Employee], **fields: Any) -> None:
+        """
+        Удаление сотрудников из кеша
+        :param employees: Объекты сотрудников, записи которых нужно удалить по всем полям
+        :param fields: Отдельные значения полей, например user_id=123
+        """
+        keys = [
+            self._key(field, value)
+            for field, value in fields.items()
+            if value is not None
+        ]
+        for employee in employees:
+            if employee is not None:
+                keys.extend(
+                    self._key(field, getattr(employee, field))
+                    for field in CACHED_FIELDS
+                    if getattr(employee, field) is not None
+                )
+        if not keys:
+            return
+
+        self._local.invalidate(*keys)
+
+        if self.redis is None:
+            return
+
+        try:
+            await self.redis.delete(*(redis_key("employees", key) for key in keys))
+        except Exception as e:
+            logger.error(f"[Кеш сотрудников] Ошибка удаления из Redis: {e}")
+
+
+employee_cache = EmployeeCache(redis=get_redis())
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from redis.asyncio import Redis
+
+from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+LeadershipHandler = Callable[[], Awaitable[None]]
+
+# Продлеваем аренду, только если она все еще принадлежит нам
+RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Освобождаем аренду, только если она все еще принадлежит нам
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class LeaderLease:
+    """
+    Аренда лидерства на основе Redis.
+
+    Каждая реплика бота периодически пытается захватить ключ аренды через SET NX PX.
+    Лидер продлевает аренду, пока жив. Если лидер упал, аренда истекает через ttl секунд,
+    и ее захватывает другая реплика. Без Redis процесс считается единственным и сразу становится лидером
+    """
+
+    def __init__(
+        self,
+        name: str,
+        redis: Optional[Redis] = None,
+        ttl: float = 30.0,
+        renew_interval: float = 10.0,
+        on_acquired: Optional[LeadershipHandler] = None,
+        on_lost: Optional[LeadershipHandler] = None,
+    ):
+        self.name = name
+        self.key = redis_key("leader", name)
+        self.redis = redis
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.on_acquired = on_acquired
+        self.on_lost = on_lost
+
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+        self._renewed_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._renew_script = redis.register_script(RENEW_SCRIPT) if redis else None
+        self._release_script = redis.register_script(RELEASE_SCRIPT) if redis else None
+
+    async def _acquire(self) -> bool:
+        return bool(
+            await self.redis.set(self.key, self.owner, nx=True, px=int(self.ttl * 1000))
+        )
+
+    async def _renew(self) -> bool:
+        return bool(
+            await self._renew_script(
+                keys=[self.key], args=[self.owner, int(self.ttl * 1000)]
+            )
+        )
+
+    async def _become_leader(self) -> None:
+        self.is_leader = True
+        self._renewed_at = time.monotonic()
+        logger.info(f"[Лидер] Реплика {self.owner} стала лидером {self.name}")
+        if self.on_acquired:
+            try:
+                await self.on_acquired()
+            except Exception as e:
+                logger.error(f"[Лидер] Ошибка при получении лидерства {self.name}: {e}")
+
+    async def _step_down(self) -> None:
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        logger.warning(f"[Лидер] Реплика {self.owner} потеряла лидерство {self.name}")
+        if self.on_lost:
+            try:
+                await self.on_lost()
+            except Exception as e:
+                logger.error(f"[Лидер] Ошибка при потере лидерства {self.name}: {e}")
+
+    async def _tick(self) -> None:
+        try:
+            if self.is_leader:
+                if await self._renew():
+                    self._renewed_at = time.monotonic()
+                else:
+                    await self._step_down()
+            elif await self._acquire():
+                await self._become_leader()
+        except Exception as e:
+            logger.error(f"[Лидер] Ошибка обращения к Redis: {e}")
+            # Пока Redis недоступен, аренда может истечь и перейти к другой реплике
+            if self.is_leader and time.monotonic() - self._renewed_at >= self.ttl:
+                await self._step_down()
+
+    async def _run(self) -> None:
+        while True:
+            await self._tick()
+            await asyncio.sleep(self.renew_interval)
+
+    async def start(self) -> None:
+        """Запуск борьбы за лидерство. Первая попытка захвата выполняется сразу."""
+        if self.redis is None:
+            await self._become_leader()
+            return
+
+        await self._tick()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка с освобождением аренды, чтобы другая реплика подхватила лидерство без ожидания ttl."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        was_leader = self.is_leader
+        await self._step_down()
+
+        if was_leader and self.redis is not None:
+            try:
+                await self._release_script(keys=[self.key], args=[self.owner])
+            except Exception as e:
+                logger.error(f"[Лидер] Ошибка при освобождении аренды {self.name}: {e}")
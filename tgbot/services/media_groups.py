@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import (
+    InputMediaAudio,
+    InputMediaDocument,
+    InputMediaPhoto,
+    InputMediaVideo,
+    Message,
+)
+
+from tgbot.services.logger import setup_logging
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+InputMedia = InputMediaAudio | InputMediaDocument | InputMediaPhoto | InputMediaVideo
+
+
+class MediaGroupBuffer:
+    """
+    Сбор сообщений альбома перед пересылкой.
+
+    Каждое сообщение альбома приходит отдельным апдейтом. Первое сообщение ждет, пока в течение
+    window секунд не перестанут приходить остальные, и забирает альбом целиком,
+    а обработчики остальных сообщений сразу завершаются
+    """
+
+    def __init__(self, window: float = 0.5):
+        self.window = window
+        self._groups: dict[tuple[int, str], list[Message]] = {}
+        self._updated: dict[tuple[int, str], float] = {}
+
+    async def collect(self, message: Message) -> Optional[list[Message]]:
+        """
+        Добавление сообщения в альбом
+        :param message: Сообщение с media_group_id
+        :return: Сообщения альбома по возрастанию идентификатора для первого сообщения, None для остальных
+        """
+        key = (message.chat.id, message.media_group_id)
+        self._updated[key] = time.monotonic()
+
+        group = self._groups.get(key)
+        if group is not None:
+            group.append(message)
+            return None
+
+        self._groups[key] = [message]
+        try:
+            while True:
+                delay = self._updated[key] + self.window - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            group = self._groups.pop(key)
+            self._updated.pop(key, None)
+
+        return sorted(group, key=lambda item: item.message_id)
+
+
+def input_media(message: Message) -> Optional[InputMedia]:
+    """
+    Медиа сообщения для отправки в составе альбома
+    :param message: Сообщение альбома
+    :return: Медиа с подписью или None, если тип сообщения не может быть в альбоме
+    """
+    # Подпись передается вместе с форматированием, поэтому parse_mode не нужен
+    caption = {
+        "caption": message.caption,
+        "caption_entities": message.caption_entities,
+        "parse_mode": None,
+    }
+    if message.photo:
+        return InputMediaPhoto(
+            media=message.photo[-1].file_id,
+            has_spoiler=message.has_media_spoiler,
+            show_caption_above_media=message.show_caption_above_media,
+            **caption,
+        )
+    if message.video:
+        return InputMediaVideo(
+            media=message.video.file_id,
+            has_spoiler=message.has_media_spoiler,
+            show_caption_above_media=message.show_caption_above_media,
+            **caption,
+        )
+    if message.document:
+        return InputMediaDocument(media=message.document.file_id, **caption)
+    if message.audio:
+        return InputMediaAudio(media=message.audio.file_id, **caption)
+    return None
+
+
+async def relay_messages(
+    bot: Bot,
+    messages: list[Message],
+    chat_id: int,
+    message_thread_id: Optional[int] = None,
+    reply_to_message_id: Optional[int] = None,
+) -> list[Optional[int]]:
+    """
+    Пересылка сообщения или альбома в другой чат
+    :param bot: Экземпляр бота
+    :param messages: Сообщение или сообщения альбома одного чата по возрастанию идентификатора
+    :param chat_id: Идентификатор чата назначения
+    :param message_thread_id: Идентификатор топика назначения
+    :param reply_to_message_id: Идентификатор сообщения в чате назначения, на которое нужно ответить
+    :return: Идентификаторы отправленных сообщений в порядке исходных. None, если соответствие не известно
+    """
+    from_chat_id = messages[0].chat.id
+
+    if len(messages) == 1:
+        copied = await bot.copy_message(
+            from_chat_id=from_chat_id,
+            message_id=messages[0].message_id,
+            chat_id=chat_id,
+            message_thread_id=message_thread_id,
+            reply_to_message_id=reply_to_message_id,
+        )
+        return [copied.message_id]
+
+    # copyMessages не умеет отвечать на сообщение, поэтому ответ альбомом собирается через sendMediaGroup
+    media = [input_media(message) for message in messages]
+    if reply_to_message_id is not None and all(media):
+        try:
+            sent = await bot.send_media_group(
+                chat_id=chat_id,
+                media=media,
+                message_thread_id=message_thread_id,
+                reply_to_message_id=reply_to_message_id,
+            )
+            return [message.message_id for message in sent]
+        except TelegramBadRequest as e:
+            logger.warning(
+                f"[Альбом] Не удалось отправить альбом ответом, копируем без ответа: {e}"
+            )
+
+    copied = await bot.copy_messages(
+        chat_id=chat_id,
+        from_chat_id=from_chat_id,
+        message_ids=[message.message_id for message in messages],
+        message_thread_id=message_thread_id,
+    )
+    if len(copied) != len(messages):
+        # Telegram пропускает сообщения, которые не удалось скопировать, и не говорит какие
+        logger.warning(
+            f"[Альбом] Скопировано {len(copied)} из {len(messages)} сообщений альбома {messages[0].media_group_id}"
+        )
+        return [None] * len(messages)
+    return [message_id.message_id for message_id in copied]
+
+
+media_group_buffer = MediaGroupBuffer()
@@ -0,0 +1,172 @@
+import json
+import logging
+from datetime import datetime
+from typing import Any, Optional
+
+from redis.asyncio import Redis
+
+from infrastructure.database.models import MessagesPair
+from tgbot.services.cache import MISSING, TTLCache
+from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import get_redis, redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Стороны пары: сообщение в чате со специалистом и сообщение в топике
+SIDES = ("user", "topic")
+
+_PAIR_COLUMNS = tuple(column.key for column in MessagesPair.__table__.columns)
+
+
+def _dump(pair: MessagesPair) -> dict[str, Any]:
+    data = {column: getattr(pair, column) for column in _PAIR_COLUMNS}
+    if data["created_at"] is not None:
+        data["created_at"] = data["created_at"].isoformat()
+    return data
+
+
+def _load(data: dict[str, Any]) -> MessagesPair:
+    # Записи, сохраненные до смены схемы, могут содержать лишние поля
+    data = {column: data[column] for column in _PAIR_COLUMNS if column in data}
+    if data.get("created_at"):
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+    return MessagesPair(**data)
+
+
+class MessagePairsCache:
+    """
+    Двунаправленный кеш пар сообщений: (чат, сообщение) любой стороны -> пара целиком.
+
+    Пара записывается в кеш при сохранении сразу под ключами обеих сторон, поэтому ответы и редактирования,
+    которые почти всегда происходят в первые минуты после отправки, не обращаются к БД.
+    Время жизни записей меньше срока хранения пар в БД, так что кеш не переживает удаление секций таблицы
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        ttl: int = 6 * 3600,
+        local_ttl: int = 3600,
+        maxsize: int = 20000,
+    ):
+        self.redis = redis
+        self.ttl = ttl
+        self._local: TTLCache[dict] = TTLCache(ttl=local_ttl, maxsize=maxsize)
+        # Пары, еще не записанные в БД. Не вытесняются, пока их не снимет отложенная запись
+        self._pinned: dict[str, MessagesPair] = {}
+
+    @staticmethod
+    def _key(side: str, chat_id: int, message_id: int) -> str:
+        return f"{side}:{chat_id}:{message_id}"
+
+    @classmethod
+    def _keys(cls, pair: MessagesPair) -> list[str]:
+        return [
+            cls._key("user", pair.user_chat_id, pair.user_message_id),
+            cls._key("topic", pair.topic_chat_id, pair.topic_message_id),
+        ]
+
+    async def get(
+        self, side: str, chat_id: int, message_id: int
+    ) -> Optional[MessagesPair] | Any:
+        """
+        Получение пары по сообщению одной из сторон
+        :param side: Сторона сообщения - user или topic
+        :param chat_id: Идентификатор чата сообщения
+        :param message_id: Идентификатор сообщения
+        :return: Пара сообщений или MISSING, если записи в кеше нет
+        """
+        key = self._key(side, chat_id, message_id)
+
+        pinned = self._pinned.get(key)
+        if pinned is not None:
+            return pinned
+
+        data = self._local.get(key)
+        if data is not MISSING:
+            return _load(data)
+
+        if self.redis is None:
+            return MISSING
+
+        try:
+            raw = await self.redis.get(redis_key("pairs", key))
+        except Exception as e:
+            logger.error(f"[Кеш пар] Ошибка чтения из Redis: {e}")
+            return MISSING
+
+        if raw is None:
+            return MISSING
+
+        data = json.loads(raw)
+        self._local.set(key, data)
+        return _load(data)
+
+    async def set(self, *pairs: MessagesPair) -> None:
+        """
+        Запись пар в кеш под ключами обеих сторон
+        :param pairs: Пары сообщений
+        """
+        entries = {}
+        for pair in pairs:
+            data = _dump(pair)
+            for key in self._keys(pair):
+                entries[key] = data
+                self._local.set(key, data)
+
+        if self.redis is None or not entries:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, data in entries.items():
+                    pipe.set(
+                        redis_key("pairs", key),
+                        json.dumps(data, ensure_ascii=False),
+                        ex=self.ttl,
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"[Кеш пар] Ошибка записи в Redis: {e}")
+
+    def pin(self, *pairs: MessagesPair) -> None:
+        """
+        Закрепление пар, ожидающих записи в БД, чтобы поиск находил их до записи
+        :param pairs: Пары сообщений
+        """
+        for pair in pairs:
+            for key in self._keys(pair):
+                self._pinned[key] = pair
+
+    def unpin(self, *pairs: MessagesPair) -> None:
+        """
+        Снятие закрепления с записанных в БД пар
+        :param pairs: Пары сообщений
+        """
+        for pair in pairs:
+            for key in self._keys(pair):
+                if self._pinned.get(key) is pair:
+                    del self._pinned[key]
+
+    async def invalidate(self, *pairs: MessagesPair) -> None:
+        """
+        Удаление пар из кеша
+        :param pairs: Пары сообщений
+        """
+        keys = [key for pair in pairs for key in self._keys(pair)]
+        if not keys:
+            return
+
+        self._local.invalidate(*keys)
+
+        if self.redis is None:
+            return
+
+        try:
+            await self.redis.delete(*(redis_key("pairs", key) for key in keys))
+        except Exception as e:
+            logger.error(f"[Кеш пар] Ошибка удаления из Redis: {e}")
+
+
+pairs_cache = MessagePairsCache(redis=get_redis())
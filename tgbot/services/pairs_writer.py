@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from infrastructure.database.models import MessagesPair
+from infrastructure.database.repo.questions.requests import QuestionsRequestsRepo
+from tgbot.services.logger import setup_logging
+from tgbot.services.pairs_cache import pairs_cache
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Максимальное кол-во пар, ожидающих записи. При недоступной БД самые старые пары отбрасываются
+MAX_PENDING = 10000
+
+
+class PairsWriter:
+    """
+    Отложенная запись пар сообщений в БД.
+
+    Пары копятся в памяти и записываются многострочным INSERT раз в interval секунд
+    или сразу при накоплении batch_size пар, поэтому пересылка сообщения не ждет коммита в БД.
+    До записи пары закреплены в кеше пар, так что ответ или редактирование сразу после
+    отправки находят пару. При остановке оставшиеся пары записываются.
+    Если пачка не записывается max_attempts раз подряд, она записывается по одной паре,
+    и отбрасываются только пары, которые БД отклоняет
+    """
+
+    def __init__(
+        self, interval: float = 0.2, batch_size: int = 200, max_attempts: int = 3
+    ):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.session_pool: Optional[async_sessionmaker[AsyncSession]] = None
+
+        self._pending: list[MessagesPair] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._failures = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def add(self, pair: MessagesPair) -> MessagesPair:
+        """
+        Постановка пары в очередь на запись
+        :param pair: Новая пара сообщений
+        :return: Та же пара
+        """
+        self._pending.append(pair)
+        pairs_cache.pin(pair)
+
+        if len(self._pending) > MAX_PENDING:
+            dropped = self._pending[: len(self._pending) - MAX_PENDING]
+            del self._pending[: len(dropped)]
+            pairs_cache.unpin(*dropped)
+            logger.error(
+                f"[Запись пар] Очередь переполнена, отброшено {len(dropped)} пар"
+            )
+
+        await pairs_cache.set(pair)
+
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+        return pair
+
+    async def flush(self) -> int:
+        """
+        Запись накопленных пар в БД
+        :return: Кол-во записанных пар
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            if self.session_pool is None:
+                logger.error("[Запись пар] Пул сессий не зарегистрирован")
+                return 0
+
+            written = 0
+            while self._pending:
+                batch = self._pending[: self.batch_size]
+                if self._failures >= self.max_attempts:
+                    written += await self._write_one_by_one(batch)
+                    self._failures = 0
+                    continue
+
+                try:
+                    async with self.session_pool() as session:
+                        questions_repo = QuestionsRequestsRepo(session)
+                        await questions_repo.messages_pairs.add_pairs(batch)
+                except Exception:
+                    self._failures += 1
+                    raise
+
+                self._failures = 0
+                self._done(batch)
+                written += len(batch)
+            return written
+
+    def _done(self, pairs: list[MessagesPair]) -> None:
+        # Пока шла запись, переполнение очереди могло уже отбросить эти пары из ее начала
+        count = 0
+        while count < len(pairs) and count < len(self._pending):
+            if self._pending[count] is not pairs[count]:
+                break
+            count += 1
+        del self._pending[:count]
+        pairs_cache.unpin(*pairs)
+
+    async def _write_one_by_one(self, batch: list[MessagesPair]) -> int:
+        """
+        Запись пачки по одной паре. Пары, которые БД отклоняет, записываются в лог и отбрасываются.
+        При потере соединения с БД запись прерывается, оставшиеся пары ждут следующей попытки
+        :param batch: Пачка из начала очереди
+        :return: Кол-во записанных пар
+        """
+        written = 0
+        async with self.session_pool() as session:
+            questions_repo = QuestionsRequestsRepo(session)
+            for pair in batch:
+                try:
+                    await questions_repo.messages_pairs.add_pairs([pair])
+                    written += 1
+                except (OperationalError, InterfaceError):
+                    raise
+                except Exception as e:
+                    await session.rollback()
+                    logger.error(
+                        f"[Запись пар] Пара {pair.user_chat_id}:{pair.user_message_id} -> "
+                        f"{pair.topic_chat_id}:{pair.topic_message_id} вопроса {pair.question_token} отброшена: {e}"
+                    )
+                self._done([pair])
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Пары остаются в очереди до следующей попытки
+                logger.error(f"[Запись пар] Ошибка записи пар сообщений: {e}")
+
+    def start(self, session_pool: async_sessionmaker[AsyncSession]) -> None:
+        """
+        Запуск фоновой записи пар
+        :param session_pool: Пул сессий БД вопросника
+        """
+        self.session_pool = session_pool
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка фоновой записи с записью всех оставшихся пар."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        try:
+            written = await self.flush()
+            if written:
+                logger.info(f"[Запись пар] При остановке записано {written} пар")
+        except Exception as e:
+            logger.error(
+                f"[Запись пар] Не удалось записать {len(self._pending)} пар при остановке: {e}"
+            )
+
+
+pairs_writer = PairsWriter()
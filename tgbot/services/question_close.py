@@ -0,0 +1,170 @@
+import asyncio
+import datetime
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional, Sequence
+
+import pytz
+from aiogram import Bot
+
+from infrastructure.database.models import Question
+from infrastructure.database.repo.questions.requests import QuestionsRequestsRepo
+from tgbot.services.logger import setup_logging
+from tgbot.services.scheduler import stop_attention_reminder, stop_inactivity_timer
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+Step = tuple[str, Callable[[], Awaitable[Any]]]
+
+
+@dataclass
+class Notice:
+    """Сообщение, отправляемое при закрытии вопроса."""
+
+    chat_id: int
+    text: str
+    reply_markup: Any = None
+    message_thread_id: Optional[int] = None
+    reply_to_message_id: Optional[int] = None
+
+
+async def _run_steps(steps: Sequence[Step]) -> list[str]:
+    """
+    Последовательное выполнение шагов. Ошибка шага не останавливает следующие
+    :param steps: Пары (название шага, функция)
+    :return: Список ошибок
+    """
+    errors = []
+    for name, call in steps:
+        try:
+            await call()
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+    return errors
+
+
+def _topic_steps(
+    bot: Bot, question: Question, emoji_closed: Optional[str]
+) -> list[Step]:
+    # Переименование до закрытия: закрытый топик остается с названием вопроса
+    return [
+        (
+            "edit_forum_topic",
+            lambda: bot.edit_forum_topic(
+                chat_id=question.group_id,
+                message_thread_id=question.topic_id,
+                name=question.token,
+                icon_custom_emoji_id=emoji_closed,
+            ),
+        ),
+        (
+            "close_forum_topic",
+            lambda: bot.close_forum_topic(
+                chat_id=question.group_id,
+                message_thread_id=question.topic_id,
+            ),
+        ),
+    ]
+
+
+def _notice_step(bot: Bot, notice: Notice) -> Step:
+    return (
+        f"send_message:{notice.chat_id}",
+        lambda: bot.send_message(
+            chat_id=notice.chat_id,
+            text=notice.text,
+            message_thread_id=notice.message_thread_id,
+            reply_to_message_id=notice.reply_to_message_id,
+            reply_markup=notice.reply_markup,
+        ),
+    )
+
+
+async def _run_chains(chains: Sequence[Sequence[Step]]) -> list[str]:
+    results = await asyncio.gather(*(_run_steps(chain) for chain in chains))
+    return [error for errors in results for error in errors]
+
+
+async def close_topic(
+    bot: Bot, question: Question, emoji_closed: Optional[str]
+) -> list[str]:
+    """
+    Переименование топика вопроса в токен, смена иконки и закрытие топика
+    :param bot: Экземпляр бота
+    :param question: Вопрос
+    :param emoji_closed: Иконка закрытого вопроса
+    :return: Список ошибок
+    """
+    errors = await _run_steps(_topic_steps(bot, question, emoji_closed))
+    if errors:
+        logger.error(
+            f"[Вопрос] - [Закрытие] Ошибки при закрытии топика вопроса {question.token}: {errors}"
+        )
+    return errors
+
+
+async def close_question(
+    bot: Bot,
+    questions_repo: QuestionsRequestsRepo,
+    question: Question,
+    notices: Sequence[Notice],
+    emoji_closed: Optional[str],
+) -> dict:
+    """
+    Закрытие вопроса.
+
+    Сначала в БД фиксируется закрытие, затем останавливаются таймер бездействия и напоминания,
+    после чего сообщения и закрытие топика выполняются одновременно. Порядок соблюдается только там,
+    где он важен: сообщения в один чат уходят по очереди, топик переименовывается до закрытия.
+    Ошибки отдельных шагов не прерывают остальные и возвращаются в результате
+    :param bot: Экземпляр бота
+    :param questions_repo: Репозиторий вопросника
+    :param question: Закрываемый вопрос
+    :param notices: Сообщения о закрытии
+    :param emoji_closed: Иконка закрытого вопроса
+    :return: Словарь с результатом: success - вопрос закрыт этим вызовом, errors - ошибки шагов
+    """
+    status = question.status
+    closed = False
+    # Статус мог смениться (например, дежурный взял вопрос) - тогда закрытие повторяется с новым статусом
+    for _ in range(2):
+        if status == "closed":
+            break
+        closed = await questions_repo.questions.update_question_where(
+            token=question.token,
+            where={"status": status},
+            status="closed",
+            end_time=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")),
+        )
+        if closed:
+            break
+        fresh = await questions_repo.questions.get_question(token=question.token)
+        status = fresh.status if fresh is not None else "closed"
+
+    if not closed:
+        logger.warning(
+            f"[Вопрос] - [Закрытие] Вопрос {question.token} уже закрыт, повторное закрытие пропущено"
+        )
+        return {"success": False, "errors": []}
+
+    await asyncio.gather(
+        stop_inactivity_timer(question.token),
+        stop_attention_reminder(question.token),
+    )
+
+    # Сообщения одного чата - одна цепочка, чтобы сохранить их порядок
+    notice_chains: dict[tuple[int, Optional[int]], list[Step]] = {}
+    for notice in notices:
+        notice_chains.setdefault((notice.chat_id, notice.message_thread_id), []).append(
+            _notice_step(bot, notice)
+        )
+
+    errors = await _run_chains(
+        [_topic_steps(bot, question, emoji_closed), *notice_chains.values()]
+    )
+    if errors:
+        logger.error(
+            f"[Вопрос] - [Закрытие] Вопрос {question.token} закрыт, но часть действий не выполнена: {errors}"
+        )
+    return {"success": True, "errors": errors}
@@ -0,0 +1,222 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytz
+from redis.asyncio import Redis
+
+from tgbot.services.cache import MISSING, TTLCache
+from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import get_redis, redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+TIMEZONE = pytz.timezone("Asia/Yekaterinburg")
+
+ROLES = ("employee", "duty")
+PERIODS = ("day", "month")
+
+# Счетчик меняется, только если он уже заполнен из БД. Иначе следующее чтение посчитает его заново
+INCREMENT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return nil
+"""
+
+
+def local_time(moment: Optional[datetime] = None) -> datetime:
+    """
+    Приведение времени к локальному времени без часового пояса, как оно хранится в БД
+    :param moment: Время. По умолчанию - текущее
+    :return: Локальное время без tzinfo
+    """
+    if moment is None:
+        return datetime.now(tz=TIMEZONE).replace(tzinfo=None)
+    if moment.tzinfo is not None:
+        return moment.astimezone(TIMEZONE).replace(tzinfo=None)
+    return moment
+
+
+def period_bounds(period: str, moment: datetime) -> tuple[datetime, datetime]:
+    """
+    Границы дня или месяца, в который попадает время
+    :param period: Период - day или month
+    :param moment: Локальное время
+    :return: Начало периода и начало следующего периода
+    """
+    if period == "day":
+        start = datetime(moment.year, moment.month, moment.day)
+        return start, start + timedelta(days=1)
+
+    start = datetime(moment.year, moment.month, 1)
+    if moment.month == 12:
+        return start, datetime(moment.year + 1, 1, 1)
+    return start, datetime(moment.year, moment.month + 1, 1)
+
+
+def bucket(period: str, moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d" if period == "day" else "%Y-%m")
+
+
+class QuestionCounters:
+    """
+    Счетчики вопросов пользователя за текущий день и месяц по роли: специалист (employee) или дежурный (duty).
+
+    Ключ счетчика включает день или месяц по часовому поясу Екатеринбурга, поэтому в начале нового периода
+    счетчик начинается заново. При промахе значение считается запросом COUNT и записывается в кеш,
+    после чего новые вопросы и назначения дежурных меняют счетчик без обращения к БД.
+    Записи живут не дольше seed_ttl, так что изменения, прошедшие мимо счетчиков, со временем исправляются
+    """
+
+    def __init__(
+        self,
+        redis: Optional[Redis] = None,
+        seed_ttl: int = 3600,
+        maxsize: int = 20000,
+    ):
+        self.redis = redis
+        self.seed_ttl = seed_ttl
+        self._local: TTLCache[int] = TTLCache(ttl=seed_ttl, maxsize=maxsize)
+        self._increment_script = (
+            redis.register_script(INCREMENT_SCRIPT) if redis else None
+        )
+
+    @staticmethod
+    def _key(role: str, user_id: int, period: str, moment: datetime) -> str:
+        return f"{role}:{user_id}:{bucket(period, moment)}"
+
+    async def get(
+        self, role: str, user_id: int, period: str, moment: datetime
+    ) -> Optional[int]:
+        """
+        Получение значения счетчика
+        :param role: Роль пользователя - employee или duty
+        :param user_id: Идентификатор Telegram пользователя
+        :param period: Период - day или month
+        :param moment: Локальное время внутри периода
+        :return: Кол-во вопросов или None, если счетчик еще не заполнен
+        """
+        key = self._key(role, user_id, period, moment)
+
+        if self.redis is None:
+            value = self._local.get(key)
+            return None if value is MISSING else value
+
+        try:
+            value = await self.redis.get(redis_key("question_counters", key))
+        except Exception as e:
+            logger.error(f"[Счетчики вопросов] Ошибка чтения из Redis: {e}")
+            return None
+        return int(value) if value is not None else None
+
+    async def seed(
+        self, role: str, user_id: int, period: str, moment: datetime, value: int
+    ) -> None:
+        """
+        Заполнение счетчика значением, посчитанным в БД. Уже заполненный счетчик не перезаписывается
+        :param role: Роль пользователя - employee или duty
+        :param user_id: Идентификатор Telegram пользователя
+        :param period: Период - day или month
+        :param moment: Локальное время внутри периода
+        :param value: Кол-во вопросов из БД
+        """
+        key = self._key(role, user_id, period, moment)
+
+        if self.redis is None:
+            if self._local.get(key) is MISSING:
+                self._local.set(key, value)
+            return
+
+        try:
+            await self.redis.set(
+                redis_key("question_counters", key), value, ex=self.seed_ttl, nx=True
+            )
+        except Exception as e:
+            logger.error(f"[Счетчики вопросов] Ошибка записи в Redis: {e}")
+
+    async def add(
+        self, role: str, user_id: Optional[int], start_time: datetime, delta: int = 1
+    ) -> None:
+        """
+        Изменение дневного и месячного счетчиков, в которые попадает вопрос
+        :param role: Роль пользователя - employee или duty
+        :param user_id: Идентификатор Telegram пользователя
+        :param start_time: Время открытия вопроса
+        :param delta: Величина изменения
+        """
+        if user_id is None or start_time is None:
+            return
+
+        moment = local_time(start_time)
+        await self._apply(
+            {self._key(role, user_id, period, moment): delta for period in PERIODS}
+        )
+
+    async def _apply(self, deltas: dict[str, int]) -> None:
+        if self.redis is None:
+            for key, delta in deltas.items():
+                self._local.incr(key, delta)
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, delta in deltas.items():
+                    await self._increment_script(
+                        keys=[redis_key("question_counters", key)],
+                        args=[delta],
+                        client=pipe,
+                    )
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"[Счетчики вопросов] Ошибка обновления счетчиков: {e}")
+
+    async def remove_many(self, questions) -> None:
+        """
+        Уменьшение счетчиков после удаления пачки вопросов одним пайплайном.
+        Читаются только счетчики текущего дня и месяца, поэтому вопросы из прошлых периодов пропускаются
+        :param questions: Удаленные вопросы или строки с полями employee_userid, duty_userid и start_time
+        """
+        now = local_time()
+        live_buckets = {period: bucket(period, now) for period in PERIODS}
+
+        deltas: dict[str, int] = {}
+        for question in questions:
+            if question.start_time is None:
+                continue
+            moment = local_time(question.start_time)
+            for period in PERIODS:
+                if bucket(period, moment) != live_buckets[period]:
+                    continue
+                for role in ROLES:
+                    user_id = getattr(question, f"{role}_userid")
+                    if user_id is None:
+                        continue
+                    key = self._key(role, user_id, period, moment)
+                    deltas[key] = deltas.get(key, 0) - 1
+
+        if deltas:
+            await self._apply(deltas)
+
+    async def move(self, before, after) -> None:
+        """
+        Перенос вопроса между счетчиками после изменения специалиста, дежурного или времени открытия
+        :param before: Снимок вопроса до изменения
+        :param after: Вопрос после изменения или None, если вопрос удален
+        """
+        for role in ROLES:
+            field = f"{role}_userid"
+            old = (getattr(before, field), before.start_time)
+            new = (
+                (getattr(after, field), after.start_time)
+                if after is not None
+                else (None, None)
+            )
+            if old == new:
+                continue
+            await self.add(role, *old, delta=-1)
+            await self.add(role, *new, delta=1)
+
+
+question_counters = QuestionCounters(redis=get_redis())
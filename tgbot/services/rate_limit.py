@@ -0,0 +1,143 @@
+import asyncio
+import itertools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Iterator, Optional
+
+
+class Priority(IntEnum):
+    """Очереди исходящих запросов к Bot API. Меньшее значение обслуживается раньше."""
+
+    # Запросы, которых прямо сейчас ждет пользователь. Не понижаются даже для оформления топиков
+    URGENT = 0
+    # Ответы на апдейты: пересылка сообщений между специалистом и дежурным
+    HIGH = 1
+    # Фоновые сообщения: напоминания, предупреждения и автозакрытие
+    NORMAL = 2
+    # Оформление топиков, закрепы и удаление сообщений
+    LOW = 3
+
+
+# Приоритет запросов текущей задачи. Обработка апдейтов поднимает его до HIGH
+request_priority: ContextVar[Priority] = ContextVar(
+    "request_priority", default=Priority.NORMAL
+)
+
+
+@contextmanager
+def priority(value: Priority) -> Iterator[None]:
+    """
+    Выполнение запросов внутри блока с заданным приоритетом
+    :param value: Приоритет запросов
+    """
+    token = request_priority.set(value)
+    try:
+        yield
+    finally:
+        request_priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket с очередью по приоритету.
+
+    Корзина пополняется на rate токенов в секунду и вмещает не больше capacity токенов.
+    Если токенов нет, запрос встает в очередь, и при пополнении первым получает токен запрос
+    с меньшим значением приоритета, а при равном приоритете - пришедший раньше.
+    Каждые aging секунд ожидания поднимают запрос на один уровень приоритета,
+    поэтому запросы низкого приоритета не ждут бесконечно за потоком более важных.
+    Метод pause перекрывает выдачу токенов, например на время RetryAfter от Telegram
+    """
+
+    def __init__(self, rate: float, capacity: float, aging: Optional[float] = 5.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.aging = aging
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+        self._waiters: list[tuple[int, int, float, asyncio.Future]] = []
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _delay(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    @property
+    def idle(self) -> bool:
+        """Корзина полна и никто не ждет - ее можно удалить без потери состояния."""
+        now = time.monotonic()
+        return (
+            not self._waiters
+            and now >= self.blocked_until
+            and self._delay(now) == 0
+            and self.tokens >= self.capacity
+        )
+
+    async def acquire(self, priority: int = 0) -> None:
+        """
+        Получение токена с ожиданием, если корзина пуста
+        :param priority: Приоритет запроса. Меньшее значение обслуживается раньше
+        """
+        if not self._waiters and self._delay(time.monotonic()) == 0:
+            self.tokens -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((priority, next(self._counter), time.monotonic(), future))
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._drain())
+        await future
+
+    def pause(self, seconds: float) -> None:
+        """
+        Приостановка выдачи токенов
+        :param seconds: На сколько секунд приостановить выдачу
+        """
+        now = time.monotonic()
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        # После паузы уходит один запрос, а не пачка из накопленных токенов
+        self.tokens = min(1.0, self.capacity)
+        self.updated = self.blocked_until
+
+    def _next_waiter(self, now: float) -> tuple[int, int, float, asyncio.Future]:
+        def rank(waiter: tuple[int, int, float, asyncio.Future]) -> tuple[float, int]:
+            priority, order, enqueued_at, _ = waiter
+            if self.aging:
+                return priority - (now - enqueued_at) / self.aging, order
+            return priority, order
+
+        return min(self._waiters, key=rank)
+
+    async def _drain(self) -> None:
+        while True:
+            # Отмененные запросы убираются из очереди
+            self._waiters = [w for w in self._waiters if not w[-1].done()]
+            if not self._waiters:
+                return
+
+            now = time.monotonic()
+            delay = self._delay(now)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            waiter = self._next_waiter(now)
+            self._waiters.remove(waiter)
+            self.tokens -= 1
+            waiter[-1].set_result(None)
@@ -0,0 +1,57 @@
+import logging
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from tgbot.config import load_config
+from tgbot.services.logger import setup_logging
+
+config = load_config(".env")
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Префикс для всех служебных ключей бота в Redis
+KEY_PREFIX = "questioner"
+
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Optional[Redis]:
+    """
+    Получение общего асинхронного клиента Redis для служебных данных бота
+    :return: Клиент Redis или None, если использование Redis отключено
+    """
+    global _redis
+
+    if not config.tg_bot.use_redis:
+        return None
+
+    if _redis is None:
+        _redis = Redis(
+            host=config.redis.redis_host,
+            port=config.redis.redis_port,
+            password=config.redis.redis_pass,
+            db=1,
+            ssl=False,
+            decode_responses=True,
+        )
+    return _redis
+
+
+def redis_key(*parts: str | int) -> str:
+    """
+    Формирование ключа Redis с общим префиксом бота
+    :param parts: Части ключа
+    :return: Ключ вида questioner:part1:part2
+    """
+    return ":".join([KEY_PREFIX, *(str(part) for part in parts)])
+
+
+async def close_redis() -> None:
+    """Закрытие общего клиента Redis при остановке бота."""
+    global _redis
+
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -1,5 +1,7 @@
+import asyncio
 import datetime
 import logging
+import time
 
 import pytz
 from aiogram import Bot
@@ -7,15 +9,18 @@ from aiogram.types import ReplyKeyboardRemove
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.jobstores.redis import RedisJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from sqlalchemy import Sequence
 
-from infrastructure.database.models import MessagesPair, Question, Employee
+from infrastructure.database.models import Question, Employee
 from infrastructure.database.repo.STP.requests import MainRequestsRepo
 from infrastructure.database.repo.questions.requests import QuestionsRequestsRepo
 from tgbot.config import load_config
 from tgbot.keyboards.group.main import closed_question_duty_kb
 from tgbot.keyboards.user.main import closed_question_specialist_kb
+from tgbot.services.active_questions import active_questions_index
+from tgbot.services.deadlines import DeadlineIndex
+from tgbot.services.deletion_queue import DeletionQueue, bulk_delete_messages
 from tgbot.services.logger import setup_logging
+from tgbot.services.redis_client import get_redis, redis_key
 
 config = load_config(".env")
 
@@ -65,7 +70,18 @@ else:
         timezone=pytz.utc,
     )
 
-# TODO ОПТИМИЗИРОВАТЬ
+# Дедлайны таймеров бездействия: warning_<token> и close_<token>
+inactivity_deadlines = DeadlineIndex(name="inactivity", redis=get_redis())
+
+# Очередь отложенного удаления временных уведомлений
+deletion_queue = DeletionQueue()
+
+# Напоминания о вопросах без дежурного: время последнего напоминания по токену вопроса
+ATTENTION_INTERVAL_MINUTES = 5
+ATTENTION_SWEEP_SLACK_SECONDS = 30
+ATTENTION_MAX_QUESTIONS_IN_MESSAGE = 30
+ATTENTION_REMINDED_KEY = redis_key("attention", "reminded")
+_attention_reminded: dict[str, float] = {}
 
 # Global registry to store picklable dependencies
 _scheduler_registry = {}
@@ -74,19 +90,16 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def register_scheduler_dependencies(bot, questioner_session_pool):
-    """Register bot and session pool for use by scheduled jobs."""
+def register_scheduler_dependencies(bot, questioner_session_pool, main_session_pool):
+    """Register bot and session pools for use by scheduled jobs."""
     _scheduler_registry["bot"] = bot
     _scheduler_registry["questioner_session_pool"] = questioner_session_pool
+    _scheduler_registry["main_session_pool"] = main_session_pool
 
 
 async def delete_messages(bot: Bot, chat_id: int, message_ids: list[int]):
     """Удаляет список сообщений."""
-    try:
-        for message_id in message_ids:
-            await bot.delete_message(chat_id=chat_id, message_id=message_id)
-    except Exception as e:
-        logger.error(f"Ошибка при удалении сообщений: {e}")
+    await bulk_delete_messages(bot, chat_id, message_ids)
 
 
 async def delete_messages_job(chat_id: int, message_ids: list[int]):
@@ -97,8 +110,7 @@ async def delete_messages_job(chat_id: int, message_ids: list[int]):
             logger.error("Bot not registered in scheduler")
             return
 
-        for message_id in message_ids:
-            await bot.delete_message(chat_id=chat_id, message_id=message_id)
+        await bulk_delete_messages(bot, chat_id, message_ids)
     except Exception as e:
         logger.error(f"Ошибка при удалении сообщений: {e}")
 
@@ -106,14 +118,7 @@ async def delete_messages_job(chat_id: int, message_ids: list[int]):
 async def run_delete_timer(chat_id: int, message_ids: list[int], seconds: int = 60):
     """Delete messages after timer. Default - 60 seconds."""
     try:
-        scheduler.add_job(
-            delete_messages_job,
-            "date",
-            run_date=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
-            + datetime.timedelta(seconds=seconds),
-            args=[chat_id, message_ids],
-            jobstore="redis" if config.tg_bot.use_redis else "default",
-        )
+        deletion_queue.add(chat_id, message_ids, seconds)
     except Exception as e:
         logger.error(f"Ошибка при планировании удаления сообщений: {e}")
 
@@ -154,57 +159,6 @@ async def remove_question_job(group_id: int, topic_id: int):
         logger.error(f"Ошибка при удалении топика {topic_id}: {e}")
 
 
-async def remove_old_topics(bot: Bot, session_pool):
-    """Remove old topics and questions."""
-    try:
-        # Create a session and RequestsRepo instance
-        async with session_pool() as session:
-            questions_repo = QuestionsRequestsRepo(session)
-
-            old_questions: Sequence[
-                Question
-            ] = await questions_repo.questions.get_old_questions()
-            old_pairs: Sequence[
-                MessagesPair
-            ] = await questions_repo.messages_pairs.get_old_pairs()
-
-            questions_result = await questions_repo.questions.delete_question(
-                questions=old_questions
-            )
-            pairs_result = await questions_repo.messages_pairs.delete_pairs(
-                pairs=old_pairs
-            )
-
-            for question in old_questions:
-                try:
-                    await bot.delete_forum_topic(
-                        chat_id=question.group_id,
-                        message_thread_id=question.topic_id,
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"[Старые топики] Ошибка при удалении топика {question.topic_id}: {e}"
-                    )
-
-            logger.info(
-                f"[Старые топики] Успешно удалено {questions_result['deleted_count']} из {questions_result['total_count']} старых вопросов"
-            )
-            logger.info(
-                f"[Старые пары] Успешно удалено {pairs_result['deleted_count']} из {pairs_result['total_count']} старых пар сообщений"
-            )
-
-            if questions_result["errors"]:
-                logger.info(
-                    f"[Старые топики] Произошла ошибка при удалении части вопросов: {questions_result['errors']}"
-                )
-            if pairs_result["errors"]:
-                logger.info(
-                    f"[Старые пары] Произошла ошибка при удалении части пар: {pairs_result['errors']}"
-                )
-    except Exception as e:
-        logger.error(f"[Старые топики] Общая ошибка при удалении старых данных: {e}")
-
-
 async def send_inactivity_warning_job(question_token: str):
     """Standalone function to send inactivity warning."""
     try:
@@ -288,42 +242,35 @@ async def auto_close_question(
         )
 
         if question and question.status in ["open", "in_progress"]:
-            # Закрываем вопрос
-            await questions_repo.questions.update_question(
-                token=question.token,
-                status="closed",
-                end_time=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")),
-            )
-
-            # Уведомляем о закрытии
-            await bot.send_message(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                text=f"🔒 <b>Вопрос автоматически закрыт</b>\n\nВопрос был закрыт из-за отсутствия активности в течение {group_settings.get_setting('activity_close_minutes')} минут",
-                reply_markup=closed_question_duty_kb(token=question_token),
-            )
-
-            # Обновляем топик
-            await bot.edit_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-                name=question.token,
-                icon_custom_emoji_id=group_settings.get_setting("emoji_closed"),
-            )
-            await bot.close_forum_topic(
-                chat_id=question.group_id,
-                message_thread_id=question.topic_id,
-            )
-
-            await bot.send_message(
-                chat_id=question.employee_userid,
-                text="🔒 <b>Вопрос автоматически закрыт</b>",
-                reply_markup=ReplyKeyboardRemove(),
-            )
-            await bot.send_message(
-                chat_id=question.employee_userid,
-                text=f"Твой вопрос был закрыт из-за отсутствия активности в течение {group_settings.get_setting('activity_close_minutes')} минут",
-                reply_markup=closed_question_specialist_kb(token=question_token),
+            # Импорт внутри функции: сервис закрытия сам зависит от таймеров этого модуля
+            from tgbot.services.question_close import Notice, close_question
+
+            close_minutes = group_settings.get_setting("activity_close_minutes")
+            await close_question(
+                bot=bot,
+                questions_repo=questions_repo,
+                question=question,
+                emoji_closed=group_settings.get_setting("emoji_closed"),
+                notices=[
+                    Notice(
+                        chat_id=question.group_id,
+                        message_thread_id=question.topic_id,
+                        text=f"🔒 <b>Вопрос автоматически закрыт</b>\n\nВопрос был закрыт из-за отсутствия активности в течение {close_minutes} минут",
+                        reply_markup=closed_question_duty_kb(token=question_token),
+                    ),
+                    Notice(
+                        chat_id=question.employee_userid,
+                        text="🔒 <b>Вопрос автоматически закрыт</b>",
+                        reply_markup=ReplyKeyboardRemove(),
+                    ),
+                    Notice(
+                        chat_id=question.employee_userid,
+                        text=f"Твой вопрос был закрыт из-за отсутствия активности в течение {close_minutes} минут",
+                        reply_markup=closed_question_specialist_kb(
+                            token=question_token
+                        ),
+                    ),
+                ],
             )
 
     except Exception as e:
@@ -333,7 +280,7 @@ async def auto_close_question(
 
 
 async def start_inactivity_timer(question_token: str, questions_repo):
-    """Запускает таймер бездействия для вопроса."""
+    """Запускает (или продлевает) таймер бездействия для вопроса."""
     try:
         # Проверяем, нужно ли запускать таймер для этого вопроса
         question = await questions_repo.questions.get_question(token=question_token)
@@ -350,38 +297,19 @@ async def start_inactivity_timer(question_token: str, questions_repo):
             else group_settings.get_setting("activity_status")
         )
         if not activity_enabled:
-            # Если активность отключена для этого топика, не запускаем таймер
+            # Если активность отключена для этого топика, снимаем таймер
+            await stop_inactivity_timer(question_token)
             return
 
-        # Удаляем существующие задачи для этого вопроса
-        stop_inactivity_timer(question_token)
-
-        # Запускаем таймер предупреждения
-        warning_job_id = f"warning_{question_token}"
-        scheduler.add_job(
-            send_inactivity_warning_job,
-            "date",
-            run_date=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
-            + datetime.timedelta(
-                minutes=int(group_settings.get_setting("activity_warn_minutes"))
-            ),
-            args=[question_token],
-            id=warning_job_id,
-            jobstore="redis" if config.tg_bot.use_redis else "default",
-        )
-
-        # Запускаем таймер автозакрытия
-        close_job_id = f"close_{question_token}"
-        scheduler.add_job(
-            auto_close_question_job,
-            "date",
-            run_date=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
-            + datetime.timedelta(
-                minutes=int(group_settings.get_setting("activity_close_minutes"))
-            ),
-            args=[question_token],
-            id=close_job_id,
-            jobstore="redis" if config.tg_bot.use_redis else "default",
+        # Продлеваем дедлайны предупреждения и автозакрытия одной записью в индекс
+        now = time.time()
+        await inactivity_deadlines.touch(
+            {
+                f"warning_{question_token}": now
+                + int(group_settings.get_setting("activity_warn_minutes")) * 60,
+                f"close_{question_token}": now
+                + int(group_settings.get_setting("activity_close_minutes")) * 60,
+            }
         )
 
     except Exception as e:
@@ -390,28 +318,12 @@ async def start_inactivity_timer(question_token: str, questions_repo):
         )
 
 
-def stop_inactivity_timer(question_token: str):
+async def stop_inactivity_timer(question_token: str):
     """Останавливает таймер бездействия для вопроса."""
     try:
-        warning_job_id = f"warning_{question_token}"
-        close_job_id = f"close_{question_token}"
-
-        # Удаляем задачи, если они существуют
-        try:
-            scheduler.remove_job(
-                warning_job_id,
-                jobstore="redis" if config.tg_bot.use_redis else "default",
-            )
-        except Exception as e:
-            logger.debug(f"[Задачи] Ошибка при удалении задачи {warning_job_id}: {e}")
-
-        try:
-            scheduler.remove_job(
-                close_job_id, jobstore="redis" if config.tg_bot.use_redis else "default"
-            )
-        except Exception as e:
-            logger.debug(f"[Задачи] Ошибка при удалении задачи {close_job_id}: {e}")
-
+        await inactivity_deadlines.discard(
+            f"warning_{question_token}", f"close_{question_token}"
+        )
     except Exception as e:
         logger.error(
             f"[Таймер бездействия] Ошибка при остановке таймера для вопроса {question_token}: {e}"
@@ -420,127 +332,359 @@ def stop_inactivity_timer(question_token: str):
 
 async def restart_inactivity_timer(question_token: str, questions_repo):
     """Перезапускает таймер бездействия для вопроса."""
+    # Новые дедлайны перезаписывают старые, отдельная остановка не нужна
+    await start_inactivity_timer(question_token, questions_repo)
+
+
+async def fire_inactivity_deadline(member: str):
+    """Обработчик просроченных дедлайнов индекса бездействия."""
+    kind, _, question_token = member.partition("_")
+
+    if kind == "warning":
+        await send_inactivity_warning_job(question_token)
+    elif kind == "close":
+        await auto_close_question_job(question_token)
+    else:
+        logger.warning(f"[Таймер бездействия] Неизвестный дедлайн {member}")
+
+
+async def migrate_inactivity_jobs() -> int:
+    """
+    Перенос таймеров бездействия, созданных задачами планировщика, в индекс дедлайнов
+    :return: Кол-во перенесенных задач
+    """
+    jobstore = "redis" if config.tg_bot.use_redis else "default"
+    deadlines = {}
+
+    for job in scheduler.get_jobs(jobstore=jobstore):
+        if not job.id.startswith(("warning_", "close_")):
+            continue
+        if job.next_run_time is not None:
+            deadlines[job.id] = job.next_run_time
+        scheduler.remove_job(job.id, jobstore=jobstore)
+
+    await inactivity_deadlines.touch(deadlines)
+    return len(deadlines)
+
+
+async def reconcile_timers(session_pool, batch_size: int = 500) -> dict:
+    """
+    Сверка таймеров бездействия и напоминаний с активными вопросами при запуске бота,
+    заполнение индекса активных вопросов.
+    Создает недостающие таймеры и удаляет таймеры и состояние напоминаний закрытых или удаленных вопросов
+    :param session_pool: Пул сессий БД вопросника
+    :param batch_size: Размер пачки при удалении осиротевших таймеров
+    :return: Словарь со статистикой сверки
+    """
+    started_at = time.perf_counter()
+    jobstore = "redis" if config.tg_bot.use_redis else "default"
+
+    async with session_pool() as session:
+        questions_repo = QuestionsRequestsRepo(session)
+        active_questions = await questions_repo.questions.get_active_questions()
+        group_settings = {
+            settings.group_id: settings
+            for settings in await questions_repo.settings.get_settings_by_group_ids(
+                [question.group_id for question in active_questions]
+            )
+        }
+    loaded_at = time.perf_counter()
+
+    # Индекс активных вопросов заполняется тем же набором вопросов
+    indexed_questions = await active_questions_index.rebuild(active_questions)
+
+    # Вопросы, которым нужен таймер бездействия и напоминание о дежурном
+    timed_tokens = set()
+    attention_tokens = set()
+    new_deadlines = {}
+    scheduled_deadlines = await inactivity_deadlines.snapshot()
+    now = time.time()
+
+    for question in active_questions:
+        settings = group_settings.get(question.group_id)
+        activity_enabled = (
+            question.activity_status_enabled
+            if question.activity_status_enabled is not None
+            else settings is not None and settings.get_setting("activity_status")
+        )
+
+        if activity_enabled:
+            timed_tokens.add(question.token)
+            if (
+                question.status == "in_progress"
+                and settings is not None
+                and f"close_{question.token}" not in scheduled_deadlines
+            ):
+                new_deadlines[f"warning_{question.token}"] = (
+                    now + int(settings.get_setting("activity_warn_minutes")) * 60
+                )
+                new_deadlines[f"close_{question.token}"] = (
+                    now + int(settings.get_setting("activity_close_minutes")) * 60
+                )
+
+        if question.status == "open" and not question.duty_userid:
+            attention_tokens.add(question.token)
+
+    # Таймеры бездействия
+    orphaned_deadlines = [
+        member
+        for member in scheduled_deadlines
+        if member.partition("_")[2] not in timed_tokens
+    ]
+    for i in range(0, len(orphaned_deadlines), batch_size):
+        await inactivity_deadlines.discard(*orphaned_deadlines[i : i + batch_size])
+    await inactivity_deadlines.touch(new_deadlines)
+
+    # Напоминания о вопросах без дежурного: задачи старого формата больше не нужны,
+    # состояние напоминаний закрытых вопросов удаляем
+    removed_jobs = 0
+    for job in scheduler.get_jobs(jobstore=jobstore):
+        if job.id.startswith("attention_reminder_"):
+            scheduler.remove_job(job.id, jobstore=jobstore)
+            removed_jobs += 1
+
+    reminded = await _get_attention_reminded()
+    stale_reminded = [token for token in reminded if token not in attention_tokens]
+    await _forget_attention_reminded(*stale_reminded)
+
+    result = {
+        "active_questions": len(active_questions),
+        "indexed_questions": indexed_questions,
+        "created_timers": len(new_deadlines) // 2,
+        "removed_timers": len(orphaned_deadlines),
+        "removed_reminder_jobs": removed_jobs,
+        "removed_reminders": len(stale_reminded),
+        "load_seconds": round(loaded_at - started_at, 3),
+        "total_seconds": round(time.perf_counter() - started_at, 3),
+    }
+    logger.info(
+        f"[Сверка таймеров] Активных вопросов: {result['active_questions']}, в индексе: {result['indexed_questions']}. "
+        f"Таймеры бездействия: +{result['created_timers']} / -{result['removed_timers']}. "
+        f"Напоминания: -{result['removed_reminders']}, старых задач удалено: {result['removed_reminder_jobs']}. "
+        f"Загрузка {result['load_seconds']} с, всего {result['total_seconds']} с"
+    )
+    return result
+
+
+async def rebuild_active_questions_index():
+    """
+    Периодическое перезаполнение индекса активных вопросов из БД.
+    Убирает из индекса вопросы, удаление которых из индекса не удалось после записи в БД.
+    Пропущенные индексом вопросы находятся и без этого: при промахе индекса вопрос ищется в БД
+    """
     try:
-        # Останавливаем существующий таймер
-        stop_inactivity_timer(question_token)
+        questioner_session_pool = _scheduler_registry.get("questioner_session_pool")
+        if not questioner_session_pool:
+            logger.error("Session pool not registered in scheduler")
+            return
 
-        # Запускаем новый таймер
-        await start_inactivity_timer(question_token, questions_repo)
+        async with questioner_session_pool() as session:
+            questions_repo = QuestionsRequestsRepo(session)
+            active_questions = await questions_repo.questions.get_active_questions()
 
+        indexed_questions = await active_questions_index.rebuild(active_questions)
+        logger.info(
+            f"[Активные вопросы] Индекс перезаполнен, вопросов в индексе: {indexed_questions}"
+        )
     except Exception as e:
         logger.error(
-            f"[Таймер бездействия] Ошибка при перезапуске таймера для вопроса {question_token}: {e}"
+            f"[Активные вопросы] Ошибка перезаполнения индекса активных вопросов: {e}"
         )
 
 
-async def send_attention_reminder_job(question_token: str):
-    """Standalone function to send attention reminder to general chat."""
+async def start_scheduling():
+    """
+    Запуск выполнения задач на реплике, получившей лидерство.
+    Считает дедлайны, переносит задачи старого формата, сверяет таймеры и снимает планировщик с паузы
+    """
+    scheduled_deadlines = await inactivity_deadlines.count()
+    migrated_jobs = await migrate_inactivity_jobs()
+    logger.info(
+        f"[Таймер бездействия] В индексе {scheduled_deadlines} дедлайнов, перенесено {migrated_jobs} задач планировщика"
+    )
+
+    await reconcile_timers(_scheduler_registry.get("questioner_session_pool"))
+    inactivity_deadlines.start(fire_inactivity_deadline)
+    scheduler.resume()
+
+    logger.info(
+        f"[Планировщик] Выполнение задач запущено, задач в планировщике: {len(scheduler.get_jobs())}"
+    )
+
+
+async def stop_scheduling():
+    """Остановка выполнения задач на реплике, потерявшей лидерство."""
+    scheduler.pause()
+    await inactivity_deadlines.stop()
+    logger.info("[Планировщик] Выполнение задач приостановлено")
+
+
+async def _get_attention_reminded() -> dict[str, float]:
+    redis = get_redis()
+    if redis:
+        return {
+            token: float(ts)
+            for token, ts in (await redis.hgetall(ATTENTION_REMINDED_KEY)).items()
+        }
+    return dict(_attention_reminded)
+
+
+async def _set_attention_reminded(mapping: dict[str, float]) -> None:
+    if not mapping:
+        return
+    redis = get_redis()
+    if redis:
+        await redis.hset(ATTENTION_REMINDED_KEY, mapping=mapping)
+    else:
+        _attention_reminded.update(mapping)
+
+
+async def _forget_attention_reminded(*tokens: str) -> None:
+    if not tokens:
+        return
+    redis = get_redis()
+    if redis:
+        await redis.hdel(ATTENTION_REMINDED_KEY, *tokens)
+    else:
+        for token in tokens:
+            _attention_reminded.pop(token, None)
+
+
+def _attention_reminder_text(
+    questions: list[Question], employees: dict[int, Employee], now: datetime.datetime
+) -> str:
+    """Формирует текст напоминания по вопросам одного форума."""
+
+    def question_link(question: Question) -> str:
+        return f"https://t.me/c/{str(question.group_id)[4:]}/{question.topic_id}"
+
+    def employee_name(question: Question) -> str:
+        employee = employees.get(question.employee_userid)
+        return employee.fullname if employee else "Неизвестный специалист"
+
+    def waiting_minutes(question: Question) -> int:
+        return int((now - question.start_time).total_seconds() // 60)
+
+    if len(questions) == 1:
+        question = questions[0]
+        return f"""🔔 <b>Вопрос требует внимания!</b>
+
+<b>От:</b> {employee_name(question)}
+<b>Создан в:</b> {question.start_time.strftime("%H:%M")} ПРМ
+
+Вопрос ожидает дежурного уже {waiting_minutes(question)} минут!
+
+<a href="{question_link(question)}">Перейти к вопросу</a>"""
+
+    lines = [
+        f'• <a href="{question_link(question)}">{employee_name(question)}</a> - с {question.start_time.strftime("%H:%M")} ПРМ ({waiting_minutes(question)} мин.)'
+        for question in questions[:ATTENTION_MAX_QUESTIONS_IN_MESSAGE]
+    ]
+    hidden = len(questions) - ATTENTION_MAX_QUESTIONS_IN_MESSAGE
+    if hidden > 0:
+        lines.append(f"...и еще {hidden}")
+
+    return (
+        f"🔔 <b>Вопросы требуют внимания!</b>\n\n"
+        f"Ожидают дежурного: {len(questions)}\n\n" + "\n".join(lines)
+    )
+
+
+async def send_attention_reminders():
+    """
+    Периодический обход открытых вопросов без дежурного.
+    Все такие вопросы выбираются одним запросом, специалисты загружаются одним запросом,
+    а напоминания отправляются одним сообщением на форум не чаще раза в ATTENTION_INTERVAL_MINUTES минут
+    """
     try:
         bot = _scheduler_registry.get("bot")
         questioner_session_pool = _scheduler_registry.get("questioner_session_pool")
         main_session_pool = _scheduler_registry.get("main_session_pool")
 
-        if not bot or not questioner_session_pool:
-            logger.error("Bot or questioner_session_pool not registered in scheduler")
+        if not bot or not questioner_session_pool or not main_session_pool:
+            logger.error("Bot or session pools not registered in scheduler")
             return
 
-        # Create a fresh session for this job
-        async with questioner_session_pool() as questioner_session:
-            async with main_session_pool() as main_session:
-                questions_repo = QuestionsRequestsRepo(session=questioner_session)
-                await send_attention_reminder(
-                    bot, question_token, questions_repo, main_session
-                )
-
-    except Exception as e:
-        logger.error(f"Error in attention reminder job for {question_token}: {e}")
+        now = datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg")).replace(
+            tzinfo=None
+        )
+        interval = datetime.timedelta(minutes=ATTENTION_INTERVAL_MINUTES)
 
+        async with questioner_session_pool() as session:
+            questions_repo = QuestionsRequestsRepo(session)
+            questions = await questions_repo.questions.get_unassigned_questions()
 
-async def send_attention_reminder(
-    bot: Bot,
-    question_token: str,
-    questions_repo: QuestionsRequestsRepo,
-    main_repo: MainRequestsRepo,
-):
-    """Отправляет напоминание о вопросе, требующем внимания, в общий чат группы."""
-    try:
-        question: Question = await questions_repo.questions.get_question(
-            token=question_token
-        )
-        employee: Employee = await main_repo.employee.get_user(
-            user_id=question.employee_userid
+        # Забываем напоминания по вопросам, которые уже взяли в работу или закрыли
+        reminded = await _get_attention_reminded()
+        unassigned_tokens = {question.token for question in questions}
+        await _forget_attention_reminded(
+            *(token for token in reminded if token not in unassigned_tokens)
         )
 
-        if not question:
-            logger.warning(
-                f"[Внимание вопросу] Вопрос {question_token} не найден в базе для напоминания"
-            )
-            stop_attention_reminder(question_token)
+        # Напоминаем повторно не раньше, чем через интервал (с запасом на шаг обхода)
+        repeat_after = interval.total_seconds() - ATTENTION_SWEEP_SLACK_SECONDS
+        due_questions = [
+            question
+            for question in questions
+            if question.start_time <= now - interval
+            and time.time() - reminded.get(question.token, 0) >= repeat_after
+        ]
+        if not due_questions:
             return
 
-        # Проверка, что вопрос все еще открыт и не имеет дежурного
-        if question.status != "open" or question.duty_userid:
-            logger.info(
-                f"[Внимание вопросу] Вопрос {question_token} уже имеет дежурного или закрыт, пропускаем напоминание"
+        async with main_session_pool() as main_session:
+            main_repo = MainRequestsRepo(main_session)
+            employees = await main_repo.employee.get_users_by_ids(
+                [question.employee_userid for question in due_questions]
             )
-            stop_attention_reminder(question.token)
-            return
 
-        # Отправка уведомления в главную тему
-        reminder_text = f"""🔔 <b>Вопрос требует внимания!</b>
+        by_forum: dict[int, list[Question]] = {}
+        for question in due_questions:
+            by_forum.setdefault(question.group_id, []).append(question)
 
-<b>От:</b> {employee.fullname}
-<b>Создан в:</b> {question.start_time.strftime("%H:%M")} ПРМ
-
-Вопрос ожидает дежурного уже 5 минут!
-
-<a href="https://t.me/c/{str(question.group_id)[4:]}/{question.topic_id}">Перейти к вопросу</a>"""
-
-        await bot.send_message(
-            chat_id=question.group_id,
-            text=reminder_text,
-            disable_web_page_preview=True,
+        results = await asyncio.gather(
+            *(
+                bot.send_message(
+                    chat_id=group_id,
+                    text=_attention_reminder_text(forum_questions, employees, now),
+                    disable_web_page_preview=True,
+                )
+                for group_id, forum_questions in by_forum.items()
+            ),
+            return_exceptions=True,
         )
 
+        sent_at = time.time()
+        reminded_now = {}
+        for (group_id, forum_questions), result in zip(by_forum.items(), results):
+            if isinstance(result, Exception):
+                logger.error(
+                    f"[Внимание вопросу] Ошибка при отправке напоминания в группу {group_id}: {result}"
+                )
+                continue
+            reminded_now.update(
+                {question.token: sent_at for question in forum_questions}
+            )
+        await _set_attention_reminded(reminded_now)
+
         logger.info(
-            f"[Внимание вопросу] Напоминание отправлено по вопросу {question_token}"
+            f"[Внимание вопросу] Напоминания отправлены по {len(reminded_now)} вопросам в {len(by_forum)} форумов"
         )
 
     except Exception as e:
         logger.error(
-            f"[Внимание вопросу] Ошибка при отправке напоминания для вопроса {question_token}: {e}"
+            f"[Внимание вопросу] Ошибка при обходе вопросов без дежурного: {e}"
         )
 
 
 async def start_attention_reminder(question_token: str, questions_repo):
-    """Запускает таймер напоминаний о внимании для нового вопроса."""
+    """
+    Включает напоминания о внимании для вопроса.
+    Сами напоминания отправляет периодический обход, здесь только отмечается время запуска,
+    чтобы первое напоминание (в т.ч. для возвращенного вопроса) пришло через полный интервал
+    """
     try:
-        question = await questions_repo.questions.get_question(token=question_token)
-        if not question:
-            stop_attention_reminder(question.token)
-            return
-
-        # Проверка, что вопрос все еще открыт и не имеет дежурного
-        if question.status != "open" or question.duty_userid:
-            stop_attention_reminder(question.token)
-            return
-
-        # Останавливаем все активные напоминания для этого вопроса
-        stop_attention_reminder(question_token)
-
-        # Запускаем рекуррентную задачу для проверки каждые 5 минут
-        attention_job_id = f"attention_reminder_{question_token}"
-        scheduler.add_job(
-            send_attention_reminder_job,
-            "interval",
-            minutes=5,
-            start_date=datetime.datetime.now(tz=pytz.timezone("Asia/Yekaterinburg"))
-            + datetime.timedelta(minutes=5),
-            args=[question_token],
-            id=attention_job_id,
-            jobstore="redis" if config.tg_bot.use_redis else "default",
-        )
-
+        await _set_attention_reminded({question_token: time.time()})
         logger.info(
             f"[Внимание вопросу] Отслеживание дежурного включено для вопроса {question_token}"
         )
@@ -551,23 +695,10 @@ async def start_attention_reminder(question_token: str, questions_repo):
         )
 
 
-def stop_attention_reminder(question_token: str):
-    """Останавливает таймер напоминаний о внимании для вопроса."""
+async def stop_attention_reminder(question_token: str):
+    """Останавливает напоминания о внимании для вопроса."""
     try:
-        attention_job_id = f"attention_reminder_{question_token}"
-
-        # Удаляем задачу если найдена
-        try:
-            scheduler.remove_job(
-                attention_job_id,
-                jobstore="redis" if config.tg_bot.use_redis else "default",
-            )
-            logger.info(
-                f"[Внимание вопросу] Отслеживание выключено для вопроса {question_token}"
-            )
-        except Exception as e:
-            logger.debug(f"[Задачи] Ошибка при удалении задачи {attention_job_id}: {e}")
-
+        await _forget_attention_reminded(question_token)
     except Exception as e:
         logger.error(
             f"[Напоминание о внимании] Ошибка при остановке напоминаний для вопроса {question_token}: {e}"
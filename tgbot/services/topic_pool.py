@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import uuid
+from collections import deque
+from typing import Optional, Union
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError, TelegramBadRequest
+
+from tgbot.services.leader import RELEASE_SCRIPT
+from tgbot.services.logger import setup_logging
+from tgbot.services.rate_limit import Priority, priority
+from tgbot.services.redis_client import get_redis, redis_key
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Название топиков в резерве, пока они не отданы под вопрос
+POOL_TOPIC_NAME = "🔹 Резерв"
+
+# Сколько держится блокировка пополнения резерва форума, если реплика не сняла ее сама
+REFILL_LOCK_TTL = 60
+
+
+class ForumTopicPool:
+    """
+    Резерв заранее созданных топиков в каждом форуме.
+
+    Создание топика - самый долгий шаг при создании вопроса, поэтому вопрос забирает топик из резерва
+    и только переименовывает его и меняет иконку. Забранный топик возвращается в резерв в фоне.
+    Идентификаторы топиков хранятся в списке Redis, общем для всех реплик, без Redis - в памяти процесса.
+    Если резерв пуст, топик создается как раньше
+    """
+
+    def __init__(self, size: int = 3):
+        self.size = size
+        self.bot: Optional[Bot] = None
+
+        self._memory: dict[int, deque[int]] = {}
+        self._refilling: dict[int, asyncio.Task] = {}
+
+    @staticmethod
+    def _key(chat_id: int) -> str:
+        return redis_key("topic_pool", chat_id)
+
+    async def _pop(self, chat_id: int) -> Optional[int]:
+        redis = get_redis()
+        if redis is None:
+            topics = self._memory.get(chat_id)
+            return topics.popleft() if topics else None
+
+        topic_id = await redis.lpop(self._key(chat_id))
+        return int(topic_id) if topic_id is not None else None
+
+    async def _push(self, chat_id: int, topic_id: int) -> None:
+        redis = get_redis()
+        if redis is None:
+            self._memory.setdefault(chat_id, deque()).append(topic_id)
+            return
+        await redis.rpush(self._key(chat_id), topic_id)
+
+    async def _give_back(self, chat_id: int, topic_id: int) -> None:
+        # Топик возвращается в начало резерва, чтобы его забрал следующий вопрос
+        try:
+            redis = get_redis()
+            if redis is None:
+                self._memory.setdefault(chat_id, deque()).appendleft(topic_id)
+            else:
+                await redis.lpush(self._key(chat_id), topic_id)
+        except Exception as e:
+            logger.error(
+                f"[Резерв топиков] Не удалось вернуть топик {topic_id} в резерв форума {chat_id}: {e}"
+            )
+
+    async def available(self, chat_id: Union[int, str]) -> int:
+        """
+        Кол-во топиков в резерве форума
+        :param chat_id: Идентификатор форума
+        :return: Кол-во топиков
+        """
+        chat_id = int(chat_id)
+        redis = get_redis()
+        if redis is None:
+            return len(self._memory.get(chat_id, ()))
+        return await redis.llen(self._key(chat_id))
+
+    async def take(
+        self,
+        bot: Bot,
+        chat_id: Union[int, str],
+        name: str,
+        icon_custom_emoji_id: Optional[str] = None,
+    ) -> int:
+        """
+        Получение топика под новый вопрос
+        :param bot: Экземпляр бота
+        :param chat_id: Идентификатор форума
+        :param name: Название топика
+        :param icon_custom_emoji_id: Иконка топика
+        :return: Идентификатор топика
+        """
+        chat_id = int(chat_id)
+        self.bot = bot
+
+        try:
+            with priority(Priority.URGENT):
+                while (topic_id := await self._pop(chat_id)) is not None:
+                    try:
+                        await bot.edit_forum_topic(
+                            chat_id=chat_id,
+                            message_thread_id=topic_id,
+                            name=name,
+                            icon_custom_emoji_id=icon_custom_emoji_id,
+                        )
+                        return topic_id
+                    except TelegramBadRequest as e:
+                        # Топик из резерва удалили вручную - берем следующий
+                        logger.warning(
+                            f"[Резерв топиков] Топик {topic_id} форума {chat_id} недоступен: {e}"
+                        )
+                    except BaseException:
+                        # Топик цел, ошибка временная (сеть, сервер, RetryAfter) или задача отменена
+                        await self._give_back(chat_id, topic_id)
+                        raise
+
+                logger.info(
+                    f"[Резерв топиков] Резерв форума {chat_id} пуст, создаем топик"
+                )
+                new_topic = await bot.create_forum_topic(
+                    chat_id=chat_id,
+                    name=name,
+                    icon_custom_emoji_id=icon_custom_emoji_id,
+                )
+                return new_topic.message_thread_id
+        finally:
+            self.refill_later(chat_id)
+
+    async def refill(self, chat_id: Union[int, str]) -> int:
+        """
+        Пополнение резерва форума до size топиков. Если резерв уже пополняет другая реплика, ничего не делает
+        :param chat_id: Идентификатор форума
+        :return: Кол-во созданных топиков
+        """
+        chat_id = int(chat_id)
+        if self.bot is None:
+            logger.error("[Резерв топиков] Бот не зарегистрирован")
+            return 0
+
+        # Реплики делят резерв в Redis, поэтому пополняет его одна реплика за раз
+        redis = get_redis()
+        lock_key = redis_key("topic_pool", chat_id, "refill")
+        lock_owner = uuid.uuid4().hex
+        if redis is not None and not await redis.set(
+            lock_key, lock_owner, nx=True, ex=REFILL_LOCK_TTL
+        ):
+            return 0
+
+        created = 0
+        try:
+            with priority(Priority.LOW):
+                while await self.available(chat_id) < self.size:
+                    new_topic = await self.bot.create_forum_topic(
+                        chat_id=chat_id, name=POOL_TOPIC_NAME
+                    )
+                    await self._push(chat_id, new_topic.message_thread_id)
+                    created += 1
+        finally:
+            if redis is not None:
+                await redis.register_script(RELEASE_SCRIPT)(
+                    keys=[lock_key], args=[lock_owner]
+                )
+
+        if created:
+            logger.info(
+                f"[Резерв топиков] В резерв форума {chat_id} добавлено {created} топиков"
+            )
+        return created
+
+    async def _refill_safely(self, chat_id: int) -> None:
+        try:
+            await self.refill(chat_id)
+        except TelegramAPIError as e:
+            logger.error(f"[Резерв топиков] Ошибка пополнения форума {chat_id}: {e}")
+        except Exception as e:
+            logger.error(
+                f"[Резерв топиков] Непредвиденная ошибка пополнения форума {chat_id}: {e}"
+            )
+        finally:
+            self._refilling.pop(chat_id, None)
+
+    def refill_later(self, chat_id: Union[int, str]) -> None:
+        """
+        Пополнение резерва форума в фоне. Повторный вызов во время пополнения ничего не делает
+        :param chat_id: Идентификатор форума
+        """
+        chat_id = int(chat_id)
+        task = self._refilling.get(chat_id)
+        if task is None or task.done():
+            self._refilling[chat_id] = asyncio.create_task(self._refill_safely(chat_id))
+
+    def start(self, bot: Bot, chat_ids: list[Union[int, str]]) -> None:
+        """
+        Заполнение резервов форумов при запуске бота
+        :param bot: Экземпляр бота
+        :param chat_ids: Идентификаторы форумов
+        """
+        self.bot = bot
+        for chat_id in dict.fromkeys(int(chat_id) for chat_id in chat_ids if chat_id):
+            self.refill_later(chat_id)
+
+    async def stop(self) -> None:
+        """Остановка фонового пополнения."""
+        tasks = list(self._refilling.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._refilling.clear()
+
+
+topic_pool = ForumTopicPool()